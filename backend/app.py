@@ -1,27 +1,34 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, make_response, render_template, stream_with_context
 from flask_cors import CORS
+import functools
+import gzip
 import json
 import os
 import datetime
-import random
-import threading
 import time
+import zlib
+import collector
 from ai_module import AIDebugger
 from system_monitor import SystemMonitor
 from alerts import AlertManager
 from predictive import PredictiveAnalysis
-from database import get_db_manager
+from database import decode_cursor, encode_cursor, get_db_manager, run_periodically
+from change_feed import ChangeFeed, StorageFollower
+from downsample import DOWNSAMPLE_METHODS, downsample
+from ingest import ingest_ndjson, open_stream
+from record_format import decode_records
+from response_cache import ResponseCache
+from rollups import ROLLUP_TIERS
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+# Enable CORS for all routes; preflights (If-None-Match triggers them) are cached for 10 minutes
+CORS(app, expose_headers=['ETag', 'Last-Modified', 'X-Next-Cursor'], max_age=600)
 
 # Create logs directory if it doesn't exist
 if not os.path.exists('logs'):
     os.makedirs('logs')
 
 # Initialize components
-sample_logs = []
-alerts = []  # Initialize alerts list
 ai_debugger = AIDebugger()
 system_monitor = SystemMonitor()
 alert_manager = AlertManager()
@@ -30,263 +37,292 @@ predictive_analysis = PredictiveAnalysis()
 # Initialize JSON database manager
 db_manager = get_db_manager('data')
 
-# System statistics storage (JSON-based)
-system_stats = []
-
-# Start system monitoring in background
-def monitor_system():
-    while True:
-        stats = system_monitor.get_system_stats()
-        # Store stats in JSON database
-        db_manager.add_system_stat(stats)
-        
-        # Check for alerts and persist to JSON DB (fix)
-        alerts_list = system_monitor._check_alerts(stats)
-        for alert in alerts_list:
-            db_manager.add_alert({
-                'timestamp': alert.get('timestamp'),
-                'type': 'system',
-                'message': alert.get('message'),
-                'severity': alert.get('severity', 'WARNING'),
-                'data': {'source': alert.get('type')},
-                'acknowledged': False
-            })
-        
-        time.sleep(30)  # Check every 30 seconds
-
-# Start monitoring thread
-monitor_thread = threading.Thread(target=monitor_system, daemon=True)
-monitor_thread.start()
-
-# Load sample log data from file
-def load_sample_logs():
-    global sample_logs
-    try:
-        with open('logs/sample_logs.json', 'r') as f:
-            sample_logs = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Generate some sample logs if file doesn't exist
-        generate_sample_logs()
-        save_sample_logs()
-
-# Save sample logs to file
-def save_sample_logs():
-    with open('logs/sample_logs.json', 'w') as f:
-        json.dump(sample_logs, f, indent=2)
-        
-# Reset logs - clear all logs
-def reset_logs():
-    global sample_logs
-    sample_logs = []
-    # Clear persisted logs in JSON database
-    try:
-        db_manager.clear_logs()
-    except Exception:
-        pass
-    save_sample_logs()
-
-# Generate sample log data
-def generate_sample_logs():
-    global sample_logs
-    log_types = ['INFO', 'WARNING', 'ERROR', 'CRITICAL']
-    services = ['auth-service', 'user-service', 'payment-service', 'api-gateway']
-    messages = [
-        'Application started successfully',
-        'Database connection established',
-        'Failed to connect to database',
-        'User authentication failed',
-        'Payment processing error',
-        'Memory usage exceeds threshold',
-        'CPU usage high',
-        'Network timeout',
-        'Invalid request parameters',
-        'Unauthorized access attempt'
-    ]
-    
-    # Generate 50 sample logs
-    for i in range(50):
-        severity = random.choice(log_types)
-        timestamp = (datetime.datetime.now() - datetime.timedelta(
-            days=random.randint(0, 7),
-            hours=random.randint(0, 23),
-            minutes=random.randint(0, 59),
-            seconds=random.randint(0, 59)
-        )).isoformat()
-        
-        log_entry = {
-            'id': i + 1,
-            'timestamp': timestamp,
-            'severity': severity,
-            'service': random.choice(services),
-            'message': random.choice(messages),
-            'details': f'Log details for event {i+1}'
-        }
-        
-        # Add stack trace for errors
-        if severity in ['ERROR', 'CRITICAL']:
-            log_entry['stack_trace'] = f"Exception in thread \"main\" java.lang.NullPointerException\n    at com.example.myproject.Book.getTitle(Book.java:16)\n    at com.example.myproject.Author.getBookTitles(Author.java:25)\n    at com.example.myproject.Bootstrap.main(Bootstrap.java:14)"
-        
-        sample_logs.append(log_entry)
-    
-    # Sort logs by timestamp (newest first)
-    sample_logs.sort(key=lambda x: x['timestamp'], reverse=True)
+# Monitoring, demo logs and ingestion run here unless a separate collector
+# process does them (COLLECTOR=external), which lets several web workers
+# share the storage without repeating that work
+COLLECTOR = os.environ.get('COLLECTOR', 'embedded')
+if COLLECTOR == 'embedded':
+    # Includes the system sampler whose latest sample the handlers read;
+    # without it, the monitor samples on demand
+    collector.start(db_manager, system_monitor)
+    change_feed = db_manager.changes
+else:
+    # Writes made by the collector and the other workers reach this
+    # worker's live stream by polling the storage
+    change_feed = ChangeFeed()
+    run_periodically(StorageFollower(db_manager, change_feed).poll,
+                     float(os.environ.get('STREAM_FOLLOW_SECONDS', 1)), 'following storage changes')
 
 # AI-based error analysis using the AIDebugger class
 def analyze_error(log_entry):
     return ai_debugger.analyze_error(log_entry)
 
-# Alert system
-def generate_alert(log_entry):
-    """Generate an alert for critical or error logs"""
-    if log_entry['severity'] in ['ERROR', 'CRITICAL']:
-        alert = {
-            'id': len(alerts) + 1,
-            'log_id': log_entry['id'],
-            'timestamp': datetime.datetime.now().isoformat(),
-            'severity': log_entry['severity'],
-            'service': log_entry['service'],
-            'message': f"Alert: {log_entry['message']}",
-            'is_read': False
-        }
-        alerts.append(alert)
-        
-        # Save alert to JSON database
-        db_manager.add_alert({
-            'timestamp': alert['timestamp'],
-            'type': 'system',
-            'message': alert['message'],
-            'severity': alert['severity'],
-            'data': {
-                'log_id': alert['log_id'],
-                'service': alert['service'],
-                'is_read': alert['is_read']
-            },
-            'acknowledged': alert['is_read']
-        })
-        
-        return alert
-    return None
-
-# Simulate real-time log generation
-def log_generator():
-    """Background thread to generate new logs periodically"""
-    global sample_logs
-    
-    log_types = ['INFO', 'WARNING', 'ERROR', 'CRITICAL']
-    services = ['auth-service', 'user-service', 'payment-service', 'api-gateway']
-    messages = [
-        'Application started successfully',
-        'Database connection established',
-        'Failed to connect to database',
-        'User authentication failed',
-        'Payment processing error',
-        'Memory usage exceeds threshold',
-        'CPU usage high',
-        'Network timeout',
-        'Invalid request parameters',
-        'Unauthorized access attempt'
-    ]
-    
-    while True:
-        # Sleep for a random interval (5-15 seconds)
-        time.sleep(random.randint(5, 15))
-        
-        # Generate a new log
-        severity = random.choice(log_types)
-        timestamp = datetime.datetime.now().isoformat()
-        
-        new_log = {
-            'id': max([log['id'] for log in sample_logs]) + 1 if sample_logs else 1,
-            'timestamp': timestamp,
-            'severity': severity,
-            'service': random.choice(services),
-            'message': random.choice(messages),
-            'details': f'Log details for event generated at {timestamp}'
-        }
-        
-        # Add stack trace for errors
-        if severity in ['ERROR', 'CRITICAL']:
-            new_log['stack_trace'] = f"Exception in thread \"main\" java.lang.NullPointerException\n    at com.example.myproject.Book.getTitle(Book.java:16)\n    at com.example.myproject.Author.getBookTitles(Author.java:25)\n    at com.example.myproject.Bootstrap.main(Bootstrap.java:14)"
-        
-        # Add to logs
-        sample_logs.insert(0, new_log)
-        
-        # Save log to JSON database
-        db_manager.add_log(new_log)
-        
-        # Generate alert if needed
-        if severity in ['ERROR', 'CRITICAL']:
-            generate_alert(new_log)
-        
-        # Save logs periodically to file (legacy backup)
-        if random.random() < 0.2:  # 20% chance to save
-            save_sample_logs()
+# Largest page the list endpoints serialize in one response
+MAX_PAGE_SIZE = 1000
+
+def _page_args(default_limit):
+    """Read `limit` and `cursor` from the query string; raises ValueError on a bad cursor"""
+    limit = min(max(request.args.get('limit', default_limit, type=int), 1), MAX_PAGE_SIZE)
+    cursor = request.args.get('cursor') or None
+    if cursor:
+        decode_cursor(cursor)
+    return limit, cursor
+
+def _parse_time_arg(name):
+    """Read an ISO timestamp query parameter as a naive local time string
+
+    Stored timestamps are naive local ISO strings, so aware inputs such as
+    `...Z` are converted to local time first. Raises ValueError if malformed.
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name} timestamp: {value}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat()
+
+def _time_args():
+    """Read the inclusive `since`/`until` bounds from the query string"""
+    return _parse_time_arg('since'), _parse_time_arg('until')
+
+def _paged_response(items, limit):
+    """Respond with up to `limit` items and a keyset cursor for the next page
+
+    Callers fetch limit + 1 items, so a next page is only advertised when it
+    exists. The cursor is always sent in the X-Next-Cursor header; requests
+    that pass a `cursor` parameter (empty for the first page) get
+    {items, next_cursor} instead of a bare list.
+    """
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    items = items[:limit]
+    if 'cursor' in request.args:
+        response = jsonify({'items': items, 'next_cursor': next_cursor})
+    else:
+        response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+def _since_id_arg():
+    """Read the `since_id` delta token; None when absent, ValueError when malformed"""
+    value = request.args.get('since_id')
+    if value is None:
+        return None
+    if not value.isdigit():
+        raise ValueError(f"Invalid since_id: {value}")
+    return int(value)
+
+def _delta_response(delta, convert=None, **extra):
+    """Respond with a get_delta result: {items, last_id, reset} plus `extra` fields"""
+    if delta is None:
+        return jsonify({'error': 'Failed to read changes'}), 500
+    items = delta['items'] if convert is None else [convert(item) for item in delta['items']]
+    return jsonify({**delta, 'items': items, **extra})
+
+def _normalize_alert(a):
+    """Stored alert in the shape of the previous alerts API"""
+    return {
+        'id': a.get('id'),
+        'log_id': a.get('data', {}).get('log_id'),
+        'timestamp': a.get('timestamp'),
+        'severity': a.get('severity'),
+        'service': a.get('data', {}).get('service'),
+        'message': a.get('message'),
+        'type': a.get('type'),
+        'is_read': a.get('acknowledged', False)
+    }
+
+def conditional(*names):
+    """Serve a view with ETag/Last-Modified taken from storage version counters
+
+    The validators come from the versions of the collections the view reads
+    and are checked before it runs, so an unchanged collection gets a 304
+    without any query or serialization. Views must depend only on those
+    collections and the URL.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = [db_manager.get_version(name) for name in names]
+            etag = '-'.join(str(version) for version, _ in versions)
+            # Last-Modified has whole seconds, so it is only sent once the
+            # second of the last change is over; otherwise a second change in
+            # the same second would look unmodified
+            modified = int(max(changed for _, changed in versions))
+            last_modified = None
+            if modified < int(time.time()):
+                last_modified = datetime.datetime.fromtimestamp(modified, datetime.timezone.utc)
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = (last_modified is not None and request.if_modified_since is not None
+                                and last_modified <= request.if_modified_since)
+            if not_modified:
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            # Weak: the gzip, deflate and identity encodings share one tag
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+# Computed responses of the expensive read-only views, keyed by path and query
+response_cache = ResponseCache(max_entries=int(os.environ.get('RESPONSE_CACHE_SIZE', 256)),
+                               ttl=float(os.environ.get('RESPONSE_CACHE_TTL', 60)))
+
+class _Uncached(Exception):
+    """Carries a non-200 response out of a cached computation"""
+    def __init__(self, response):
+        super().__init__(response.status)
+        self.response = response
+
+def cached(*names, ttl=None):
+    """Serve a view from response_cache while the named collections are unchanged
+
+    Entries are keyed by path and query string and tagged with the versions
+    of `names`, so any write to those collections invalidates them. Only 200
+    responses are kept; concurrent identical requests share one computation.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+            version = tuple(db_manager.get_version(name)[0] for name in names)
+            def compute():
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    # Not cached; handed to every waiting caller through the exception
+                    raise _Uncached(response)
+                return response.get_data(), response.mimetype
+            try:
+                body, mimetype = response_cache.get_or_compute(key, version, compute, ttl=ttl)
+            except _Uncached as e:
+                return e.response
+            return Response(body, mimetype=mimetype)
+        return wrapper
+    return decorator
+
+# JSON responses at least this big are compressed for clients that accept it
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_LEVEL = 5
+
+@app.after_request
+def compress_response(response):
+    """gzip or deflate JSON responses, as negotiated through Accept-Encoding"""
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(['gzip', 'deflate'])
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    if encoding == 'gzip':
+        body = gzip.compress(body, COMPRESS_LEVEL, mtime=0)
+    else:
+        body = zlib.compress(body, COMPRESS_LEVEL)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
 
 # API Routes
 @app.route('/api/logs', methods=['GET'])
+@conditional('logs')
 def get_logs():
     severity = request.args.get('severity')
     service = request.args.get('service')
-    limit = request.args.get('limit', 100, type=int)
-    
-    # Try to get logs from JSON database first
-    logs = db_manager.get_logs(limit=limit, severity=severity, service=service)
-    if logs:
-        return jsonify(logs)
-    
-    # Fall back to file-based logs if database is empty
-    filtered_logs = sample_logs
+    try:
+        limit, cursor = _page_args(100)
+        since, until = _time_args()
+        since_id = _since_id_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    if severity:
-        filtered_logs = [log for log in filtered_logs if log['severity'] == severity]
+    # Only the logs added after since_id
+    if since_id is not None:
+        return _delta_response(db_manager.get_delta('logs', since_id, limit=limit,
+                                                    severity=severity, service=service))
     
-    if service:
-        filtered_logs = [log for log in filtered_logs if log['service'] == service]
+    # Full-text search returns a single ranked page
+    query = request.args.get('q', '').strip()
+    if query:
+        return _paged_response(db_manager.search_logs(query, limit=limit, severity=severity,
+                                                      service=service, since=since, until=until), limit)
     
-    return jsonify(filtered_logs[:limit])
+    logs = db_manager.get_logs(limit=limit + 1, severity=severity, service=service,
+                               since=since, until=until, cursor=cursor)
+    return _paged_response(logs, limit)
 
 @app.route('/api/logs/reset', methods=['POST'])
 def reset_logs_endpoint():
-    reset_logs()
+    db_manager.clear_logs()
     return jsonify({"status": "success", "message": "All logs have been reset"})
 
 @app.route('/api/logs/<int:log_id>', methods=['GET'])
+@conditional('logs')
 def get_log(log_id):
-    # Prefer JSON database lookup
     log = db_manager.get_log_by_id(log_id)
     if log:
         return jsonify(log)
     
-    # Fallback to in-memory logs
-    for log_item in sample_logs:
-        if log_item['id'] == log_id:
-            return jsonify(log_item)
-    
     return jsonify({'error': 'Log not found'}), 404
 
 @app.route('/api/analyze/<int:log_id>', methods=['GET'])
 def analyze_log(log_id):
-    # Prefer JSON database lookup
     log = db_manager.get_log_by_id(log_id)
     if log:
         analysis = analyze_error(log)
         return jsonify({'log': log, 'analysis': analysis})
     
-    # Fallback to in-memory logs
-    for log_item in sample_logs:
-        if log_item['id'] == log_id:
-            analysis = analyze_error(log_item)
-            return jsonify({'log': log_item, 'analysis': analysis})
-    
     return jsonify({'error': 'Log not found'}), 404
 
 @app.route('/api/system/stats', methods=['GET'])
+@conditional('system_stats')
 def get_system_stats():
-    limit = request.args.get('limit', 20, type=int)
+    """System stats, newest first
+
+    With `points=N` every sample in [since, until] is downsampled to at most
+    N rows: `method=lttb` (default) keeps the samples that best preserve the
+    shape of `field` (default cpu_percent), `method=buckets` returns
+    equal-time buckets with mean, `_min` and `_max` per field.
+    """
+    limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_PAGE_SIZE)
+    try:
+        since, until = _time_args()
+        since_id = _since_id_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if since_id is not None:
+        return _delta_response(db_manager.get_delta('system_stats', since_id, limit=limit))
+    
+    points = request.args.get('points', type=int)
+    if points:
+        method = request.args.get('method', 'lttb')
+        if method not in DOWNSAMPLE_METHODS:
+            return jsonify({'error': f"Unknown method: {method} (expected one of {', '.join(DOWNSAMPLE_METHODS)})"}), 400
+        field = request.args.get('field', 'cpu_percent')
+        stats = db_manager.get_system_stats(limit=None, since=since, until=until)
+        if stats and not isinstance(stats[0].get(field), (int, float)):
+            return jsonify({'error': f"Unknown numeric field: {field}"}), 400
+        return jsonify(downsample(stats, min(max(points, 3), MAX_PAGE_SIZE), method=method, field=field))
     
     # Get stats from JSON database
-    stats = db_manager.get_system_stats(limit=limit)
-    if stats:
+    stats = db_manager.get_system_stats(limit=limit, since=since, until=until)
+    if stats or since or until:
         return jsonify(stats)
     
     # Fallback to current stats if database is empty
@@ -295,69 +331,59 @@ def get_system_stats():
 
 @app.route('/api/database/status', methods=['GET'])
 def get_database_status():
-    return jsonify({
-        "initialized": True,
-        "connection_type": "JSON Files"
-    })
+    status = db_manager.get_status()
+    return jsonify({"initialized": True, **status, 'response_cache': response_cache.get_metrics()})
 
 @app.route('/api/database/connect', methods=['POST'])
 def connect_database():
-    # Return success message for JSON-based storage
-    return jsonify({"message": "Using JSON file storage - no database connection needed"})
+    # Storage is embedded (JSON files or SQLite) - nothing to connect to
+    status = db_manager.get_status()
+    return jsonify({"message": f"Using {status['connection_type']} storage - no database connection needed",
+                    "engine": status['engine']})
 
 @app.route('/api/stats', methods=['GET'])
+@conditional('logs')
+@cached('logs')
 def get_stats():
-    # Calculate statistics
-    total_logs = len(sample_logs)
-    severity_counts = {}
-    service_counts = {}
-    
-    for log in sample_logs:
-        severity = log['severity']
-        service = log['service']
-        
-        severity_counts[severity] = severity_counts.get(severity, 0) + 1
-        service_counts[service] = service_counts.get(service, 0) + 1
-    
+    # Running counters kept by the store, so this is O(1) and matches /api/logs
+    counts = db_manager.get_log_counts()
     return jsonify({
-        'total_logs': total_logs,
-        'by_severity': severity_counts,
-        'by_service': service_counts
+        'total_logs': counts['total'],
+        'by_severity': counts['by_severity'],
+        'by_service': counts['by_service']
     })
 
 @app.route('/api/alerts', methods=['GET'])
+@conditional('alerts')
 def get_alerts():
     """Get all alerts, with option to filter by read status"""
     is_read = request.args.get('is_read')
-    limit = request.args.get('limit', 50, type=int)
+    try:
+        limit, cursor = _page_args(50)
+        since, until = _time_args()
+        since_id = _since_id_arg()
+        acked_since = _parse_time_arg('acked_since')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     # Prefer JSON database alerts
     acknowledged = None
     if is_read is not None:
         acknowledged = is_read.lower() == 'true'
-    alerts_data = db_manager.get_alerts(limit=limit, acknowledged=acknowledged)
-    if alerts_data:
-        # Normalize fields to match previous API
-        normalized = []
-        for a in alerts_data:
-            normalized.append({
-                'id': a.get('id'),
-                'log_id': a.get('data', {}).get('log_id'),
-                'timestamp': a.get('timestamp'),
-                'severity': a.get('severity'),
-                'service': a.get('data', {}).get('service'),
-                'message': a.get('message'),
-                'type': a.get('type'),
-                'is_read': a.get('acknowledged', False)
-            })
-        return jsonify(normalized)
-
-    # Fallback to in-memory alerts
-    if is_read is not None:
-        is_read_bool = is_read.lower() == 'true'
-        filtered_alerts = [alert for alert in alerts if alert['is_read'] == is_read_bool]
-        return jsonify(filtered_alerts[:limit])
-    return jsonify(alerts[:limit])
+    
+    # New alerts after since_id, plus the ones acknowledged after acked_since
+    if since_id is not None:
+        delta = db_manager.get_delta('alerts', since_id, limit=limit, acknowledged=acknowledged)
+        updated = db_manager.get_acknowledged_alerts(acked_since or '', limit=limit + 1)
+        if delta is not None and acked_since and len(updated) > limit:
+            delta['reset'] = True
+        updated = updated[:limit]
+        latest = updated[0]['acknowledged_at'] if updated else acked_since
+        return _delta_response(delta, _normalize_alert, acked_since=latest,
+                               updated=[_normalize_alert(a) for a in updated])
+    alerts_data = db_manager.get_alerts(limit=limit + 1, acknowledged=acknowledged,
+                                        since=since, until=until, cursor=cursor)
+    return _paged_response([_normalize_alert(a) for a in alerts_data], limit)
 
 @app.route('/api/alerts/<int:alert_id>/mark-read', methods=['POST'])
 def mark_alert_read(alert_id):
@@ -365,12 +391,6 @@ def mark_alert_read(alert_id):
     # Update JSON database
     persisted = db_manager.acknowledge_alert(alert_id)
     
-    # Keep in-memory list in sync (best-effort)
-    for alert in alerts:
-        if alert['id'] == alert_id:
-            alert['is_read'] = True
-            break
-    
     if persisted:
         return jsonify({'success': True})
     else:
@@ -406,7 +426,6 @@ def add_log():
         return jsonify({'error': 'Missing required fields'}), 400
     
     new_log = {
-        'id': max([log['id'] for log in sample_logs]) + 1 if sample_logs else 1,
         'timestamp': datetime.datetime.now().isoformat(),
         'severity': data['severity'],
         'service': data['service'],
@@ -418,39 +437,125 @@ def add_log():
     if new_log['severity'] in ['ERROR', 'CRITICAL']:
         new_log['stack_trace'] = data.get('stack_trace', 'No stack trace provided')
     
-    # Add to logs
-    sample_logs.insert(0, new_log)
-
-    # Persist to JSON database
-    db_manager.add_log(new_log)
+    # Persist to JSON database; the stored entry carries its id
+    new_log = db_manager.add_log(new_log)
+    if new_log is None:
+        return jsonify({'error': 'Failed to save log'}), 500
     
     # Generate alert if needed
-    if new_log['severity'] in ['ERROR', 'CRITICAL']:
-        generate_alert(new_log)
-    
-    # Save logs to file (legacy backup)
-    save_sample_logs()
+    collector.generate_alerts(db_manager, [new_log])
     
     return jsonify({'success': True, 'log': new_log})
-    
-
-load_sample_logs()
 
-# Start background log generator thread
-log_generator_thread = threading.Thread(target=log_generator, daemon=True)
-log_generator_thread.start()
+@app.route('/api/logs/bulk', methods=['POST'])
+def add_logs_bulk():
+    """Ingest a streamed NDJSON body (optionally Content-Encoding: gzip)
+
+    Lines are validated and stored `batch_size` at a time (default 500), one
+    write per batch, with alerts for ERROR/CRITICAL lines. Responds with
+    accepted/rejected totals, per-batch counts and the first rejected lines.
+    """
+    batch_size = min(max(request.args.get('batch_size', 500, type=int), 1), 10000)
+
+    def on_batch(logs):
+        collector.generate_alerts(db_manager, logs)
+
+    stream = open_stream(request.stream, request.headers.get('Content-Encoding'))
+    summary = ingest_ndjson(stream, db_manager, batch_size=batch_size, on_batch=on_batch)
+    status = 400 if summary['error'] else 200
+    return jsonify(summary), status
+
+# Live stream: seconds between keep-alive comments, client reconnect delay and
+# the most records sent for one change (a bulk insert sends only its newest)
+STREAM_KEEPALIVE_SECONDS = 15
+STREAM_RETRY_MS = 3000
+STREAM_MAX_ITEMS = 200
+
+def _stream_frame(event):
+    """One change as a Server-Sent Events frame"""
+    data = event.data
+    if event.kind in ('logs', 'alerts', 'system_stats'):
+        items = data[-STREAM_MAX_ITEMS:]
+        if event.kind == 'alerts':
+            items = [_normalize_alert(a) for a in items]
+        data = {'items': items, 'count': len(data)}
+    elif event.kind == 'alert_update':
+        data = {'id': data['id'], 'is_read': data['acknowledged']}
+    return (f"id: {change_feed.event_id(event)}\n"
+            f"event: {event.kind}\ndata: {json.dumps(data)}\n\n")
+
+@app.route('/api/stream', methods=['GET'])
+def stream_changes():
+    """Push new logs, alerts and system stats as Server-Sent Events
+
+    Events: logs, alerts, system_stats ({items, count}, oldest first),
+    alert_update ({id, is_read}), logs_cleared, and reset when the client
+    missed changes (after a long disconnect or a server restart) and
+    should reload everything.
+    """
+    feed = change_feed
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    after = feed.parse_event_id(last_event_id) if last_event_id else feed.last_id
+
+    def events(after):
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        if after is None:
+            after = feed.last_id
+            yield "event: reset\ndata: {}\n\n"
+        while True:
+            changes, missed = feed.wait(after, timeout=STREAM_KEEPALIVE_SECONDS)
+            if missed:
+                after = feed.last_id
+                yield "event: reset\ndata: {}\n\n"
+            elif not changes:
+                # Also how a closed connection gets noticed
+                yield ": keep-alive\n\n"
+            else:
+                frames = []
+                for event in changes:
+                    # Encoded once, shared by every connected client
+                    if event.frame is None:
+                        event.frame = _stream_frame(event)
+                    frames.append(event.frame)
+                after = changes[-1].id
+                yield ''.join(frames)
+
+    return Response(stream_with_context(events(after)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/predict/logs', methods=['GET'])
+@cached('logs', ttl=300)
 def predict_logs():
-    """Forecast future error counts using ARIMA over hourly log counts"""
+    """Forecast future error counts using ARIMA over hourly log rollups
+
+    Trains on the last `hours` hours (default one week) of hourly rollups
+    rather than re-bucketing raw logs on every request.
+    """
     metric = request.args.get('metric', 'error_count')
-    limit = request.args.get('limit', 500, type=int)
+    hours = min(max(request.args.get('hours', 168, type=int), 1), 24 * 90)
 
-    # Pull logs from JSON DB
-    logs = db_manager.get_logs(limit=limit)
-    result = predictive_analysis.analyze_logs(logs, metric=metric)
+    since = (datetime.datetime.now() - datetime.timedelta(hours=hours)).isoformat()
+    rollups = db_manager.get_rollups('hour', since=since, fill=True)
+    result = predictive_analysis.analyze_rollups(rollups, metric=metric)
     return jsonify(result)
 
+@app.route('/api/rollups', methods=['GET'])
+def get_rollups():
+    """Pre-aggregated log counts per minute, hour or day, oldest first
+
+    Each row has the bucket start `timestamp`, `total`, `by_severity` and
+    `by_service`; `fill=1` adds zero rows for empty buckets.
+    """
+    tier = request.args.get('tier', 'hour')
+    if tier not in ROLLUP_TIERS:
+        return jsonify({'error': f"Unknown tier: {tier} (expected one of {', '.join(ROLLUP_TIERS)})"}), 400
+    try:
+        since, until = _time_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    fill = request.args.get('fill', 'false').lower() in ('1', 'true')
+    return jsonify(db_manager.get_rollups(tier, since=since, until=until, fill=fill))
+
 @app.route('/api/ai/fix', methods=['POST'])
 def ai_auto_fix():
     """Attempt automated remediation for common issues and broken states"""
@@ -467,7 +572,7 @@ def ai_auto_fix():
         os.makedirs('data')
         actions.append('Created data directory')
 
-    # Ensure JSON files exist and are valid lists
+    # Ensure JSON files exist and hold valid record lists in any storage format
     for fname, key in [(status['logs_file'], 'logs'), (status['alerts_file'], 'alerts'), (status['stats_file'], 'stats')]:
         try:
             if not os.path.exists(fname):
@@ -476,21 +581,21 @@ def ai_auto_fix():
                 actions.append(f'Initialized missing {os.path.basename(fname)}')
             else:
                 with open(fname, 'r') as f:
-                    data = json.load(f)
-                if not isinstance(data, list):
-                    raise ValueError('Not a list')
+                    decode_records(json.load(f))
         except Exception:
             with open(fname, 'w') as f:
                 json.dump([], f)
             actions.append(f'Reset corrupted {os.path.basename(fname)} to empty list')
+    # Files may have been rewritten behind the database manager's back
+    if actions:
+        db_manager.invalidate_cache()
 
     # Capture a fresh system stat to verify monitor
-    current_stats = system_monitor.get_system_stats()
+    current_stats, alerts_generated = system_monitor.get_latest_sample()
     db_manager.add_system_stat(current_stats)
     actions.append('Captured and persisted fresh system stats')
 
-    # Generate and persist alerts from current stats
-    alerts_generated = system_monitor._check_alerts(current_stats)
+    # Persist the alerts the monitor raised for these stats
     for alert in alerts_generated:
         db_manager.add_alert({
             'timestamp': alert.get('timestamp'),
@@ -514,14 +619,17 @@ def ai_auto_fix():
 
 # Helper to fetch alert by ID from JSON DB
 def _get_alert_by_id(alert_id: int):
-    alert_list = db_manager.get_alerts(limit=1000)
-    for a in alert_list:
-        if a.get('id') == alert_id:
-            return a
-    return None
-
-# Helper to attempt auto-remediation for a single alert
-def _auto_remediate_alert(alert: dict):
+    return db_manager.get_alert_by_id(alert_id)
+
+# Helper to store the latest system stats sample
+def _capture_system_stats():
+    current_stats = system_monitor.get_system_stats()
+    db_manager.add_system_stat(current_stats)
+    return current_stats
+
+# Helper to attempt auto-remediation for a single alert; pass
+# stats_captured=True when the caller already stored a sample for this request
+def _auto_remediate_alert(alert: dict, stats_captured=False):
     actions = []
     msg = alert.get('message', '') or ''
     source = (alert.get('data') or {}).get('source') or alert.get('type')
@@ -544,17 +652,18 @@ def _auto_remediate_alert(alert: dict):
                 actions.append(f'Initialized missing {os.path.basename(fname)}')
             else:
                 with open(fname, 'r') as f:
-                    data = json.load(f)
-                if not isinstance(data, list):
-                    raise ValueError('Not a list')
+                    decode_records(json.load(f))
         except Exception:
             with open(fname, 'w') as f:
                 json.dump([], f)
             actions.append(f'Reset corrupted {os.path.basename(fname)} to empty list')
+    # Files may have been rewritten behind the database manager's back
+    if actions:
+        db_manager.invalidate_cache()
 
     # Capture a fresh system stat to validate runtime
-    current_stats = system_monitor.get_system_stats()
-    db_manager.add_system_stat(current_stats)
+    if not stats_captured:
+        _capture_system_stats()
     actions.append('Captured fresh system stats')
 
     # Tailored remediation notes per alert type/message
@@ -598,8 +707,11 @@ def auto_fix_all_alerts():
     """Attempt to auto-remediate all active (unacknowledged) alerts"""
     active_alerts = db_manager.get_alerts(limit=1000, acknowledged=False)
     results = []
+    # One sample for the whole request, not one copy of it per alert
+    if active_alerts:
+        _capture_system_stats()
     for alert in active_alerts:
-        res = _auto_remediate_alert(alert)
+        res = _auto_remediate_alert(alert, stats_captured=True)
         db_manager.acknowledge_alert(alert.get('id'))
         results.append({'alert_id': alert.get('id'), 'actions': res['actions']})
 
@@ -0,0 +1,566 @@
+"""Local storage benchmarks
+
+Usage:
+    python bench.py writes --mode segments --records 100000
+    python bench.py writes --write-behind --durability flush --threads 8
+    python bench.py stress --mode json --writers 8 --readers 4
+    python bench.py formats data/*.json
+    python bench.py search --records 100000
+    python bench.py downsample --records 20160 --points 500
+    python bench.py bulk --records 100000 --gzip
+    python bench.py bulk --url http://localhost:5000 --records 100000
+    python bench.py receiver --proto tcp --lines 100000
+    python bench.py tail --lines 100000
+    python bench.py cache --threads 8 --compute-ms 50
+    python bench.py serve --workers 1 4 --clients 16
+"""
+import argparse
+import glob
+import gzip
+import http.client
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from database import JSONDatabaseManager
+from downsample import DOWNSAMPLE_METHODS, downsample
+from ingest import ingest_ndjson, open_stream
+from receiver import UDP_RCVBUF_BYTES, start_in_thread, stop_in_thread
+from record_format import FILE_FORMATS, decode_records, encode_records, load_records
+from response_cache import ResponseCache
+from tailer import DatabaseSink, LineParser, TailAgent
+
+
+def _sample_log(i):
+    return {
+        'severity': ('INFO', 'WARNING', 'ERROR', 'CRITICAL')[i % 4],
+        'service': ('auth-service', 'user-service', 'payment-service', 'api-gateway')[i % 4],
+        'message': 'Network timeout' if i % 7 == 0 else 'Application started successfully',
+        'details': f'Log details for event {i}'
+    }
+
+
+def bench_writes(args):
+    """Measure add_log latency as the collection grows"""
+    data_dir = tempfile.mkdtemp(prefix='bench-writes-')
+    try:
+        db = JSONDatabaseManager(data_dir, storage_mode=args.mode,
+                                 write_behind=args.write_behind, durability=args.durability)
+        per_thread = args.records // args.threads
+        window = max(per_thread // 10, 1)
+
+        def writer(report):
+            start = time.perf_counter()
+            for i in range(per_thread):
+                db.add_log(_sample_log(i))
+                if report and (i + 1) % window == 0:
+                    elapsed = time.perf_counter() - start
+                    print(f"{(i + 1) * args.threads:>10} records  {elapsed / window * 1e6:10.1f} us/write")
+                    start = time.perf_counter()
+
+        threads = [threading.Thread(target=writer, args=(n == 0,)) for n in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        db.flush()
+        elapsed = time.perf_counter() - started
+        print(f"total {per_thread * args.threads / elapsed:,.0f} writes/sec")
+        if db.get_status()['write_queue']:
+            print(db.get_status()['write_queue'])
+        db.close()
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def bench_stress(args):
+    """Run parallel writers and readers, then check nothing was lost or torn"""
+    data_dir = tempfile.mkdtemp(prefix='bench-stress-')
+    errors = []
+    done = threading.Event()
+    reads = [0]
+    try:
+        db = JSONDatabaseManager(data_dir, storage_mode=args.mode,
+                                 write_behind=args.write_behind, durability=args.durability)
+
+        def writer(n):
+            for i in range(args.records):
+                db.add_log(_sample_log(n * args.records + i))
+                if i % 10 == 0:
+                    alert_id = db.add_alert({'message': f'writer {n} alert {i}'})['id']
+                    if not db.acknowledge_alert(alert_id):
+                        errors.append(f'alert {alert_id} could not be acknowledged')
+
+        def reader():
+            while not done.is_set():
+                ids = [log['id'] for log in db.get_logs(limit=200)]
+                if ids != sorted(set(ids), reverse=True):
+                    errors.append('get_logs returned ids out of order or duplicated')
+                for alert in db.get_alerts(limit=50, acknowledged=False):
+                    if alert['acknowledged']:
+                        errors.append(f"alert {alert['id']} matched acknowledged=False")
+                if args.mode == 'json':
+                    # The file on disk must always parse, whatever the writers are doing
+                    try:
+                        with open(os.path.join(data_dir, 'logs.json')) as f:
+                            json.load(f)
+                    except FileNotFoundError:
+                        pass
+                    except ValueError as e:
+                        errors.append(f'torn read of logs.json: {e}')
+                reads[0] += 1
+
+        writers = [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+        readers = [threading.Thread(target=reader) for _ in range(args.readers)]
+        started = time.perf_counter()
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        done.set()
+        for thread in readers:
+            thread.join()
+        db.close()
+        elapsed = time.perf_counter() - started
+
+        # Reopen from disk and check every write landed exactly once
+        expected_logs = args.writers * args.records
+        expected_alerts = args.writers * len(range(0, args.records, 10))
+        reopened = JSONDatabaseManager(data_dir, storage_mode=args.mode)
+        log_ids = [log['id'] for log in reopened.get_logs(limit=expected_logs + 1)]
+        alerts = reopened.get_alerts(limit=expected_alerts + 1)
+        if sorted(log_ids) != list(range(1, expected_logs + 1)):
+            errors.append(f'expected logs 1..{expected_logs}, found {len(log_ids)} '
+                          f'({len(set(log_ids))} distinct)')
+        if len(alerts) != expected_alerts:
+            errors.append(f'expected {expected_alerts} alerts, found {len(alerts)}')
+        unacknowledged = [alert['id'] for alert in alerts if not alert['acknowledged']]
+        if unacknowledged:
+            errors.append(f'{len(unacknowledged)} acknowledgements lost')
+        reopened.close()
+
+        print(f"{expected_logs} logs, {expected_alerts} alerts from {args.writers} writers, "
+              f"{reads[0]} reads from {args.readers} readers in {elapsed:.2f}s")
+        for error in sorted(set(errors)):
+            print(f"FAIL: {error}")
+        print('FAIL' if errors else 'OK')
+        return 1 if errors else 0
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def bench_formats(args):
+    """Compare file size and parse time of each record file format"""
+    for filename in args.files or sorted(glob.glob(os.path.join('data', '*.json'))):
+        records = load_records(filename)
+        print(f"{filename} ({len(records)} records)")
+        baseline = None
+        for file_format in FILE_FORMATS:
+            text = encode_records(records, file_format)
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                decode_records(json.loads(text))
+                timings.append(time.perf_counter() - start)
+            size = len(text.encode('utf-8'))
+            baseline = baseline or size
+            print(f"  {file_format:>8}  {size:>10,} bytes  {size / baseline:6.1%}  "
+                  f"{min(timings) * 1000:8.2f} ms parse")
+
+
+SEARCH_QUERIES = ('timeout', 'network timeout', '"network timeout"', 'time*', 'payment* error')
+
+def bench_search(args):
+    """Measure full-text search latency over a generated log collection"""
+    data_dir = tempfile.mkdtemp(prefix='bench-search-')
+    try:
+        db = JSONDatabaseManager(data_dir, storage_mode='segments')
+        messages = ('Network timeout while calling payment gateway', 'Database connection refused',
+                    'User login succeeded', 'Payment processing error', 'Cache miss for session key')
+        batch = []
+        for i in range(args.records):
+            log = _sample_log(i)
+            log['message'] = messages[i % len(messages)]
+            batch.append(log)
+            if len(batch) == 10000:
+                db.add_logs(batch)
+                batch = []
+        db.add_logs(batch)
+
+        for query in SEARCH_QUERIES:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                results = db.search_logs(query, limit=50)
+            elapsed = (time.perf_counter() - start) / args.repeat
+            print(f"{query!r:>24}  {len(results):>3} results  {elapsed * 1000:8.2f} ms")
+        db.close()
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def bench_downsample(args):
+    """Measure downsampling time and payload size for a week of 30-second stats"""
+    start = datetime.now() - timedelta(seconds=30 * args.records)
+    stats = [{'id': i + 1, 'timestamp': (start + timedelta(seconds=30 * i)).isoformat(),
+              'cpu_percent': round(50 + 40 * ((i * 7919) % 1000) / 1000 * (i % 300) / 300, 1),
+              'memory_percent': round(40 + (i % 2880) / 144, 1), 'disk_percent': 61.2,
+              'memory_total_gb': 16.0, 'memory_used_gb': round(6 + (i % 2880) / 720, 2)}
+             for i in range(args.records)][::-1]
+    raw_size = len(json.dumps(stats))
+    print(f"raw         {len(stats):>7} rows  {raw_size:>12,} bytes")
+    for method in DOWNSAMPLE_METHODS:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            rows = downsample(stats, args.points, method=method)
+            timings.append(time.perf_counter() - started)
+        size = len(json.dumps(rows))
+        print(f"{method:<10}  {len(rows):>7} rows  {size:>12,} bytes  {size / raw_size:6.1%}  "
+              f"{min(timings) * 1000:8.2f} ms")
+
+
+def bench_bulk(args):
+    """Measure NDJSON bulk ingestion throughput in records/sec"""
+    body = ''.join(json.dumps(_sample_log(i)) + '\n' for i in range(args.records)).encode('utf-8')
+    if args.gzip:
+        body = gzip.compress(body)
+    print(f"{args.records} records, {len(body):,} byte body{' (gzip)' if args.gzip else ''}")
+
+    if args.url:
+        # Against a running server, through HTTP and the /api/logs/bulk endpoint
+        request = urllib.request.Request(
+            f"{args.url.rstrip('/')}/api/logs/bulk?batch_size={args.batch_size}", data=body,
+            headers={'Content-Type': 'application/x-ndjson',
+                     **({'Content-Encoding': 'gzip'} if args.gzip else {})})
+        started = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            summary = json.load(response)
+        elapsed = time.perf_counter() - started
+    else:
+        # In process, through the same parser and batching the endpoint uses
+        data_dir = tempfile.mkdtemp(prefix='bench-bulk-')
+        try:
+            db = JSONDatabaseManager(data_dir, storage_mode=args.mode)
+            started = time.perf_counter()
+            stream = open_stream(io.BytesIO(body), 'gzip' if args.gzip else None)
+            summary = ingest_ndjson(stream, db, batch_size=args.batch_size)
+            elapsed = time.perf_counter() - started
+            db.close()
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f"accepted {summary['accepted']}, rejected {summary['rejected']} "
+          f"in {len(summary['batches'])} batches, {elapsed:.2f}s")
+    print(f"{summary['accepted'] / elapsed:,.0f} records/sec")
+
+
+def _receiver_lines(proto, count):
+    now = datetime.now()
+    for i in range(count):
+        log = _sample_log(i)
+        if proto == 'json':
+            yield (json.dumps(log) + '\n').encode('utf-8')
+        elif i % 2:
+            yield (f"<{8 * 16 + 3 + i % 4}>1 {now.isoformat()}Z host {log['service']} {i} - - "
+                   f"{log['message']}\n").encode('utf-8')
+        else:
+            yield (f"<{8 * 16 + 3 + i % 4}>{now.strftime('%b %d %H:%M:%S')} host "
+                   f"{log['service']}[{i}]: {log['message']}\n").encode('utf-8')
+
+
+def bench_receiver(args):
+    """Send syslog or NDJSON lines over loopback and measure lines/sec until stored"""
+    data_dir = tempfile.mkdtemp(prefix='bench-receiver-')
+    try:
+        db = JSONDatabaseManager(data_dir, storage_mode=args.mode, write_behind=True)
+        port_option = {'udp': 'udp_port', 'tcp': 'tcp_port', 'json': 'json_port'}[args.proto]
+        receiver, ports = start_in_thread(db, host='127.0.0.1', batch_size=args.batch_size,
+                                          udp_rcvbuf=args.udp_rcvbuf, **{port_option: 0})
+        address = ('127.0.0.1', ports[args.proto])
+        lines = list(_receiver_lines(args.proto, args.lines))
+
+        started = time.perf_counter()
+        if args.proto == 'udp':
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                for i, line in enumerate(lines):
+                    sock.sendto(line, address)
+                    if args.rate and i % 100 == 99:
+                        # Pace the sender; UDP has no flow control to do it
+                        pause = started + (i + 1) / args.rate - time.perf_counter()
+                        if pause > 0:
+                            time.sleep(pause)
+        else:
+            with socket.create_connection(address) as sock:
+                for i in range(0, len(lines), 1000):
+                    sock.sendall(b''.join(lines[i:i + 1000]))
+        sent = time.perf_counter() - started
+
+        # Wait until everything that arrived is stored
+        stats = receiver.stats
+        done = stats['stored'] + stats['rejected'] + stats['dropped'] + stats['failed']
+        finished = time.perf_counter()
+        while done < args.lines:
+            if args.proto == 'udp' and time.perf_counter() - finished > 1:
+                break  # the kernel may have dropped datagrams before the receiver saw them
+            time.sleep(0.01)
+            now_done = stats['stored'] + stats['rejected'] + stats['dropped'] + stats['failed']
+            if now_done != done:
+                done, finished = now_done, time.perf_counter()
+        elapsed = finished - started
+        stop_in_thread(receiver)
+        db.close()
+
+        print(f"{args.proto}: sent {args.lines} lines in {sent:.2f}s, stored {stats['stored']} "
+              f"in {stats['batches']} batches ({stats['rejected']} rejected, {stats['dropped']} dropped, "
+              f"{args.lines - stats['received']} lost before the receiver)")
+        print(f"{stats['stored'] / elapsed:,.0f} lines/sec end to end")
+        if receiver.udp_rcvbuf_granted is not None:
+            print(f"UDP receive buffer: {receiver.udp_rcvbuf_granted} bytes granted")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def bench_tail(args):
+    """Tail a pre-written log file to its end and measure lines/sec until stored"""
+    data_dir = tempfile.mkdtemp(prefix='bench-tail-')
+    try:
+        path = os.path.join(data_dir, 'service.log')
+        now = datetime.now()
+        with open(path, 'w') as f:
+            for i in range(args.lines):
+                log = _sample_log(i)
+                f.write(f"{now.isoformat(sep=' ')} {log['severity']} [{log['service']}] {log['message']}\n")
+                if i % 10 == 0:
+                    # Every tenth record carries a three-line stack trace
+                    f.write('Traceback (most recent call last):\n  File "app.py", line 1, in <module>\n'
+                            'ValueError: bad value\n')
+
+        db = JSONDatabaseManager(os.path.join(data_dir, 'db'), storage_mode=args.mode, write_behind=True)
+        agent = TailAgent([([path], LineParser())], DatabaseSink(db),
+                          os.path.join(data_dir, 'checkpoints.json'), batch_size=args.batch_size,
+                          use_inotify=False)
+        started = time.perf_counter()
+        agent.run_once()
+        db.flush()
+        elapsed = time.perf_counter() - started
+        agent.close()
+        db.close()
+
+        stats = agent.stats
+        print(f"read {stats['lines']} lines into {stats['records']} records, stored {stats['stored']} "
+              f"in {elapsed:.2f}s")
+        print(f"{stats['lines'] / elapsed:,.0f} lines/sec, {stats['stored'] / elapsed:,.0f} records/sec")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def bench_cache(args):
+    """Request latency through ResponseCache with a slow view and periodic writes"""
+    cache = ResponseCache(max_entries=64, ttl=60)
+    version = [0]
+    stop = threading.Event()
+
+    def compute():
+        time.sleep(args.compute_ms / 1000.0)
+        return b'{}'
+
+    def writer():
+        # Bumps the version the way a storage write does
+        while not stop.wait(args.write_interval_ms / 1000.0):
+            version[0] += 1
+
+    latencies = []
+    lock = threading.Lock()
+
+    def reader():
+        own = []
+        for i in range(args.requests):
+            started = time.perf_counter()
+            cache.get_or_compute(('/api/predict/logs', i % args.keys), version[0], compute)
+            own.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=reader) for _ in range(args.threads)]
+    write_thread = threading.Thread(target=writer)
+    started = time.perf_counter()
+    write_thread.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    write_thread.join()
+
+    latencies.sort()
+    metrics = cache.get_metrics()
+    uncached = len(latencies) * args.compute_ms / 1000.0
+    print(f"{len(latencies)} requests in {elapsed:.2f}s ({uncached:.1f}s of compute without the cache)")
+    print(f"p50 {latencies[len(latencies) // 2] * 1000:.3f}ms, p99 {latencies[int(len(latencies) * 0.99)] * 1000:.3f}ms")
+    print(f"hits {metrics['hits']}, misses {metrics['misses']}, coalesced {metrics['coalesced']}, "
+          f"invalidations {metrics['invalidations']}, hit ratio {metrics['hit_ratio']:.2%}")
+
+
+def _serve_client(port, paths, duration):
+    """Request `paths` in turn over one keep-alive connection for `duration` seconds; returns latencies"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies = []
+    deadline = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        conn.request('GET', paths[i % len(paths)])
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - started)
+        i += 1
+    conn.close()
+    return latencies
+
+
+def bench_serve(args):
+    """Requests/sec and latency of serve.py with different worker counts, on SQLite"""
+    from sqlite_database import SQLiteDatabaseManager
+
+    data_dir = tempfile.mkdtemp(prefix='bench-serve-')
+    try:
+        db = SQLiteDatabaseManager(os.path.join(data_dir, 'data', 'monitor.db'), os.path.join(data_dir, 'data'))
+        for start in range(0, args.records, 1000):
+            db.add_logs([_sample_log(i) for i in range(start, min(start + 1000, args.records))])
+        db.close()
+        # Keeps the collector from adding demo logs if it is started
+        os.makedirs(os.path.join(data_dir, 'logs'))
+        with open(os.path.join(data_dir, 'logs', 'sample_logs.json'), 'w') as f:
+            f.write('[]')
+
+        env = dict(os.environ, DB_ENGINE='sqlite', PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+        for workers in args.workers:
+            server = subprocess.Popen(
+                [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serve.py'),
+                 '--workers', str(workers), '--port', str(args.port), '--no-collector'],
+                cwd=data_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                deadline = time.monotonic() + 30
+                while True:
+                    try:
+                        urllib.request.urlopen(f'http://127.0.0.1:{args.port}/api/database/status').read()
+                        break
+                    except OSError:
+                        if time.monotonic() > deadline:
+                            raise
+                        time.sleep(0.2)
+
+                with multiprocessing.Pool(args.clients) as pool:
+                    results = pool.starmap(_serve_client, [(args.port, args.path, args.duration)] * args.clients)
+            finally:
+                server.terminate()
+                server.wait()
+
+            latencies = sorted(latency for result in results for latency in result)
+            print(f"{workers} worker(s), {args.clients} clients: {len(latencies) / args.duration:,.0f} req/sec, "
+                  f"p50 {latencies[len(latencies) // 2] * 1000:.1f}ms, "
+                  f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms")
+        print(f"{os.cpu_count()} CPUs")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Storage benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    writes = subparsers.add_parser('writes', help='add_log latency vs. collection size')
+    writes.add_argument('--mode', default='segments', choices=['json', 'segments'])
+    writes.add_argument('--records', type=int, default=100000)
+    writes.add_argument('--threads', type=int, default=1)
+    writes.add_argument('--write-behind', action='store_true')
+    writes.add_argument('--durability', default='flush', choices=['none', 'flush', 'fsync'])
+    writes.set_defaults(func=bench_writes)
+
+    stress = subparsers.add_parser('stress', help='parallel writers and readers consistency check')
+    stress.add_argument('--mode', default='json', choices=['json', 'segments'])
+    stress.add_argument('--writers', type=int, default=8)
+    stress.add_argument('--readers', type=int, default=4)
+    stress.add_argument('--records', type=int, default=200, help='logs per writer')
+    stress.add_argument('--write-behind', action='store_true')
+    stress.add_argument('--durability', default='flush', choices=['none', 'flush', 'fsync'])
+    stress.set_defaults(func=bench_stress)
+
+    formats = subparsers.add_parser('formats', help='record file size and parse time per format')
+    formats.add_argument('files', nargs='*', help='record files (default: data/*.json)')
+    formats.add_argument('--repeat', type=int, default=20)
+    formats.set_defaults(func=bench_formats)
+
+    search = subparsers.add_parser('search', help='full-text search latency')
+    search.add_argument('--records', type=int, default=100000)
+    search.add_argument('--repeat', type=int, default=10)
+    search.set_defaults(func=bench_search)
+
+    downsample_parser = subparsers.add_parser('downsample', help='system stats downsampling time and size')
+    downsample_parser.add_argument('--records', type=int, default=20160, help='30-second samples')
+    downsample_parser.add_argument('--points', type=int, default=500)
+    downsample_parser.add_argument('--repeat', type=int, default=10)
+    downsample_parser.set_defaults(func=bench_downsample)
+
+    bulk = subparsers.add_parser('bulk', help='NDJSON bulk ingestion throughput')
+    bulk.add_argument('--records', type=int, default=100000)
+    bulk.add_argument('--batch-size', type=int, default=500)
+    bulk.add_argument('--gzip', action='store_true')
+    bulk.add_argument('--mode', default='segments', choices=['json', 'segments'])
+    bulk.add_argument('--url', help='post to a running server instead of ingesting in process')
+    bulk.set_defaults(func=bench_bulk)
+
+    receiver = subparsers.add_parser('receiver', help='syslog/NDJSON receiver throughput over loopback')
+    receiver.add_argument('--proto', default='tcp', choices=['udp', 'tcp', 'json'])
+    receiver.add_argument('--lines', type=int, default=100000)
+    receiver.add_argument('--batch-size', type=int, default=500)
+    receiver.add_argument('--mode', default='segments', choices=['json', 'segments'])
+    receiver.add_argument('--rate', type=int, default=0,
+                          help='UDP lines/sec to send at (0 sends as fast as possible)')
+    receiver.add_argument('--udp-rcvbuf', type=int, default=UDP_RCVBUF_BYTES,
+                          help='UDP socket receive buffer in bytes (0 keeps the system default)')
+    receiver.set_defaults(func=bench_receiver)
+
+    tail = subparsers.add_parser('tail', help='file-tailing agent throughput')
+    tail.add_argument('--lines', type=int, default=100000, help='log records in the file')
+    tail.add_argument('--batch-size', type=int, default=500)
+    tail.add_argument('--mode', default='segments', choices=['json', 'segments'])
+    tail.set_defaults(func=bench_tail)
+
+    cache = subparsers.add_parser('cache', help='response cache hit ratio and latency under writes')
+    cache.add_argument('--threads', type=int, default=8)
+    cache.add_argument('--requests', type=int, default=2000, help='per thread')
+    cache.add_argument('--keys', type=int, default=4, help='distinct query strings')
+    cache.add_argument('--compute-ms', type=float, default=50, help='time to build one response')
+    cache.add_argument('--write-interval-ms', type=float, default=2000)
+    cache.set_defaults(func=bench_cache)
+
+    serve = subparsers.add_parser('serve', help='serve.py throughput with 1 vs. N worker processes')
+    serve.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    serve.add_argument('--clients', type=int, default=16, help='client processes, one connection each')
+    serve.add_argument('--duration', type=float, default=10, help='seconds per worker count')
+    serve.add_argument('--records', type=int, default=10000)
+    serve.add_argument('--path', action='append', help='request path; repeatable '
+                                                       '(default: /api/logs?limit=100 and /api/stats)')
+    serve.add_argument('--port', type=int, default=5099)
+    serve.set_defaults(func=bench_serve)
+
+    args = parser.parse_args()
+    if args.command == 'serve' and not args.path:
+        args.path = ['/api/logs?limit=100', '/api/stats']
+    sys.exit(args.func(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import threading
+import uuid
+from collections import deque
+from itertools import islice
+
+class ChangeEvent:
+    """One published change; `frame` caches its wire encoding for every listener"""
+    __slots__ = ('id', 'kind', 'data', 'frame')
+
+    def __init__(self, event_id, kind, data):
+        self.id = event_id
+        self.kind = kind
+        self.data = data
+        self.frame = None
+
+
+class ChangeFeed:
+    """In-process fan-out of storage changes to any number of listeners
+
+    Writers publish (kind, data) events into one bounded ring buffer, each
+    with the next sequence number. Listeners have no queue of their own:
+    each remembers the last id it has seen and waits on a shared condition
+    for newer ones, so publishing costs the same for 1 or 100 listeners.
+    A listener that falls further behind than the buffer holds is told it
+    missed events and has to reload.
+
+    Event ids sent to clients are prefixed with a per-process epoch, so an
+    id from before a restart is recognized as stale instead of matching an
+    unrelated event.
+    """
+
+    def __init__(self, capacity=1000):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=capacity)
+        self._last_id = 0
+        self._changed = threading.Condition()
+
+    @property
+    def last_id(self):
+        with self._changed:
+            return self._last_id
+
+    def publish(self, kind, data):
+        with self._changed:
+            self._last_id += 1
+            self._events.append(ChangeEvent(self._last_id, kind, data))
+            self._changed.notify_all()
+
+    def wait(self, after, timeout=None):
+        """Events with an id above `after`, waiting up to `timeout` seconds for one
+
+        Returns (events, missed). When `missed` is True, some events after
+        `after` are no longer buffered; no events are returned and the
+        listener should reload and continue from `last_id`.
+        """
+        with self._changed:
+            if after > self._last_id:
+                return [], True
+            if after == self._last_id:
+                self._changed.wait(timeout)
+                if after == self._last_id:
+                    return [], False
+            skip = after + 1 - self._events[0].id
+            if skip < 0:
+                return [], True
+            return list(islice(self._events, skip, None)), False
+
+    def event_id(self, event):
+        """The id sent to clients, e.g. as the SSE `id:` field"""
+        return f'{self.epoch}-{event.id}'
+
+    def parse_event_id(self, value):
+        """The sequence number of a client-sent event id, or None if it isn't from this process"""
+        epoch, _, number = (value or '').partition('-')
+        if epoch != self.epoch or not number.isdigit():
+            return None
+        return int(number)
+
+
+class StorageFollower:
+    """Publishes changes committed by other processes into a ChangeFeed
+
+    A web worker that doesn't run the writers itself calls `poll` every
+    second or so. It costs one version read per collection when nothing
+    changed; otherwise the new records come from get_delta and new
+    acknowledgements from get_acknowledged_alerts, and are published with
+    the same kinds and shapes the database managers use for their own
+    writes. A logs delta that can't be applied (the logs were cleared, or
+    more arrived than `limit`) is published as logs_cleared so listeners
+    reload.
+    """
+
+    COLLECTIONS = ('logs', 'alerts', 'system_stats')
+
+    def __init__(self, db, feed, limit=1000):
+        self.db = db
+        self.feed = feed
+        self.limit = limit
+        self._versions = {}
+        self._last_ids = {}
+        # Start from the current state; only later changes are published
+        for name in self.COLLECTIONS:
+            self._versions[name] = db.get_version(name)[0]
+            delta = db.get_delta(name, 0, limit=1)
+            self._last_ids[name] = delta['last_id'] if delta else 0
+        acknowledged = db.get_acknowledged_alerts('', limit=1)
+        self._acked_since = acknowledged[0]['acknowledged_at'] if acknowledged else ''
+
+    def poll(self):
+        for name in self.COLLECTIONS:
+            version = self.db.get_version(name)[0]
+            if version == self._versions[name]:
+                continue
+            delta = self.db.get_delta(name, self._last_ids[name], limit=self.limit)
+            if delta is None:
+                continue
+            self._versions[name] = version
+            self._last_ids[name] = delta['last_id']
+            if delta['reset'] and name == 'logs':
+                self.feed.publish('logs_cleared', {})
+            elif delta['items']:
+                self.feed.publish(name, delta['items'][::-1])
+            if name == 'alerts':
+                for alert in reversed(self.db.get_acknowledged_alerts(self._acked_since, limit=self.limit)):
+                    self._acked_since = alert['acknowledged_at']
+                    self.feed.publish('alert_update', {'id': alert['id'], 'acknowledged': True,
+                                                       'acknowledged_at': alert['acknowledged_at']})
@@ -0,0 +1,447 @@
+import bisect
+from itertools import chain
+from search_index import SearchIndex
+
+# Length of the ISO timestamp prefix that names a partition
+PARTITION_KEY_LENGTHS = {'day': 10, 'hour': 13}
+
+def partition_key(timestamp, granularity='day'):
+    """Partition key for an ISO timestamp: '2025-11-11' by day, '2025-11-11T23' by hour"""
+    length = PARTITION_KEY_LENGTHS[granularity]
+    key = (timestamp or '')[:length]
+    return key if len(key) == length else ''
+
+
+class RecordCollection:
+    """In-memory records, oldest first, with posting-list secondary indexes
+
+    Every indexed field maps each value to the ascending list of positions of
+    the records holding it. Newest-first filtered queries walk a posting list
+    backwards, so a limited query costs O(limit) instead of O(N). Positions are
+    absolute: trimming old records advances ``base`` instead of renumbering.
+    A hash index from record id to position serves primary-key lookups.
+
+    Lists are only ever appended to in place; trimming and posting-list edits
+    build new lists, so a ``snapshot()`` taken earlier keeps a stable view.
+    With ``search_fields`` the text of those fields is kept in a SearchIndex.
+
+    Time ranges are served from a running maximum of timestamps by position,
+    which is sorted even when records arrive slightly out of order and can be
+    binary-searched. Records older than the running maximum when appended are
+    remembered as "late" positions and checked individually.
+    """
+
+    def __init__(self, records=(), index_fields=(), max_records=None, search_fields=()):
+        self.index_fields = tuple(index_fields)
+        self.max_records = max_records
+        self.records = []
+        self.base = 0
+        self._indexes = {field: {} for field in self.index_fields}
+        self._positions = {}
+        self._max_times = []  # running maximum timestamp, one per position
+        self._late = []  # positions whose timestamp is below the running maximum
+        self.max_id = 0
+        self.search_index = SearchIndex(search_fields) if search_fields else None
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def append(self, record):
+        """Add a record as the newest entry and return its position"""
+        position = self.base + len(self.records)
+        self.records.append(record)
+        self._positions[record.get('id')] = position
+        if isinstance(record.get('id'), int) and record['id'] > self.max_id:
+            self.max_id = record['id']
+        for field in self.index_fields:
+            self._indexes[field].setdefault(record.get(field), []).append(position)
+        if self.search_index is not None:
+            self.search_index.add(record)
+        timestamp = record.get('timestamp') or ''
+        if self._max_times and timestamp < self._max_times[-1]:
+            self._max_times.append(self._max_times[-1])
+            self._late.append(position)
+        else:
+            self._max_times.append(timestamp)
+
+        if self.max_records and len(self.records) > self.max_records:
+            self.trim(len(self.records) - self.max_records)
+        return position
+
+    def get(self, position):
+        """Get the record at an absolute position"""
+        return self.records[position - self.base]
+
+    def position_of(self, record_id):
+        """Get the position of the record with the given id, or None"""
+        return self._positions.get(record_id)
+
+    def find(self, record_id):
+        """Get the record with the given id, or None"""
+        position = self._positions.get(record_id)
+        return None if position is None else self.get(position)
+
+    def update(self, record_id, fields):
+        """Replace a record with an updated copy and return it, or None if missing"""
+        position = self._positions.get(record_id)
+        if position is None:
+            return None
+        record = {**self.get(position), **fields}
+        self.replace(position, record)
+        return record
+
+    def replace(self, position, record):
+        """Swap a record for an updated copy and keep the indexes in step"""
+        old = self.get(position)
+        self.records[position - self.base] = record
+        for field in self.index_fields:
+            old_value, new_value = old.get(field), record.get(field)
+            if old_value != new_value:
+                self._remove_posting(field, old_value, position)
+                postings = self._indexes[field].get(new_value, [])
+                i = bisect.bisect_left(postings, position)
+                self._indexes[field][new_value] = postings[:i] + [position] + postings[i:]
+
+    def _remove_posting(self, field, value, position):
+        postings = self._indexes[field].get(value)
+        if not postings:
+            return
+        i = bisect.bisect_left(postings, position)
+        if i < len(postings) and postings[i] == position:
+            postings = postings[:i] + postings[i + 1:]
+        if postings:
+            self._indexes[field][value] = postings
+        else:
+            del self._indexes[field][value]
+
+    def trim(self, count):
+        """Drop the `count` oldest records"""
+        count = min(count, len(self.records))
+        if count <= 0:
+            return
+        for position, record in enumerate(self.records[:count], self.base):
+            # Ids can repeat in legacy data; only forget the id if it still points here
+            if self._positions.get(record.get('id')) == position:
+                del self._positions[record.get('id')]
+        if self.search_index is not None:
+            self.search_index.remove_many(self.records[:count])
+        self.records = self.records[count:]
+        self._max_times = self._max_times[count:]
+        self.base += count
+        self._late = self._late[bisect.bisect_left(self._late, self.base):]
+        for field, index in self._indexes.items():
+            for value in list(index):
+                postings = index[value][bisect.bisect_left(index[value], self.base):]
+                if postings:
+                    index[value] = postings
+                else:
+                    del index[value]
+
+    def clear(self):
+        """Remove every record"""
+        self.base += len(self.records)
+        self.records = []
+        self._indexes = {field: {} for field in self.index_fields}
+        self._positions = {}
+        self._max_times = []
+        self._late = []
+        self.max_id = 0
+        if self.search_index is not None:
+            self.search_index.clear()
+
+    def counts(self, field):
+        """Number of records per value of an indexed field, from posting-list sizes"""
+        return {value: len(postings) for value, postings in self._indexes[field].items()}
+
+    def snapshot(self, since=None, until=None):
+        """Capture a read-only view of the current records
+
+        The bounds are accepted for parity with PartitionedCollection.
+        """
+        return CollectionSnapshot(self.records, self.base, self.base + len(self.records),
+                                  {field: dict(index) for field, index in self._indexes.items()},
+                                  self._positions, self._max_times, self._late)
+
+    def newest(self, since=None, until=None, before=None, **filters):
+        """Iterate records newest first, keeping those equal to every filter value"""
+        return self.snapshot().newest(since=since, until=until, before=before, **filters)
+
+
+class CollectionSnapshot:
+    """Point-in-time view of a RecordCollection
+
+    Holds the record list, position range and posting lists as they were when
+    the snapshot was taken. Later appends fall outside ``end`` and later trims
+    build new lists, so iterating never sees partial writes. Records are
+    replaced rather than mutated, so an update shows up as the newer copy.
+    """
+
+    def __init__(self, records, base, end, indexes, positions, max_times, late):
+        self.records = records
+        self.base = base
+        self.end = end
+        self._indexes = indexes
+        self._positions = positions
+        self._max_times = max_times
+        self._late = late
+
+    def __len__(self):
+        return self.end - self.base
+
+    def find(self, record_id):
+        """Get the record with the given id if it is part of the snapshot"""
+        position = self._positions.get(record_id)
+        if position is None or not self.base <= position < self.end:
+            return None
+        record = self.records[position - self.base]
+        return record if record.get('id') == record_id else None
+
+    def seek(self, record_id):
+        """Position just past the record with `record_id` in newest-first order
+
+        Uses the id index, and falls back to a binary search on ids (which
+        grow with position) once the record itself is gone.
+        """
+        position = self._positions.get(record_id)
+        if position is not None and self.base <= position < self.end:
+            if self.records[position - self.base].get('id') == record_id:
+                return position
+        lo, hi = 0, self.end - self.base
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if (self.records[mid].get('id') or 0) < record_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self.base + lo
+
+    def newest(self, since=None, until=None, before=None, **filters):
+        """Iterate records newest first, keeping those equal to every filter value
+
+        `since`/`until` bound the ISO timestamp (inclusive) when given; the
+        matching positions are found by binary search, not by scanning.
+        `before` is a record id: iteration starts just after that record, so
+        a page deep in the collection costs the same as the first one.
+        """
+        records, base = self.records, self.base
+        end = self.end if before is None else self.seek(before)
+        lo, hi = base, end
+        late = []
+        if since or until:
+            # In-order records inside the window form one run of positions
+            count = end - base
+            if since:
+                lo = base + bisect.bisect_left(self._max_times, since, 0, count)
+            if until:
+                hi = base + bisect.bisect_right(self._max_times, until, 0, count)
+            # Late records after the run can still fall inside the window
+            start = bisect.bisect_left(self._late, max(lo, hi))
+            late = self._late[start:bisect.bisect_left(self._late, end)]
+
+        indexed = [self._indexes[field].get(value, []) for field, value in filters.items()
+                   if field in self._indexes]
+        if indexed:
+            # Drive the scan from the most selective posting list
+            postings = min(indexed, key=len)
+            first, stop = bisect.bisect_left(postings, lo), bisect.bisect_left(postings, hi)
+            in_range = (postings[i] for i in range(stop - 1, first - 1, -1))
+        else:
+            in_range = range(hi - 1, lo - 1, -1)
+
+        for position in chain(reversed(late), in_range):
+            record = records[position - base]
+            if since or until:
+                timestamp = record.get('timestamp') or ''
+                if (since and timestamp < since) or (until and timestamp > until):
+                    continue
+            if all(record.get(field) == value for field, value in filters.items()):
+                yield record
+
+    def after(self, record_id, **filters):
+        """Iterate records with an id above `record_id`, newest first
+
+        Ids grow with position, so this stops at the first older record and
+        costs only as much as the number of newer ones.
+        """
+        records, base = self.records, self.base
+        for position in range(self.end - 1, base - 1, -1):
+            record = records[position - base]
+            if (record.get('id') or 0) <= record_id:
+                break
+            if all(record.get(field) == value for field, value in filters.items()):
+                yield record
+
+
+class PartitionedCollection:
+    """Records split into time partitions, each an indexed RecordCollection
+
+    Partitions are keyed by a timestamp prefix (day or hour) and iterated
+    newest partition first, so queries over a recent window only touch the
+    partitions that overlap it and a whole partition can be dropped at once.
+    Running per-value counts of the indexed fields are kept across partitions
+    so aggregate counts never need a scan.
+    """
+
+    def __init__(self, records=(), index_fields=(), granularity='day', search_fields=()):
+        self.index_fields = tuple(index_fields)
+        self.granularity = granularity
+        self.partitions = {}
+        self._keys = []  # sorted partition keys
+        self._locations = {}  # record id -> partition key
+        self._count = 0
+        self._counts = {field: {} for field in self.index_fields}
+        self.max_id = 0
+        # One text index across partitions so ranking sees collection-wide statistics
+        self.search_index = SearchIndex(search_fields) if search_fields else None
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return chain.from_iterable(self.partitions[key] for key in list(self._keys))
+
+    def partition_key(self, record):
+        return partition_key(record.get('timestamp'), self.granularity)
+
+    def keys(self):
+        """Partition keys, oldest first"""
+        return list(self._keys)
+
+    def append(self, record):
+        """Add a record to its partition and return the partition key"""
+        key = self.partition_key(record)
+        partition = self.partitions.get(key)
+        if partition is None:
+            partition = RecordCollection(index_fields=self.index_fields)
+            self.partitions[key] = partition
+            bisect.insort(self._keys, key)
+        partition.append(record)
+        self._locations[record.get('id')] = key
+        self._count += 1
+        for field in self.index_fields:
+            self._add_count(field, record.get(field), 1)
+        if self.search_index is not None:
+            self.search_index.add(record)
+        if isinstance(record.get('id'), int) and record['id'] > self.max_id:
+            self.max_id = record['id']
+        return key
+
+    def _add_count(self, field, value, delta):
+        counts = self._counts[field]
+        counts[value] = counts.get(value, 0) + delta
+        if counts[value] <= 0:
+            del counts[value]
+
+    def counts(self, field):
+        """Number of records per value of an indexed field"""
+        return dict(self._counts[field])
+
+    def find(self, record_id):
+        """Get the record with the given id, or None"""
+        key = self._locations.get(record_id)
+        return None if key is None else self.partitions[key].find(record_id)
+
+    def update(self, record_id, fields):
+        """Replace a record with an updated copy and return it, or None if missing"""
+        key = self._locations.get(record_id)
+        if key is None:
+            return None
+        old = self.partitions[key].find(record_id)
+        record = self.partitions[key].update(record_id, fields)
+        for field in self.index_fields:
+            if old.get(field) != record.get(field):
+                self._add_count(field, old.get(field), -1)
+                self._add_count(field, record.get(field), 1)
+        return record
+
+    def drop_partition(self, key):
+        """Remove a whole partition and return how many records it held"""
+        partition = self.partitions.pop(key, None)
+        if partition is None:
+            return 0
+        self._keys.remove(key)
+        for record in partition:
+            if self._locations.get(record.get('id')) == key:
+                del self._locations[record.get('id')]
+        if self.search_index is not None:
+            self.search_index.remove_many(partition)
+        for field in self.index_fields:
+            for value, count in partition.counts(field).items():
+                self._add_count(field, value, -count)
+        self._count -= len(partition)
+        return len(partition)
+
+    def clear(self):
+        """Remove every record"""
+        self.partitions = {}
+        self._keys = []
+        self._locations = {}
+        self._count = 0
+        self._counts = {field: {} for field in self.index_fields}
+        self.max_id = 0
+        if self.search_index is not None:
+            self.search_index.clear()
+
+    def _keys_between(self, since=None, until=None):
+        """Partition keys that can hold timestamps in [since, until], newest first"""
+        lo = bisect.bisect_left(self._keys, partition_key(since, self.granularity)) if since else 0
+        hi = bisect.bisect_right(self._keys, until[:PARTITION_KEY_LENGTHS[self.granularity]]) if until else len(self._keys)
+        return list(reversed(self._keys[lo:hi]))
+
+    def snapshot(self, since=None, until=None):
+        """Capture a read-only view of the partitions overlapping [since, until]"""
+        return PartitionedSnapshot([(key, self.partitions[key].snapshot())
+                                    for key in self._keys_between(since, until)],
+                                   self.granularity, self._locations)
+
+    def newest(self, since=None, until=None, before=None, **filters):
+        """Iterate records newest first, skipping partitions outside [since, until]"""
+        return self.snapshot(since, until).newest(since=since, until=until, before=before, **filters)
+
+
+class PartitionedSnapshot:
+    """Point-in-time view of a PartitionedCollection, newest partition first"""
+
+    def __init__(self, partitions, granularity='day', locations=None):
+        self.partitions = partitions
+        self.granularity = granularity
+        self._by_key = dict(partitions)
+        self._locations = locations or {}
+
+    def __len__(self):
+        return sum(len(partition) for _, partition in self.partitions)
+
+    def find(self, record_id):
+        """Get the record with the given id if it is part of the snapshot"""
+        partition = self._by_key.get(self._locations.get(record_id))
+        return None if partition is None else partition.find(record_id)
+
+    def newest(self, since=None, until=None, before=None, **filters):
+        """Iterate records newest first across the captured partitions
+
+        `before` is a (timestamp, id) pair: partitions newer than the
+        timestamp's partition are skipped and that partition is entered just
+        after the id.
+        """
+        before_key = None if before is None else partition_key(before[0], self.granularity)
+        for key, partition in self.partitions:
+            if before_key is not None and key > before_key:
+                continue
+            record_id = before[1] if key == before_key else None
+            yield from partition.newest(since=since, until=until, before=record_id, **filters)
+
+    def after(self, record_id, **filters):
+        """Iterate records with an id above `record_id` across the captured partitions
+
+        Late records land in older partitions with new ids, so every
+        partition is checked rather than stopping at the first old record.
+        """
+        for _, partition in self.partitions:
+            yield from partition.after(record_id, **filters)
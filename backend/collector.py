@@ -0,0 +1,187 @@
+"""Background work of the dashboard
+
+Usage:
+    DB_ENGINE=sqlite python collector.py
+    python collector.py --init
+
+Samples system stats (raising system alerts) every 30 seconds, generates
+demo logs, runs the optional syslog/NDJSON receivers (RECEIVER_*_PORT) and
+file tailing (TAIL_FILES), and compacts storage. By default app.py runs all
+of this inside the web process (COLLECTOR=embedded). To serve with several
+web workers, run one collector on its own and start the workers with
+COLLECTOR=external, so each loop runs exactly once; serve.py does both.
+`--init` creates the storage and exits.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from database import get_db_manager
+from system_monitor import SystemMonitor
+
+SYSTEM_STATS_INTERVAL = 30
+# Seconds between generated demo logs
+LOG_INTERVAL = (5, 15)
+# Marks that the demo logs were stored, and holds a copy of them
+SAMPLE_LOGS_FILE = os.path.join('logs', 'sample_logs.json')
+
+LOG_TYPES = ['INFO', 'WARNING', 'ERROR', 'CRITICAL']
+SERVICES = ['auth-service', 'user-service', 'payment-service', 'api-gateway']
+MESSAGES = [
+    'Application started successfully',
+    'Database connection established',
+    'Failed to connect to database',
+    'User authentication failed',
+    'Payment processing error',
+    'Memory usage exceeds threshold',
+    'CPU usage high',
+    'Network timeout',
+    'Invalid request parameters',
+    'Unauthorized access attempt'
+]
+STACK_TRACE = ("Exception in thread \"main\" java.lang.NullPointerException\n"
+               "    at com.example.myproject.Book.getTitle(Book.java:16)\n"
+               "    at com.example.myproject.Author.getBookTitles(Author.java:25)\n"
+               "    at com.example.myproject.Bootstrap.main(Bootstrap.java:14)")
+
+def generate_alerts(db, log_entries):
+    """Store alerts for the critical or error logs of a batch with one write"""
+    new_alerts = [{
+        'timestamp': datetime.datetime.now().isoformat(),
+        'type': 'system',
+        'message': f"Alert: {log_entry['message']}",
+        'severity': log_entry['severity'],
+        'data': {
+            'log_id': log_entry['id'],
+            'service': log_entry['service'],
+            'is_read': False
+        },
+        'acknowledged': False
+    } for log_entry in log_entries if log_entry['severity'] in ['ERROR', 'CRITICAL']]
+    if new_alerts:
+        db.add_alerts(new_alerts)
+    return new_alerts
+
+def random_log(timestamp, details):
+    """A demo log entry; the database assigns its id when it is stored"""
+    severity = random.choice(LOG_TYPES)
+    log_entry = {
+        'timestamp': timestamp,
+        'severity': severity,
+        'service': random.choice(SERVICES),
+        'message': random.choice(MESSAGES),
+        'details': details
+    }
+    # Add stack trace for errors
+    if severity in ['ERROR', 'CRITICAL']:
+        log_entry['stack_trace'] = STACK_TRACE
+    return log_entry
+
+def seed_sample_logs(db):
+    """Store 50 demo logs from the past week, once per installation"""
+    if os.path.exists(SAMPLE_LOGS_FILE):
+        return
+    now = datetime.datetime.now()
+    timestamps = sorted((now - datetime.timedelta(
+        days=random.randint(0, 7),
+        hours=random.randint(0, 23),
+        minutes=random.randint(0, 59),
+        seconds=random.randint(0, 59)
+    )).isoformat() for _ in range(50))
+    # Oldest first, so ids grow with time
+    entries = db.add_logs([random_log(timestamp, f'Log details for event {i + 1}')
+                           for i, timestamp in enumerate(timestamps)])
+    os.makedirs(os.path.dirname(SAMPLE_LOGS_FILE), exist_ok=True)
+    with open(SAMPLE_LOGS_FILE, 'w') as f:
+        json.dump(entries[::-1], f, separators=(',', ':'))
+
+def monitor_system(db, monitor):
+    """Store a system stat sample, and alerts for its thresholds, every SYSTEM_STATS_INTERVAL"""
+    while True:
+        try:
+            # Alerts were checked, and kept in monitor.alerts, when the sample was taken
+            stats, threshold_alerts = monitor.get_latest_sample()
+            db.add_system_stat(stats)
+            alerts = [{
+                'timestamp': alert.get('timestamp'),
+                'type': 'system',
+                'message': alert.get('message'),
+                'severity': alert.get('severity', 'WARNING'),
+                'data': {'source': alert.get('type')},
+                'acknowledged': False
+            } for alert in threshold_alerts]
+            if alerts:
+                db.add_alerts(alerts)
+        except Exception as e:
+            print(f"Error monitoring system: {e}")
+        time.sleep(SYSTEM_STATS_INTERVAL)
+
+def log_generator(db):
+    """Store a demo log, and its alert, every few seconds"""
+    while True:
+        time.sleep(random.randint(*LOG_INTERVAL))
+        try:
+            timestamp = datetime.datetime.now().isoformat()
+            new_log = db.add_log(random_log(timestamp, f'Log details for event generated at {timestamp}'))
+            if new_log is not None:
+                generate_alerts(db, [new_log])
+        except Exception as e:
+            print(f"Error generating log: {e}")
+
+def start(db, monitor=None):
+    """Start every background loop in daemon threads of this process"""
+    seed_sample_logs(db)
+    monitor = monitor or SystemMonitor()
+    monitor.start_sampler()
+    threading.Thread(target=monitor_system, args=(db, monitor), daemon=True, name='system-monitor').start()
+    threading.Thread(target=log_generator, args=(db,), daemon=True, name='log-generator').start()
+    db.start_compactor()
+
+    # Optional syslog/NDJSON network receivers
+    receiver_ports = {option: int(os.environ[name]) for option, name in
+                      (('udp_port', 'RECEIVER_UDP_PORT'), ('tcp_port', 'RECEIVER_TCP_PORT'),
+                       ('json_port', 'RECEIVER_JSON_PORT')) if os.environ.get(name)}
+    if receiver_ports:
+        from receiver import start_in_thread
+        if os.environ.get('RECEIVER_UDP_RCVBUF'):
+            receiver_ports['udp_rcvbuf'] = int(os.environ['RECEIVER_UDP_RCVBUF'])
+        _, bound_ports = start_in_thread(db, host=os.environ.get('RECEIVER_HOST', '0.0.0.0'), **receiver_ports)
+        print(f"Log receiver listening on {bound_ports}")
+
+    # Optional file tailing (os.pathsep-separated globs)
+    tail_paths = [path for path in os.environ.get('TAIL_FILES', '').split(os.pathsep) if path]
+    if tail_paths:
+        from tailer import start_in_thread as start_tailer
+        start_tailer(db, tail_paths)
+        print(f"Tailing {tail_paths}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the monitoring, demo log and ingestion loops')
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--init', action='store_true', help='create the storage and exit')
+    args = parser.parse_args()
+
+    db = get_db_manager(args.data_dir)
+    if args.init:
+        db.close()
+        return
+    # Stopped by the serve script with SIGTERM; exiting normally flushes writes
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    start(db)
+    print('Collector running')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
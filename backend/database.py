@@ -1,12 +1,182 @@
+import atexit
+import base64
 import json
 import os
-from datetime import datetime
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from change_feed import ChangeFeed
+from collection import PartitionedCollection, RecordCollection, partition_key
+from record_format import DEFAULT_FILE_FORMAT, encode_records, load_records, parse_file_formats
+from rollups import RollupStore
+from segment_store import PartitionedSegmentStore, SegmentStore
+from sequences import SequenceAllocator
+from write_queue import DURABILITY_LEVELS, WriteBehindQueue
 
-class JSONDatabaseManager:
-    """Simple JSON-based database manager for lightweight storage"""
+STORAGE_MODES = ('json', 'segments')
+# System stats are kept this long, so week-range queries see a full week
+SYSTEM_STATS_RETENTION_DAYS = 8
+
+# Text fields covered by full-text log search
+LOG_SEARCH_FIELDS = ('message', 'details', 'stack_trace')
+
+# Per-collection settings: backing JSON file, indexed fields, full-text
+# fields, size cap and whether the collection is split into time partitions
+# (partitions are what retention drops)
+COLLECTIONS = {
+    'logs': {'file': 'logs.json', 'index_fields': ('severity', 'service'),
+             'search_fields': LOG_SEARCH_FIELDS, 'max_records': None, 'partitioned': True},
+    'alerts': {'file': 'alerts.json', 'index_fields': ('acknowledged',),
+               'search_fields': (), 'max_records': None, 'partitioned': True},
+    'system_stats': {'file': 'system_stats.json', 'index_fields': (),
+                     'search_fields': (), 'max_records': None, 'partitioned': True},
+}
+
+def make_log_entry(log_data):
+    """Normalize incoming log data to the stored log schema (without id)"""
+    return {
+        'timestamp': log_data['timestamp'] if 'timestamp' in log_data else datetime.now().isoformat(),
+        'severity': log_data.get('severity', 'INFO'),
+        'service': log_data.get('service', 'unknown'),
+        'message': log_data.get('message', ''),
+        'details': log_data.get('details', ''),
+        'stack_trace': log_data.get('stack_trace', '')
+    }
+
+def make_stat_entry(stat_data):
+    """Normalize incoming system stats to the stored schema (without id)"""
+    return {
+        'timestamp': stat_data['timestamp'] if 'timestamp' in stat_data else datetime.now().isoformat(),
+        'cpu_percent': stat_data.get('cpu_percent', 0),
+        'memory_percent': stat_data.get('memory_percent', 0),
+        'disk_percent': stat_data.get('disk_percent', 0),
+        'memory_total_gb': stat_data.get('memory_total_gb', 0),
+        'memory_used_gb': stat_data.get('memory_used_gb', 0)
+    }
+
+def make_alert_entry(alert_data):
+    """Normalize incoming alert data to the stored alert schema (without id)"""
+    return {
+        'timestamp': alert_data['timestamp'] if 'timestamp' in alert_data else datetime.now().isoformat(),
+        'type': alert_data.get('type', 'system'),
+        'message': alert_data.get('message', ''),
+        'severity': alert_data.get('severity', 'WARNING'),
+        'data': alert_data.get('data', {}),
+        'acknowledged': alert_data.get('acknowledged', False),
+        'acknowledged_at': alert_data.get('acknowledged_at')
+    }
+
+def run_periodically(func, interval, description):
+    """Call func every `interval` seconds in a daemon thread, logging failures"""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                func()
+            except Exception as e:
+                print(f"Error {description}: {e}")
     
-    def __init__(self, data_dir='data'):
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+def encode_cursor(record):
+    """Opaque keyset cursor for the page after `record` (newest-first order)"""
+    raw = json.dumps([record.get('timestamp'), record.get('id')], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Turn a cursor back into a (timestamp, id) pair; ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, record_id = json.loads(raw)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(record_id, int) or not isinstance(timestamp, (str, type(None))):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return timestamp, record_id
+
+def retention_cutoff(retention_days):
+    """ISO timestamp before which records fall outside the retention window"""
+    return (datetime.now() - timedelta(days=retention_days)).isoformat()
+
+def shortest_retention(*retention_days):
+    """The shortest of several retention windows in days, None if none is set"""
+    windows = [days for days in retention_days if days is not None]
+    return min(windows) if windows else None
+
+class JSONDatabaseManager:
+    """Simple JSON-based database manager for lightweight storage
+
+    ``storage_mode='json'`` keeps each collection in a single JSON array file
+    that is rewritten on every write. ``storage_mode='segments'`` appends
+    records to rolling JSONL segment files under ``data_dir/segments`` and
+    rebuilds the in-memory state from them on startup, so a write costs the
+    same no matter how much history is stored.
+
+    In both modes reads are served from an in-memory ``RecordCollection``
+    that keeps secondary indexes on severity, service and acknowledged state.
+    In JSON mode the collection is rebuilt when the file's mtime/size changes
+    from outside, checked at most once every ``cache_check_interval`` seconds.
+
+    Logs, alerts and system stats are split into day (or hour) partitions.
+    Retention by age (``retention_days``, and ``stats_retention_days`` for
+    system stats) and by size (``retention_max_bytes``) drops whole
+    partitions, and ``start_compactor`` runs retention plus segment compaction
+    in a background thread.
+
+    Every change to persisted data is expressed as a storage op ('append',
+    'update', 'clear', 'drop'). With ``write_behind=True`` ops go
+    through a group-commit ``WriteBehindQueue`` that applies them in order,
+    one write per touched file per flush; ``durability`` decides whether a
+    call returns once queued ('none'), written ('flush') or fsynced ('fsync').
+
+    Writers are serialized by ``_write_lock``. In-memory changes additionally
+    take the short ``_state_lock``, which readers hold only long enough to
+    take a collection snapshot; the query itself runs on the snapshot, so
+    readers never wait for file I/O and never see a half-applied write. JSON
+    files are replaced atomically with a temp file and a rename.
+
+    ``file_formats`` picks the on-disk encoding of each JSON-mode collection
+    ('pretty', 'compact' or 'dict', see record_format); files in any of them
+    are read back transparently.
+
+    Ids come from one ``SequenceAllocator`` per data directory
+    (``sequences.json``) and are never reused, even after a reset. They are
+    assigned when a record is inserted, under the write lock, so they grow
+    in insertion order, which get_delta relies on.
+
+    Inserted logs are also counted into per-minute/hour/day ``rollups``
+    (see rollups.RollupStore), saved to ``rollups.json`` by ``compact``.
+
+    Inserts, alert acknowledgements and log resets made through this
+    manager are published to ``changes`` (see change_feed.ChangeFeed) as
+    they happen, for live views such as the /api/stream endpoint.
+    """
+
+    def __init__(self, data_dir='data', storage_mode='json', segment_max_records=10000,
+                 cache_check_interval=1.0, partition_granularity='day',
+                 retention_days=None, retention_max_bytes=None,
+                 stats_retention_days=SYSTEM_STATS_RETENTION_DAYS,
+                 write_behind=False, flush_interval_ms=10, flush_max_records=500,
+                 durability='flush', file_formats=None):
+        if storage_mode not in STORAGE_MODES:
+            raise ValueError(f"Unknown storage mode: {storage_mode}")
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability level: {durability}")
+        
         self.data_dir = data_dir
+        self.storage_mode = storage_mode
+        self.partition_granularity = partition_granularity
+        self.retention_days = retention_days
+        self.retention_max_bytes = retention_max_bytes
+        self.stats_retention_days = stats_retention_days
+        self.durability = durability
+        self.file_formats = {name: DEFAULT_FILE_FORMAT for name in COLLECTIONS}
+        self.file_formats.update(file_formats or {})
         self.logs_file = os.path.join(data_dir, 'logs.json')
         self.stats_file = os.path.join(data_dir, 'system_stats.json')
         self.alerts_file = os.path.join(data_dir, 'alerts.json')
@@ -15,67 +185,552 @@ class JSONDatabaseManager:
         # Create data directory if it doesn't exist
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
+        
+        # Read cache for JSON mode: name -> {'signature', 'checked_at'}
+        self.cache_check_interval = cache_check_interval
+        self._read_cache = {}
+        self._cache_hits = 0
+        self._cache_misses = 0
+        
+        # Serializes writers, including the background compactor
+        self._write_lock = threading.RLock()
+        # Guards in-memory collections while they change or are snapshotted
+        self._state_lock = threading.RLock()
+        self._compactor_thread = None
+        
+        # Change counters per collection, for HTTP validators; they start at
+        # a random value so a restart doesn't repeat the previous ones
+        self._versions = {name: random.randrange(1 << 31) for name in COLLECTIONS}
+        self._modified = {name: time.time() for name in COLLECTIONS}
+        
+        self._collections = {}
+        self._segment_stores = {}
+        if self.storage_mode == 'segments':
+            self._open_segments(segment_max_records)
+        
+        # Never hand out an id that is already stored
+        self.sequences = SequenceAllocator(os.path.join(data_dir, 'sequences.json'))
+        for name in COLLECTIONS:
+            self.sequences.observe(name, self._get_collection(name).max_id)
+        
+        # Count any logs stored since the rollups were last saved
+        self.rollups = RollupStore(os.path.join(data_dir, 'rollups.json'))
+        self.rollups.catch_up(self._get_collection('logs'))
+        
+        # Inserted records and alert/log changes, for live listeners
+        self.changes = ChangeFeed()
+        
+        self._write_queue = None
+        if write_behind:
+            self._write_queue = WriteBehindQueue(self._apply_ops,
+                                                 flush_interval_ms=flush_interval_ms,
+                                                 max_batch=flush_max_records,
+                                                 durability=durability)
+            # Don't lose queued writes on a normal interpreter exit
+            atexit.register(self.close)
+    
+    def _collection_file(self, name):
+        return os.path.join(self.data_dir, COLLECTIONS[name]['file'])
+    
+    def _partition_key(self, record):
+        return partition_key(record.get('timestamp'), self.partition_granularity)
+    
+    def _new_collection(self, name, records):
+        """Build an indexed in-memory collection from oldest-first records"""
+        settings = COLLECTIONS[name]
+        if settings['partitioned']:
+            return PartitionedCollection(records, index_fields=settings['index_fields'],
+                                         granularity=self.partition_granularity,
+                                         search_fields=settings['search_fields'])
+        return RecordCollection(records, index_fields=settings['index_fields'],
+                                max_records=settings['max_records'],
+                                search_fields=settings['search_fields'])
+    
+    def _open_segments(self, segment_max_records):
+        """Open segment stores and rebuild in-memory collections from them"""
+        segments_dir = os.path.join(self.data_dir, 'segments')
+        for name, settings in COLLECTIONS.items():
+            directory = os.path.join(segments_dir, name)
+            if settings['partitioned']:
+                store = PartitionedSegmentStore(directory, self._partition_key,
+                                                segment_max_records=segment_max_records)
+                initialized = store.initialized
+            else:
+                store = SegmentStore(directory, segment_max_records=segment_max_records,
+                                     retain_records=settings['max_records'])
+                initialized = store.has_data()
+            
+            # First start in segment mode: import the existing JSON file once
+            if not initialized:
+                for record in reversed(self._load_json_data(self._collection_file(name))):
+                    store.append(record)
+            
+            self._segment_stores[name] = store
+            self._collections[name] = self._new_collection(name, store.load())
+    
+    def _file_signature(self, filename):
+        """Identify the current version of a file by inode, mtime and size"""
+        try:
+            st = os.stat(filename)
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+    
+    def _get_collection(self, name):
+        """Get the in-memory collection, reloading the JSON file if it changed"""
+        if self.storage_mode == 'segments':
+            return self._collections[name]
+        
+        now = time.monotonic()
+        cached = self._read_cache.get(name)
+        if cached and now - cached['checked_at'] < self.cache_check_interval:
+            self._cache_hits += 1
+            return self._collections[name]
+        
+        filename = self._collection_file(name)
+        # Checked under the state lock so our own rename can't look like an outside change
+        with self._state_lock:
+            cached = self._read_cache.get(name)
+            signature = self._file_signature(filename)
+            if cached and cached['signature'] == signature:
+                cached['checked_at'] = now
+                self._cache_hits += 1
+                return self._collections[name]
+            
+            # Files are stored newest-first; collections are kept oldest-first
+            self._cache_misses += 1
+            try:
+                records = self._read_json_file(filename)
+            except (OSError, ValueError) as e:
+                # Keep serving what we have rather than replacing it with nothing
+                print(f"Error reloading {filename}: {e}")
+                if name in self._collections:
+                    return self._collections[name]
+                records = []
+            self._collections[name] = self._new_collection(name, reversed(records))
+            self._read_cache[name] = {'signature': signature, 'checked_at': now}
+            self._changed(name)
+            return self._collections[name]
+    
+    def _changed(self, name):
+        """Record a change to a collection; called with the state lock held"""
+        self._versions[name] += 1
+        self._modified[name] = time.time()
+    
+    def get_version(self, name):
+        """(version, modified) of a collection: a counter that moves on every change, and its time"""
+        # Notices changes made to the JSON file from outside
+        self._get_collection(name)
+        with self._state_lock:
+            return self._versions[name], self._modified[name]
+    
+    def get_delta(self, name, since_id, limit=100, **filters):
+        """Records of a collection added after `since_id`, newest first
+
+        Returns {'items', 'last_id', 'reset'}. `last_id` is the collection's
+        highest id, to send back as the next `since_id`. `reset` is set when
+        the delta can't be applied on top of what the caller holds (the
+        `since_id` record is gone, e.g. after a clear, or there are more than
+        `limit` new records); `items` is then the newest page instead.
+        """
+        try:
+            collection = self._get_collection(name)
+            with self._state_lock:
+                snapshot = collection.snapshot()
+                last_id = collection.max_id
+            filters = {field: value for field, value in filters.items() if value is not None}
+            items = list(islice(snapshot.after(since_id, **filters), limit + 1))
+            reset = (since_id > last_id or len(items) > limit
+                     or (since_id > 0 and snapshot.find(since_id) is None))
+            if reset:
+                items = list(islice(snapshot.newest(**filters), limit))
+            return {'items': items, 'last_id': last_id, 'reset': reset}
+        except Exception as e:
+            print(f"Error getting {name} delta: {e}")
+            return None
+    
+    def _snapshot(self, name, since=None, until=None):
+        """Take a read-only view of a collection for a query"""
+        collection = self._get_collection(name)
+        with self._state_lock:
+            return collection.snapshot(since, until)
+    
+    def _persist_collection(self, name, fsync=False):
+        """Rewrite the JSON file for a collection after an in-memory change
+
+        Raises OSError if the file could not be written.
+        """
+        filename = self._collection_file(name)
+        data = list(self._snapshot(name).newest())
+        temp_name = self._write_temp_json(filename, data, fsync=fsync,
+                                          file_format=self.file_formats[name])
+        if temp_name is None:
+            raise OSError(f"Could not write {filename}")
+        with self._state_lock:
+            try:
+                os.replace(temp_name, filename)
+            except OSError:
+                os.unlink(temp_name)
+                raise
+            # Our own write refreshes the cache instead of invalidating it
+            self._read_cache[name] = {
+                'signature': self._file_signature(filename),
+                'checked_at': time.monotonic()
+            }
+        return True
+    
+    def _insert(self, name, fields):
+        """Insert a new entry at the head of a collection and return it"""
+        return self._insert_many(name, [fields])[0]
+    
+    def _insert_many(self, name, fields_list):
+        """Insert a batch of entries with a single write and return them with their ids"""
+        with self._write_lock:
+            collection = self._get_collection(name)
+            # The file may have been reloaded with ids from elsewhere
+            self.sequences.observe(name, collection.max_id)
+            next_id = self.sequences.allocate(name, len(fields_list)) if fields_list else None
+            entries = []
+            with self._state_lock:
+                for fields in fields_list:
+                    entry = {'id': next_id, **fields}
+                    next_id += 1
+                    collection.append(entry)
+                    entries.append(entry)
+                self._changed(name)
+            ticket = self._submit([('append', name, entry) for entry in entries])
+        self._await(ticket)
+        return entries
+    
+    def _submit(self, ops):
+        """Queue storage ops, or apply them right away without write-behind
+
+        Called with the write lock held so ops reach storage in the same
+        order as the in-memory changes. Returns a ticket for _await.
+        """
+        if self._write_queue is not None:
+            return self._write_queue.enqueue(ops)
+        self._apply_ops(ops, fsync=self.durability == 'fsync')
+        return None
+    
+    def _await(self, ticket):
+        """Wait, outside the write lock, until queued ops meet the durability level"""
+        if ticket is not None:
+            self._write_queue.wait(ticket)
+    
+    def _apply_ops(self, ops, fsync=False):
+        """Write a batch of storage ops, then count and publish it
+
+        In-memory changes are made before their ops are written. If the
+        write fails they are undone, so a write reported as failed is not
+        served or written later by the next flush, and it raises. Rollups
+        and change feed events follow a successful write, so listeners only
+        hear about changes that reached storage, in the order they did.
+        """
+        try:
+            self._write_ops(ops, fsync=fsync)
+        except Exception:
+            self._rollback(ops)
+            raise
+        self._committed(ops)
+    
+    def _committed(self, ops):
+        """Count appended logs into the rollups and publish the changes of written ops"""
+        appended = []
+        for op in ops + [None]:
+            # Consecutive appends to one collection go out as one event
+            if appended and (op is None or op[0] != 'append' or op[1] != appended[0][1]):
+                name, entries = appended[0][1], [append[2] for append in appended]
+                if name == 'logs':
+                    self.rollups.add_many(entries)
+                self.changes.publish(name, entries)
+                appended = []
+            if op is None:
+                break
+            kind, name = op[0], op[1]
+            if kind == 'append':
+                appended.append(op)
+            elif kind == 'update' and name == 'alerts':
+                self.changes.publish('alert_update', {'id': op[2]['id'], **op[3]})
+            elif kind == 'clear' and name == 'logs':
+                self.rollups.clear()
+                self.changes.publish('logs_cleared', {})
+    
+    def _rollback(self, ops):
+        """Undo the in-memory changes of ops that could not be written
+
+        Each touched collection is rebuilt from its records without the
+        appended ones, with updated records restored and cleared records
+        put back ('update' and 'clear' ops carry the previous state). Changes
+        made after these ops, still queued, are kept. Dropped partitions stay
+        dropped; retention drops them again on its next pass anyway.
+        """
+        with self._write_lock, self._state_lock:
+            for name in dict.fromkeys(op[1] for op in ops):
+                removed, restored, cleared = set(), {}, None
+                # Newest first, so the oldest state of a record wins
+                for op in reversed(ops):
+                    if op[1] != name:
+                        continue
+                    if op[0] == 'append':
+                        removed.add(op[2]['id'])
+                    elif op[0] == 'update':
+                        restored[op[2]['id']] = op[4]
+                    elif op[0] == 'clear':
+                        cleared = op[2]
+                records = list(self._collections[name])
+                if cleared is not None:
+                    records = cleared + records
+                self._collections[name] = self._new_collection(name, [
+                    restored.get(record['id'], record) for record in records if record['id'] not in removed])
+                self._changed(name)
+    
+    def _write_ops(self, ops, fsync=False):
+        """Apply a batch of storage ops with one write per touched file
+
+        Raises the first storage error, after trying every file.
+        """
+        if self.storage_mode == 'json':
+            # Any change to a collection means one rewrite of its file
+            names = []
+            for op in ops:
+                if op[1] not in names:
+                    names.append(op[1])
+            error = None
+            for name in names:
+                try:
+                    self._persist_collection(name, fsync=fsync)
+                except OSError as e:
+                    error = error or e
+            if error is not None:
+                raise error
+            return
+        
+        with self._write_lock:
+            touched = []
+            for op in ops:
+                kind, name = op[0], op[1]
+                store = self._segment_stores[name]
+                if kind == 'append':
+                    store.append(op[2])
+                elif kind == 'update':
+                    store.append_update(op[2], op[3])
+                elif kind == 'clear':
+                    store.clear()
+                elif kind == 'drop':
+                    store.drop(op[2])
+                if store not in touched:
+                    touched.append(store)
+            for store in touched:
+                store.sync(fsync)
+    
+    def wait_for_write_capacity(self, max_pending):
+        """Block while `max_pending` or more writes are waiting in the write-behind queue"""
+        if self._write_queue is not None:
+            self._write_queue.wait_for_capacity(max_pending)
+    
+    def flush(self):
+        """Wait until every queued write has been applied
+
+        Raises write_queue.WriteFailedError if any of them failed.
+        """
+        if self._write_queue is not None:
+            self._write_queue.flush()
+    
+    def close(self):
+        """Flush queued writes, save rollups and close open segment files"""
+        atexit.unregister(self.close)
+        if self._write_queue is not None:
+            self._write_queue.close()
+            self._write_queue = None
+        self.rollups.save()
+        with self._write_lock:
+            for store in self._segment_stores.values():
+                store.close()
+    
+    def _read_json_file(self, filename):
+        """Parse a record file in any supported format, treating a missing file as empty"""
+        return load_records(filename)
     
     def _load_json_data(self, filename):
         """Load data from JSON file"""
         try:
-            if os.path.exists(filename):
-                with open(filename, 'r') as f:
-                    return json.load(f)
-            return []
-        except (json.JSONDecodeError, FileNotFoundError):
+            return self._read_json_file(filename)
+        except (OSError, ValueError) as e:
+            print(f"Error loading data from {filename}: {e}")
             return []
     
-    def _save_json_data(self, filename, data):
-        """Save data to JSON file"""
+    def _write_temp_json(self, filename, data, fsync=False, file_format=DEFAULT_FILE_FORMAT):
+        """Write data to a temp file next to `filename` and return its path"""
+        temp_name = None
         try:
-            with open(filename, 'w') as f:
-                json.dump(data, f, indent=2)
-            return True
+            fd, temp_name = tempfile.mkstemp(prefix=os.path.basename(filename) + '.',
+                                             suffix='.tmp', dir=os.path.dirname(filename) or '.')
+            with os.fdopen(fd, 'w') as f:
+                f.write(encode_records(data, file_format))
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            return temp_name
         except Exception as e:
             print(f"Error saving data to {filename}: {e}")
+            if temp_name and os.path.exists(temp_name):
+                os.unlink(temp_name)
+            return None
+    
+    def _save_json_data(self, filename, data, fsync=False, file_format=DEFAULT_FILE_FORMAT):
+        """Save data to JSON file, atomically replacing the old one"""
+        temp_name = self._write_temp_json(filename, data, fsync=fsync, file_format=file_format)
+        if temp_name is None:
+            return False
+        try:
+            os.replace(temp_name, filename)
+            return True
+        except OSError as e:
+            print(f"Error saving data to {filename}: {e}")
+            os.unlink(temp_name)
             return False
     
+    def invalidate_cache(self, name=None):
+        """Force one collection, or all of them, to be reloaded from disk"""
+        if self.storage_mode == 'segments':
+            return
+        # Expire the check time but keep the signature, so an unchanged file
+        # isn't reloaded over writes that are still queued
+        for cached_name, cached in list(self._read_cache.items()):
+            if name is None or cached_name == name:
+                cached['checked_at'] = float('-inf')
+    
+    def get_status(self):
+        """Describe the active storage engine for the status endpoint"""
+        return {
+            'engine': 'json',
+            'connection_type': 'JSON Files',
+            'storage_mode': self.storage_mode,
+            'file_formats': self.file_formats if self.storage_mode == 'json' else None,
+            'data_dir': os.path.abspath(self.data_dir),
+            'cache': self.get_cache_stats(),
+            'durability': self.durability,
+            'write_queue': self._write_queue.get_metrics() if self._write_queue else None
+        }
+    
+    def get_cache_stats(self):
+        """Get read cache hit/miss counters"""
+        total = self._cache_hits + self._cache_misses
+        return {
+            'hits': self._cache_hits,
+            'misses': self._cache_misses,
+            'hit_ratio': round(self._cache_hits / total, 4) if total else 0.0,
+            'cached_collections': len(self._read_cache)
+        }
+    
     def add_log(self, log_data):
-        """Add a log entry to JSON storage"""
-        try:
-            logs = self._load_json_data(self.logs_file)
-            log_entry = {
-                'id': len(logs) + 1,
-                'timestamp': log_data.get('timestamp', datetime.now().isoformat()),
-                'severity': log_data.get('severity', 'INFO'),
-                'service': log_data.get('service', 'unknown'),
-                'message': log_data.get('message', ''),
-                'details': log_data.get('details', ''),
-                'stack_trace': log_data.get('stack_trace', '')
-            }
-            logs.insert(0, log_entry)
-            self._save_json_data(self.logs_file, logs)
-            return log_entry['id']
+        """Add a log entry to JSON storage and return it as stored, with its id"""
+        try:
+            return self._insert('logs', make_log_entry(log_data))
         except Exception as e:
             print(f"Error adding log: {e}")
             return None
     
-    def get_logs(self, limit=100, severity=None, service=None):
-        """Get logs with optional filtering"""
+    def add_logs(self, logs_data):
+        """Add a batch of log entries with a single write and return them as stored"""
         try:
-            logs = self._load_json_data(self.logs_file)
-            
-            # Apply filters
+            return self._insert_many('logs', [make_log_entry(log_data) for log_data in logs_data])
+        except Exception as e:
+            print(f"Error adding logs: {e}")
+            return []
+    
+    def get_logs(self, limit=100, severity=None, service=None, since=None, until=None, cursor=None):
+        """Get logs with optional filtering, newest first
+
+        `since`/`until` are inclusive ISO timestamp bounds; only partitions
+        overlapping the window are read. `cursor` (from encode_cursor) starts
+        the page right after the record it was made from.
+        """
+        try:
+            filters = {'since': since, 'until': until}
+            if cursor:
+                filters['before'] = decode_cursor(cursor)
             if severity:
-                logs = [log for log in logs if log['severity'] == severity]
+                filters['severity'] = severity
             if service:
-                logs = [log for log in logs if log['service'] == service]
+                filters['service'] = service
             
-            return logs[:limit]
+            logs = self._snapshot('logs', since, until).newest(**filters)
+            return list(islice(logs, limit))
         except Exception as e:
             print(f"Error getting logs: {e}")
             return []
 
+    def get_log_counts(self):
+        """Total logs and counts by severity and service from running counters
+
+        The counters live on the in-memory collection, are updated by every
+        insert, retention drop and reset, and are rebuilt from the stored
+        records on load, so they always agree with the persisted logs.
+        """
+        try:
+            collection = self._get_collection('logs')
+            with self._state_lock:
+                return {
+                    'total': len(collection),
+                    'by_severity': collection.counts('severity'),
+                    'by_service': collection.counts('service')
+                }
+        except Exception as e:
+            print(f"Error getting log counts: {e}")
+            return {'total': 0, 'by_severity': {}, 'by_service': {}}
+
+    def search_logs(self, query, limit=100, severity=None, service=None, since=None, until=None):
+        """Full-text search over message, details and stack trace, best match first
+
+        Supports terms, "quoted phrases" and prefix* queries; every clause
+        must match. Each result is a copy of the log with its relevance `score`.
+        """
+        try:
+            collection = self._get_collection('logs')
+            with self._state_lock:
+                snapshot = collection.snapshot(since, until)
+            
+            def resolve(log_id):
+                log = snapshot.find(log_id)
+                if log is None:
+                    return None
+                if (severity and log.get('severity') != severity) or (service and log.get('service') != service):
+                    return None
+                timestamp = log.get('timestamp') or ''
+                if (since and timestamp < since) or (until and timestamp > until):
+                    return None
+                return log
+            
+            results = collection.search_index.search(query, resolve, limit=limit)
+            return [{**log, 'score': round(score, 4)} for log, score in results]
+        except Exception as e:
+            print(f"Error searching logs: {e}")
+            return []
+
+    def get_rollups(self, tier='hour', since=None, until=None, fill=False):
+        """Pre-aggregated log counts per bucket of a rollup tier, oldest first"""
+        try:
+            return self.rollups.query(tier, since=since, until=until, fill=fill)
+        except Exception as e:
+            print(f"Error getting rollups: {e}")
+            return []
+
     # Add ability to clear persisted logs
     def clear_logs(self) -> bool:
         try:
-            return self._save_json_data(self.logs_file, [])
+            with self._write_lock:
+                collection = self._get_collection('logs')
+                with self._state_lock:
+                    # Kept in the op to put back if the clear can't be written
+                    cleared = list(collection)
+                    collection.clear()
+                    self._changed('logs')
+                ticket = self._submit([('clear', 'logs', cleared)])
+            self._await(ticket)
+            self.rollups.save()
+            return True
         except Exception as e:
             print(f"Error clearing logs: {e}")
             return False
@@ -83,11 +738,9 @@ class JSONDatabaseManager:
     def get_log_by_id(self, log_id):
         """Get a single log by ID"""
         try:
-            logs = self._load_json_data(self.logs_file)
-            for log in logs:
-                if log.get('id') == log_id:
-                    return log
-            return None
+            collection = self._get_collection('logs')
+            with self._state_lock:
+                return collection.find(log_id)
         except Exception as e:
             print(f"Error getting log by id: {e}")
             return None
@@ -95,96 +748,229 @@ class JSONDatabaseManager:
     def add_system_stat(self, stat_data):
         """Add system statistics to JSON storage"""
         try:
-            stats = self._load_json_data(self.stats_file)
-            stat_entry = {
-                'id': len(stats) + 1,
-                'timestamp': stat_data.get('timestamp', datetime.now().isoformat()),
-                'cpu_percent': stat_data.get('cpu_percent', 0),
-                'memory_percent': stat_data.get('memory_percent', 0),
-                'disk_percent': stat_data.get('disk_percent', 0),
-                'memory_total_gb': stat_data.get('memory_total_gb', 0),
-                'memory_used_gb': stat_data.get('memory_used_gb', 0)
-            }
-            stats.insert(0, stat_entry)
-            
-            # Keep only last 1000 entries
-            if len(stats) > 1000:
-                stats = stats[:1000]
-            
-            self._save_json_data(self.stats_file, stats)
-            return stat_entry['id']
+            return self._insert('system_stats', make_stat_entry(stat_data))['id']
         except Exception as e:
             print(f"Error adding system stat: {e}")
             return None
     
-    def get_system_stats(self, limit=100):
-        """Get system statistics"""
+    def get_system_stats(self, limit=100, since=None, until=None):
+        """Get system statistics, newest first, optionally within [since, until]
+
+        `limit=None` returns every sample in the window.
+        """
         try:
-            stats = self._load_json_data(self.stats_file)
-            return stats[:limit]
+            stats = self._snapshot('system_stats', since, until).newest(since=since, until=until)
+            return list(islice(stats, limit))
         except Exception as e:
             print(f"Error getting system stats: {e}")
             return []
     
     def add_alert(self, alert_data):
-        """Add an alert to JSON storage"""
-        try:
-            alerts = self._load_json_data(self.alerts_file)
-            alert_entry = {
-                'id': len(alerts) + 1,
-                'timestamp': alert_data.get('timestamp', datetime.now().isoformat()),
-                'type': alert_data.get('type', 'system'),
-                'message': alert_data.get('message', ''),
-                'severity': alert_data.get('severity', 'WARNING'),
-                'data': alert_data.get('data', {}),
-                'acknowledged': alert_data.get('acknowledged', False),
-                'acknowledged_at': alert_data.get('acknowledged_at')
-            }
-            alerts.insert(0, alert_entry)
-            self._save_json_data(self.alerts_file, alerts)
-            return alert_entry['id']
+        """Add an alert to JSON storage and return it as stored, with its id"""
+        try:
+            return self._insert('alerts', make_alert_entry(alert_data))
         except Exception as e:
             print(f"Error adding alert: {e}")
             return None
     
-    def get_alerts(self, limit=100, acknowledged=None):
-        """Get alerts with optional filtering"""
+    def add_alerts(self, alerts_data):
+        """Add a batch of alerts with a single write and return them as stored"""
         try:
-            alerts = self._load_json_data(self.alerts_file)
-            
-            # Apply filters
+            return self._insert_many('alerts', [make_alert_entry(alert_data) for alert_data in alerts_data])
+        except Exception as e:
+            print(f"Error adding alerts: {e}")
+            return []
+    
+    def get_alerts(self, limit=100, acknowledged=None, since=None, until=None, cursor=None):
+        """Get alerts with optional filtering, newest first, starting after `cursor`"""
+        try:
+            filters = {'since': since, 'until': until}
+            if cursor:
+                filters['before'] = decode_cursor(cursor)
             if acknowledged is not None:
-                alerts = [alert for alert in alerts if alert['acknowledged'] == acknowledged]
+                filters['acknowledged'] = acknowledged
             
-            return alerts[:limit]
+            alerts = self._snapshot('alerts', since, until).newest(**filters)
+            return list(islice(alerts, limit))
         except Exception as e:
             print(f"Error getting alerts: {e}")
             return []
     
+    def get_acknowledged_alerts(self, since, limit=100):
+        """Alerts acknowledged after the ISO timestamp `since`, most recently acknowledged first"""
+        try:
+            alerts = self._snapshot('alerts').newest(acknowledged=True)
+            acknowledged = [alert for alert in alerts if (alert.get('acknowledged_at') or '') > since]
+            acknowledged.sort(key=lambda alert: alert['acknowledged_at'], reverse=True)
+            return acknowledged[:limit]
+        except Exception as e:
+            print(f"Error getting acknowledged alerts: {e}")
+            return []
+    
+    def get_alert_by_id(self, alert_id):
+        """Get a single alert by ID"""
+        try:
+            collection = self._get_collection('alerts')
+            with self._state_lock:
+                return collection.find(alert_id)
+        except Exception as e:
+            print(f"Error getting alert by id: {e}")
+            return None
+    
     def acknowledge_alert(self, alert_id: int) -> bool:
         """Mark an alert as acknowledged in JSON storage"""
         try:
-            alerts = self._load_json_data(self.alerts_file)
-            updated = False
-            for alert in alerts:
-                if alert.get('id') == alert_id:
-                    alert['acknowledged'] = True
-                    alert['acknowledged_at'] = datetime.now().isoformat()
-                    updated = True
-                    break
-            if updated:
-                return self._save_json_data(self.alerts_file, alerts)
-            return False
+            with self._write_lock:
+                collection = self._get_collection('alerts')
+                fields = {'acknowledged': True, 'acknowledged_at': datetime.now().isoformat()}
+                # The record is replaced, not mutated, so readers keep a stable copy
+                with self._state_lock:
+                    previous = collection.find(alert_id)
+                    alert = collection.update(alert_id, fields)
+                    if alert is not None:
+                        self._changed('alerts')
+                if alert is None:
+                    return False
+                ticket = self._submit([('update', 'alerts', alert, fields, previous)])
+            self._await(ticket)
+            return True
         except Exception as e:
             print(f"Error acknowledging alert: {e}")
             return False
 
+    def _partition_sizes(self, name, collection):
+        """(key, bytes on disk) of every partition of a collection, oldest first
+
+        In json mode the collection is a single file, whose size is split
+        between the partitions by their share of the records.
+        """
+        if self.storage_mode == 'segments':
+            return self._segment_stores[name].partition_sizes()
+        try:
+            file_size = os.path.getsize(self._collection_file(name))
+        except OSError:
+            return []
+        with self._state_lock:
+            counts = [(key, len(collection.partitions[key])) for key in collection.keys()]
+        total = sum(count for _, count in counts)
+        return [(key, file_size * count // total) for key, count in counts] if total else []
+    
+    def apply_retention(self):
+        """Drop partitions that are too old or over the size budget
+
+        System stats are also dropped after `stats_retention_days`. The size
+        budget, `retention_max_bytes`, applies to each collection. A drop
+        deletes partition files in segments mode, but rewrites the whole
+        collection file in json mode.
+        """
+        dropped = {}
+        with self._write_lock:
+            for name, settings in COLLECTIONS.items():
+                if not settings['partitioned']:
+                    continue
+                collection = self._get_collection(name)
+                current = self._partition_key({'timestamp': datetime.now().isoformat()})
+                expired = set()
+                
+                retention_days = self.retention_days
+                if name == 'system_stats':
+                    retention_days = shortest_retention(retention_days, self.stats_retention_days)
+                if retention_days is not None:
+                    cutoff = self._partition_key({'timestamp': retention_cutoff(retention_days)})
+                    expired.update(key for key in collection.keys() if key < cutoff)
+                
+                if self.retention_max_bytes is not None:
+                    sizes = self._partition_sizes(name, collection)
+                    total = sum(size for _, size in sizes)
+                    for key, size in sizes:
+                        if total <= self.retention_max_bytes or key >= current:
+                            break
+                        expired.add(key)
+                        total -= size
+                
+                expired.discard(current)
+                count = 0
+                with self._state_lock:
+                    for key in sorted(expired):
+                        count += collection.drop_partition(key)
+                    if count:
+                        self._changed(name)
+                if expired:
+                    self._submit([('drop', name, key) for key in sorted(expired)])
+                dropped[name] = count
+        return dropped
+    
+    def compact(self):
+        """Apply retention, fold closed segment partitions into single files and save rollups"""
+        dropped = self.apply_retention()
+        self.rollups.prune()
+        self.flush()
+        self.rollups.save()
+        compacted = 0
+        if self.storage_mode == 'segments':
+            current = self._partition_key({'timestamp': datetime.now().isoformat()})
+            with self._write_lock:
+                for name, settings in COLLECTIONS.items():
+                    if settings['partitioned']:
+                        compacted += self._segment_stores[name].compact(keep_open=(current,))
+        return {'dropped': dropped, 'compacted_partitions': compacted}
+    
+    def start_compactor(self, interval=300):
+        """Run compact() every `interval` seconds in a daemon thread"""
+        if self._compactor_thread is None:
+            self._compactor_thread = run_periodically(self.compact, interval, 'compacting storage')
+        return self._compactor_thread
+
 # Global JSON database manager instance
 db_manager = None
 
-def get_db_manager(data_dir='data'):
-    """Get or create the JSON database manager instance"""
+def get_db_manager(data_dir='data', storage_mode=None, engine=None):
+    """Get or create the database manager instance
+
+    The engine defaults to the DB_ENGINE environment variable ('json' or
+    'sqlite'). For the JSON engine the storage mode defaults to
+    DB_STORAGE_MODE ('json' or 'segments'); for SQLite the database file
+    defaults to SQLITE_PATH, or monitor.db inside the data directory.
+    Retention is configured with RETENTION_DAYS, RETENTION_MAX_MB and
+    STATS_RETENTION_DAYS (system stats, default SYSTEM_STATS_RETENTION_DAYS), and
+    partition size with PARTITION_GRANULARITY ('day' or 'hour'). JSON writes
+    go through the write-behind queue unless DB_WRITE_BEHIND=0; it is tuned
+    with DB_FLUSH_INTERVAL_MS, DB_FLUSH_MAX_RECORDS and DB_DURABILITY
+    ('none', 'flush' or 'fsync'). DB_FILE_FORMAT sets the JSON file encoding,
+    for all collections ('compact') or per collection ('logs=dict,alerts=compact').
+    """
     global db_manager
     if db_manager is None:
-        db_manager = JSONDatabaseManager(data_dir)
-    return db_manager
\ No newline at end of file
+        engine = engine or os.environ.get('DB_ENGINE', 'json')
+        if engine == 'sqlite':
+            from sqlite_database import SQLiteDatabaseManager
+            db_path = os.environ.get('SQLITE_PATH', os.path.join(data_dir, 'monitor.db'))
+            retention_days = os.environ.get('RETENTION_DAYS')
+            retention_max_mb = os.environ.get('RETENTION_MAX_MB')
+            db_manager = SQLiteDatabaseManager(
+                db_path,
+                data_dir=data_dir,
+                retention_days=float(retention_days) if retention_days else None,
+                retention_max_bytes=int(float(retention_max_mb) * 1024 * 1024) if retention_max_mb else None,
+                stats_retention_days=float(os.environ.get('STATS_RETENTION_DAYS', SYSTEM_STATS_RETENTION_DAYS))
+            )
+        elif engine == 'json':
+            storage_mode = storage_mode or os.environ.get('DB_STORAGE_MODE', 'json')
+            retention_days = os.environ.get('RETENTION_DAYS')
+            retention_max_mb = os.environ.get('RETENTION_MAX_MB')
+            db_manager = JSONDatabaseManager(
+                data_dir,
+                storage_mode=storage_mode,
+                partition_granularity=os.environ.get('PARTITION_GRANULARITY', 'day'),
+                retention_days=float(retention_days) if retention_days else None,
+                retention_max_bytes=int(float(retention_max_mb) * 1024 * 1024) if retention_max_mb else None,
+                stats_retention_days=float(os.environ.get('STATS_RETENTION_DAYS', SYSTEM_STATS_RETENTION_DAYS)),
+                write_behind=os.environ.get('DB_WRITE_BEHIND', '1') == '1',
+                flush_interval_ms=float(os.environ.get('DB_FLUSH_INTERVAL_MS', 10)),
+                flush_max_records=int(os.environ.get('DB_FLUSH_MAX_RECORDS', 500)),
+                durability=os.environ.get('DB_DURABILITY', 'flush'),
+                file_formats=parse_file_formats(os.environ.get('DB_FILE_FORMAT'), COLLECTIONS)
+            )
+        else:
+            raise ValueError(f"Unknown database engine: {engine}")
+    return db_manager
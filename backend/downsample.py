@@ -0,0 +1,120 @@
+import numpy as np
+
+# lttb: Largest-Triangle-Three-Buckets, keeps real samples that preserve the
+#       shape of one driving field
+# buckets: equal-time buckets with the mean, min and max of every numeric field
+DOWNSAMPLE_METHODS = ('lttb', 'buckets')
+
+def numeric_fields(records):
+    """Names of the fields holding numbers in any record, except the id"""
+    fields = {}
+    for record in records:
+        for field, value in record.items():
+            if field != 'id' and isinstance(value, (int, float)) and not isinstance(value, bool):
+                fields[field] = True
+    return list(fields)
+
+def _times(records, time_field):
+    """Record timestamps as int64 microseconds"""
+    return np.array([record[time_field] for record in records], dtype='datetime64[us]').astype(np.int64)
+
+def _values(records, field):
+    """A field as a float array, with NaN for missing values"""
+    return np.array([record.get(field) for record in records], dtype=float)
+
+def lttb_indices(x, y, points):
+    """Indices of the `points` samples kept by Largest-Triangle-Three-Buckets
+
+    The first and last samples are always kept. The middle ones are split
+    into points - 2 buckets, and each bucket keeps the sample forming the
+    largest triangle with the previously kept sample and the next bucket's
+    average. Bucket averages and triangle areas are computed with NumPy;
+    only the walk over buckets is a Python loop.
+    """
+    n = len(x)
+    if points >= n:
+        return np.arange(n)
+    if points < 3:
+        return np.array([0, n - 1][:points])
+
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    counts = ends - starts
+    mean_x = np.add.reduceat(x[1:n - 1], starts - 1) / counts
+    mean_y = np.add.reduceat(y[1:n - 1], starts - 1) / counts
+    # The last bucket looks ahead to the final sample
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = starts[i], ends[i]
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def downsample_lttb(records, points, field, time_field='timestamp'):
+    """Keep `points` of the oldest-first records, chosen by LTTB on `field`"""
+    if len(records) <= points:
+        return list(records)
+    times = _times(records, time_field)
+    x = (times - times[0]) / 1e6
+    y = _values(records, field)
+    # Missing values don't pull the selection anywhere
+    y = np.where(np.isnan(y), np.nanmean(y) if not np.isnan(y).all() else 0.0, y)
+    return [records[i] for i in lttb_indices(x, y, points)]
+
+def downsample_buckets(records, points, fields=None, time_field='timestamp'):
+    """Aggregate oldest-first records into at most `points` equal-time buckets
+
+    Each row has the mean `timestamp` of its samples, the sample count and,
+    per numeric field, the mean plus `<field>_min` and `<field>_max`. Empty
+    buckets are left out.
+    """
+    if not records:
+        return []
+    fields = fields or numeric_fields(records)
+    times = _times(records, time_field)
+    offsets = times - times[0]
+    span = int(offsets[-1]) + 1
+    bucket = offsets * points // span
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    counts = np.diff(np.r_[starts, len(records)])
+    mean_times = (times[0] + np.add.reduceat(offsets, starts) // counts).astype('datetime64[us]')
+
+    columns = {}
+    for field in fields:
+        values = _values(records, field)
+        valid = ~np.isnan(values)
+        present = np.add.reduceat(valid.astype(np.int64), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            columns[field] = np.add.reduceat(np.where(valid, values, 0.0), starts) / present
+        columns[f'{field}_min'] = np.fmin.reduceat(values, starts)
+        columns[f'{field}_max'] = np.fmax.reduceat(values, starts)
+
+    rows = []
+    for i, timestamp in enumerate(np.datetime_as_string(mean_times)):
+        row = {'timestamp': str(timestamp), 'samples': int(counts[i])}
+        for name, column in columns.items():
+            value = column[i]
+            row[name] = None if np.isnan(value) else round(float(value), 2)
+        rows.append(row)
+    return rows
+
+def downsample(records, points, method='lttb', field=None, time_field='timestamp'):
+    """Downsample newest-first records to at most `points` rows, newest first"""
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    records = sorted(records, key=lambda record: record[time_field])
+    if method == 'lttb':
+        fields = numeric_fields(records)
+        field = field or (fields[0] if fields else None)
+        if field is None:
+            return records[::-1][:points]
+        rows = downsample_lttb(records, points, field, time_field)
+    else:
+        rows = downsample_buckets(records, points, time_field=time_field)
+    return rows[::-1]
@@ -0,0 +1,145 @@
+"""Batched log ingestion from NDJSON streams
+
+One JSON object per line. Lines are parsed and validated as they are read,
+and every batch of valid records is stored with a single add_logs call.
+"""
+import gzip
+import json
+import zlib
+from datetime import datetime
+from database import make_log_entry
+
+REQUIRED_LOG_FIELDS = ('severity', 'service', 'message')
+LOG_SEVERITIES = ('INFO', 'WARNING', 'ERROR', 'CRITICAL')
+# Free-text fields; other JSON values in them are stored as JSON text
+TEXT_LOG_FIELDS = ('details', 'stack_trace')
+MAX_LINE_BYTES = 1024 * 1024
+# Rejected lines reported back in detail; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+def local_timestamp(value):
+    """ISO 8601 timestamp as a naive local ISO string, like stored timestamps
+
+    Raises ValueError for anything that isn't an ISO timestamp.
+    """
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat()
+
+def validate_log(data):
+    """Normalize a parsed NDJSON record to a log entry; returns (entry, error)
+
+    Severities are uppercased and must be one of LOG_SEVERITIES; timestamps
+    are converted to local time. Ids are assigned by the store, so any
+    incoming `id` is ignored.
+    """
+    if not isinstance(data, dict):
+        return None, 'not a JSON object'
+    missing = [field for field in REQUIRED_LOG_FIELDS if not data.get(field)]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+    for field in REQUIRED_LOG_FIELDS + ('timestamp',):
+        if data.get(field) is not None and not isinstance(data[field], str):
+            return None, f'{field} must be a string'
+    fields = {field: value for field, value in data.items() if field != 'id'}
+
+    fields['severity'] = fields['severity'].strip().upper()
+    if fields['severity'] not in LOG_SEVERITIES:
+        return None, f"severity must be one of {', '.join(LOG_SEVERITIES)}"
+    if fields.get('timestamp') is None:
+        fields.pop('timestamp', None)
+    else:
+        try:
+            fields['timestamp'] = local_timestamp(fields['timestamp'])
+        except ValueError:
+            return None, f"invalid timestamp: {fields['timestamp'][:64]}"
+    for field in TEXT_LOG_FIELDS:
+        value = fields.get(field)
+        if value is None:
+            fields[field] = ''
+        elif not isinstance(value, str):
+            fields[field] = json.dumps(value, separators=(',', ':'))
+    return make_log_entry(fields), None
+
+def iter_lines(stream):
+    """Yield the lines of a binary stream, or None for lines over MAX_LINE_BYTES"""
+    while True:
+        line = stream.readline(MAX_LINE_BYTES + 1)
+        if not line:
+            return
+        if len(line) > MAX_LINE_BYTES and not line.endswith(b'\n'):
+            # Skip the rest of the oversized line without buffering it
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(MAX_LINE_BYTES)
+            yield None
+            continue
+        yield line
+
+def open_stream(stream, content_encoding=None):
+    """Wrap a request body so it reads decompressed when it is gzip-encoded"""
+    if (content_encoding or '').lower() in ('gzip', 'x-gzip'):
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    return stream
+
+def ingest_ndjson(stream, db, batch_size=500, on_batch=None):
+    """Parse an NDJSON stream and store it in batches of `batch_size` logs
+
+    `on_batch(logs)` is called with each stored batch, ids included. Returns
+    totals, per-batch accepted/rejected counts and the first rejected lines.
+    A corrupt or truncated gzip stream stops the ingestion and is reported
+    in `error`; batches stored before that are kept.
+    """
+    summary = {'accepted': 0, 'rejected': 0, 'batches': [], 'errors': [], 'error': None}
+    batch, rejected = [], 0
+
+    def reject(line_number, reason):
+        nonlocal rejected
+        rejected += 1
+        summary['rejected'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append({'line': line_number, 'error': reason})
+
+    def flush():
+        nonlocal batch, rejected
+        if not batch and not rejected:
+            return
+        accepted = 0
+        if batch:
+            stored = db.add_logs(batch)
+            if len(stored) == len(batch):
+                accepted = len(batch)
+                summary['accepted'] += accepted
+                if on_batch:
+                    on_batch(stored)
+            else:
+                summary['rejected'] += len(batch)
+                rejected += len(batch)
+                if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                    summary['errors'].append({'line': line_number,
+                                              'error': f'could not store batch of {len(batch)} logs'})
+        summary['batches'].append({'batch': len(summary['batches']) + 1,
+                                   'accepted': accepted, 'rejected': rejected})
+        batch, rejected = [], 0
+
+    line_number = 0
+    try:
+        for line in iter_lines(stream):
+            line_number += 1
+            if line is None:
+                reject(line_number, f'line longer than {MAX_LINE_BYTES} bytes')
+            elif line.strip():
+                try:
+                    entry, error = validate_log(json.loads(line))
+                except ValueError as e:
+                    entry, error = None, f'invalid JSON: {e}'
+                if error:
+                    reject(line_number, error)
+                else:
+                    batch.append(entry)
+            if len(batch) + rejected >= batch_size:
+                flush()
+    except (OSError, EOFError, zlib.error) as e:
+        summary['error'] = f'Could not read request body after line {line_number}: {e}'
+    flush()
+    return summary
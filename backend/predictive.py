@@ -106,21 +106,49 @@ class PredictiveAnalysis:
             # Sort by timestamp
             hourly_data.sort(key=lambda x: x['timestamp'])
             
-            # Train model on this data
-            training_result = self.train_model(hourly_data)
-            if 'error' in training_result:
-                return training_result
-            
-            # Make prediction
-            prediction = self.predict()
-            
-            return {
-                "status": "success",
-                "historical_data": hourly_data,
-                "forecast": prediction.get('forecast', [])
-            }
+            return self._forecast(hourly_data)
         except Exception as e:
             return {"error": f"Error analyzing logs: {str(e)}"}
+    
+    def analyze_rollups(self, rollups, metric='error_count'):
+        """Predict future trends from hourly log rollups (see rollups.RollupStore)
+
+        Rollups are already counted per hour, so this reads one row per hour
+        instead of re-bucketing raw logs. Pass gap-filled rows so quiet hours
+        count as zero.
+        """
+        if not rollups:
+            return {"error": "No log rollups available for analysis"}
+        
+        try:
+            hourly_data = []
+            for row in rollups:
+                if metric == 'error_count':
+                    value = sum(row['by_severity'].get(severity, 0) for severity in ('ERROR', 'CRITICAL'))
+                else:
+                    value = row['total']
+                hourly_data.append({
+                    "timestamp": row['timestamp'],
+                    "value": value
+                })
+            
+            return self._forecast(hourly_data)
+        except Exception as e:
+            return {"error": f"Error analyzing rollups: {str(e)}"}
+    
+    def _forecast(self, hourly_data):
+        """Train on an hourly series and forecast the next hours"""
+        training_result = self.train_model(hourly_data)
+        if 'error' in training_result:
+            return training_result
+        
+        prediction = self.predict()
+        
+        return {
+            "status": "success",
+            "historical_data": hourly_data,
+            "forecast": prediction.get('forecast', [])
+        }
 
 # Create singleton instance
 predictive_analyzer = PredictiveAnalysis()
@@ -0,0 +1,446 @@
+"""Network log receiver: syslog over UDP/TCP and NDJSON over TCP
+
+Usage:
+    python receiver.py --udp 5514 --tcp 5514 --json-tcp 5515
+
+Syslog messages (RFC 5424 and RFC 3164, newline-framed or octet-counted on
+TCP) and JSON lines are mapped to the log schema and stored in batches.
+Run it standalone against the SQLite engine, or inside the web app with
+RECEIVER_UDP_PORT / RECEIVER_TCP_PORT / RECEIVER_JSON_PORT, so that only
+one process writes the JSON or segment files.
+"""
+import argparse
+import asyncio
+import json
+import re
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from database import get_db_manager, make_log_entry
+from ingest import MAX_LINE_BYTES, local_timestamp, validate_log
+
+READ_CHUNK_BYTES = 64 * 1024
+# Kernel receive buffer asked for on the UDP socket. Datagrams that arrive
+# while it is full are lost before the receiver sees them. Linux caps it at
+# net.core.rmem_max unless the process may use SO_RCVBUFFORCE.
+UDP_RCVBUF_BYTES = 8 * 1024 * 1024
+# Datagrams read per wakeup of the UDP socket before yielding to other tasks
+DATAGRAM_BURST = 256
+MAX_DATAGRAM_BYTES = 65535
+
+# Syslog severity (PRI % 8) -> log severity
+SYSLOG_SEVERITIES = ('CRITICAL', 'CRITICAL', 'CRITICAL', 'ERROR', 'WARNING', 'INFO', 'INFO', 'INFO')
+SYSLOG_FACILITIES = ('kern', 'user', 'mail', 'daemon', 'auth', 'syslog', 'lpr', 'news', 'uucp',
+                     'cron', 'authpriv', 'ftp', 'ntp', 'security', 'console', 'solaris-cron',
+                     'local0', 'local1', 'local2', 'local3', 'local4', 'local5', 'local6', 'local7')
+MONTHS = {month: i + 1 for i, month in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'))}
+
+PRI_PATTERN = re.compile(r'<(\d{1,3})>')
+RFC5424_PATTERN = re.compile(
+    r'(\d{1,2}) (\S+) (\S+) (\S+) (\S+) (\S+) (-|(?:\[(?:[^\]\\]|\\.)*\])+)(?: (.*))?$', re.DOTALL)
+RFC3164_PATTERN = re.compile(r'([A-Z][a-z]{2}) +(\d{1,2}) (\d\d):(\d\d):(\d\d) (\S+) (.*)$', re.DOTALL)
+TAG_PATTERN = re.compile(r'([^\s:\[]+)(?:\[([^\]]*)\])?: ?(.*)$', re.DOTALL)
+
+def _nil(value):
+    return None if value == '-' else value
+
+def _bsd_timestamp(month, day, hour, minute, second, now):
+    """RFC 3164 timestamps have no year: take the one that isn't in the future"""
+    parsed = datetime(now.year, MONTHS[month], int(day), int(hour), int(minute), int(second))
+    if (parsed - now).days > 0:
+        parsed = parsed.replace(year=now.year - 1)
+    return parsed.isoformat()
+
+def parse_syslog(line, now=None):
+    """Map one syslog message to a log entry; returns (entry, error)
+
+    Messages that match neither RFC are kept whole as INFO messages from
+    the 'syslog' service, like most syslog daemons do.
+    """
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', errors='replace')
+    line = line.rstrip('\r\n')
+    if not line.strip():
+        return None, 'empty message'
+    now = now or datetime.now()
+    fields = {'severity': 'INFO', 'service': 'syslog', 'message': line}
+    details = []
+
+    pri = PRI_PATTERN.match(line)
+    if pri and int(pri.group(1)) <= 191:
+        facility, severity = divmod(int(pri.group(1)), 8)
+        fields['severity'] = SYSLOG_SEVERITIES[severity]
+        details.append(f'facility={SYSLOG_FACILITIES[facility]}')
+        rest = line[pri.end():]
+
+        modern = RFC5424_PATTERN.match(rest)
+        bsd = None if modern else RFC3164_PATTERN.match(rest)
+        try:
+            if modern:
+                _, timestamp, host, app, procid, msgid, data, message = modern.groups()
+                if _nil(timestamp):
+                    fields['timestamp'] = local_timestamp(timestamp)
+                fields['service'] = _nil(app) or _nil(host) or 'syslog'
+                fields['message'] = (message or '').lstrip('\ufeff')
+                details += [f'{name}={value}' for name, value in
+                            (('host', _nil(host)), ('procid', _nil(procid)), ('msgid', _nil(msgid))) if value]
+                if _nil(data):
+                    details.append(data)
+            elif bsd:
+                month, day, hour, minute, second, host, content = bsd.groups()
+                if month in MONTHS:
+                    fields['timestamp'] = _bsd_timestamp(month, day, hour, minute, second, now)
+                details.append(f'host={host}')
+                tag = TAG_PATTERN.match(content)
+                if tag:
+                    fields['service'], procid, fields['message'] = tag.groups()
+                    if procid:
+                        details.append(f'procid={procid}')
+                else:
+                    fields['message'] = content
+            else:
+                fields['message'] = rest
+        except ValueError as e:
+            return None, f'bad timestamp: {e}'
+
+    if not fields['message']:
+        fields['message'] = '(empty)'
+    fields['details'] = ' '.join(details)
+    return make_log_entry(fields), None
+
+def parse_json_line(line):
+    """Map one NDJSON line to a log entry; returns (entry, error)"""
+    try:
+        return validate_log(json.loads(line))
+    except ValueError as e:
+        return None, f'invalid JSON: {e}'
+
+
+class _SyslogDatagramReader:
+    """Reads syslog datagrams from a bound non-blocking UDP socket
+
+    asyncio's datagram transport reads one datagram per event loop
+    iteration. This drains up to DATAGRAM_BURST per wakeup instead, so the
+    socket buffer empties faster than senders fill it.
+    """
+
+    def __init__(self, receiver, sock, loop):
+        self.receiver = receiver
+        self.sock = sock
+        self.loop = loop
+        loop.add_reader(sock.fileno(), self._read)
+
+    def _read(self):
+        for _ in range(DATAGRAM_BURST):
+            try:
+                data = self.sock.recv(MAX_DATAGRAM_BYTES)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                print(f"Error receiving syslog datagram: {e}")
+                return
+            # UDP has no flow control: when the queue is full the message is dropped
+            self.receiver.submit_nowait(*parse_syslog(data))
+
+    def close(self):
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+
+def _set_receive_buffer(sock, size):
+    """Ask for a `size` byte socket receive buffer; returns the size granted
+
+    SO_RCVBUF is capped by the kernel (net.core.rmem_max on Linux); with
+    CAP_NET_ADMIN, SO_RCVBUFFORCE goes past the cap.
+    """
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+        # Linux reports twice the requested size, to cover its bookkeeping
+        granted = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        if granted < size and hasattr(socket, 'SO_RCVBUFFORCE'):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUFFORCE, size)
+                granted = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+            except OSError:
+                pass
+        return granted
+    except OSError as e:
+        print(f"Error setting UDP receive buffer: {e}")
+        return None
+
+
+class LogReceiver:
+    """Asyncio listeners feeding a batching writer
+
+    Parsed entries go through a bounded asyncio queue to a single writer
+    task. It stores up to `batch_size` logs per add_logs call, waiting at most
+    `flush_interval` seconds to fill a batch. Calls run in a worker thread so
+    the event loop keeps reading. Before each batch the writer waits until
+    the storage write-behind queue has room for it. While it waits, the
+    asyncio queue fills up. TCP connections then stop being read, which
+    pushes back on senders through TCP flow control. UDP datagrams that find
+    the queue full are dropped and counted. Bursts are absorbed by a UDP
+    socket receive buffer of `udp_rcvbuf` bytes; the size the kernel granted
+    is kept in `udp_rcvbuf_granted`.
+    """
+
+    def __init__(self, db, batch_size=500, flush_interval=0.05, queue_size=10000,
+                 max_pending_writes=20000, udp_rcvbuf=UDP_RCVBUF_BYTES):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.max_pending_writes = max_pending_writes
+        self.udp_rcvbuf = udp_rcvbuf
+        self.udp_rcvbuf_granted = None
+        self.stats = {'received': 0, 'stored': 0, 'rejected': 0, 'dropped': 0, 'failed': 0,
+                      'batches': 0, 'connections': 0}
+        self._servers = []
+        self._transports = []
+        self._queue = None
+        self._writer_task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='receiver-writer')
+        self.loop = None  # set by start_in_thread
+
+    async def start(self, host='0.0.0.0', udp_port=None, tcp_port=None, json_port=None):
+        """Start the listeners; returns the bound ports (useful with port 0)"""
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.queue_size)
+        self._writer_task = loop.create_task(self._writer())
+        ports = {}
+        if udp_port is not None:
+            family, _, _, _, address = (await loop.getaddrinfo(host, udp_port, type=socket.SOCK_DGRAM))[0]
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            try:
+                sock.setblocking(False)
+                sock.bind(address)
+                if self.udp_rcvbuf:
+                    self.udp_rcvbuf_granted = _set_receive_buffer(sock, self.udp_rcvbuf)
+                self._transports.append(_SyslogDatagramReader(self, sock, loop))
+            except Exception:
+                sock.close()
+                raise
+            ports['udp'] = sock.getsockname()[1]
+        for name, port, parser, octet_counting in (('tcp', tcp_port, parse_syslog, True),
+                                                   ('json', json_port, parse_json_line, False)):
+            if port is None:
+                continue
+            server = await asyncio.start_server(
+                lambda reader, writer, parser=parser, octet_counting=octet_counting:
+                    self._handle_stream(reader, writer, parser, octet_counting),
+                host, port, limit=MAX_LINE_BYTES)
+            self._servers.append(server)
+            ports[name] = server.sockets[0].getsockname()[1]
+        return ports
+
+    async def stop(self):
+        """Stop listening, then store everything already received"""
+        for transport in self._transports:
+            transport.close()
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        if self._writer_task is not None:
+            await self._queue.put(None)
+            await self._writer_task
+        self._executor.shutdown(wait=True)
+
+    def submit_nowait(self, entry, error=None):
+        """Queue a parsed entry without waiting; drops it if the queue is full"""
+        self.stats['received'] += 1
+        if error:
+            self.stats['rejected'] += 1
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+
+    async def submit(self, entry, error=None):
+        """Queue a parsed entry, waiting for room (backpressure)"""
+        self.stats['received'] += 1
+        if error:
+            self.stats['rejected'] += 1
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            await self._queue.put(entry)
+
+    async def _line_frames(self, reader, prefix):
+        """Newline-delimited messages, read in chunks
+
+        A line over MAX_LINE_BYTES is rejected and skipped up to its newline
+        without being buffered.
+        """
+        buffer, skipping = prefix, False
+        while True:
+            chunk = await reader.read(READ_CHUNK_BYTES)
+            if not chunk:
+                if skipping:
+                    self._reject_oversized()
+                elif buffer:
+                    yield buffer
+                return
+            lines = (buffer + chunk).split(b'\n')
+            buffer = lines.pop()
+            for line in lines:
+                if skipping:
+                    skipping = False
+                    self._reject_oversized()
+                else:
+                    yield line
+            if len(buffer) > MAX_LINE_BYTES:
+                buffer, skipping = b'', True
+
+    def _reject_oversized(self):
+        self.stats['received'] += 1
+        self.stats['rejected'] += 1
+
+    async def _octet_frames(self, reader, prefix):
+        """RFC 6587 octet-counted messages: '<length> <message>'"""
+        while True:
+            try:
+                header = prefix + await reader.readuntil(b' ')
+            except asyncio.IncompleteReadError:
+                return
+            prefix = b''
+            if not header[:-1].isdigit() or int(header[:-1]) > MAX_LINE_BYTES:
+                # Can't find the next frame after a bad length
+                raise ConnectionError(f'bad frame length {header[:20]!r}')
+            yield await reader.readexactly(int(header[:-1]))
+
+    async def _handle_stream(self, reader, writer, parser, octet_counting):
+        self.stats['connections'] += 1
+        try:
+            # A sender uses one framing per connection (RFC 6587): a leading
+            # digit means octet counting, anything else newline-delimited
+            first = await reader.read(1)
+            if first:
+                if octet_counting and first.isdigit():
+                    frames = self._octet_frames(reader, first)
+                else:
+                    frames = self._line_frames(reader, first)
+                async for line in frames:
+                    if line.strip():
+                        await self.submit(*parser(line))
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            # Peer went away, or the framing can't be recovered
+            pass
+        finally:
+            writer.close()
+
+    async def _writer(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            entry = await self._queue.get()
+            if entry is None:
+                break
+            batch = [entry]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        entry = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    entry = self._queue.get_nowait()
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            await loop.run_in_executor(self._executor, self.db.wait_for_write_capacity,
+                                       self.max_pending_writes)
+            stored = await loop.run_in_executor(self._executor, self.db.add_logs, batch)
+            self.stats['batches'] += 1
+            self.stats['stored'] += len(stored)
+            self.stats['failed'] += len(batch) - len(stored)
+
+
+def start_in_thread(db, host='0.0.0.0', udp_port=None, tcp_port=None, json_port=None, **options):
+    """Run a LogReceiver on its own event loop in a daemon thread; returns (receiver, ports)
+
+    Stop it with stop_in_thread(receiver).
+    """
+    receiver = LogReceiver(db, **options)
+    started = threading.Event()
+    result = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            result['ports'] = loop.run_until_complete(
+                receiver.start(host, udp_port=udp_port, tcp_port=tcp_port, json_port=json_port))
+        except Exception as e:
+            result['error'] = e
+            started.set()
+            return
+        receiver.loop = loop
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True, name='log-receiver').start()
+    started.wait()
+    if 'error' in result:
+        raise result['error']
+    return receiver, result['ports']
+
+
+def stop_in_thread(receiver, timeout=30):
+    """Stop a receiver started with start_in_thread, storing what it already received"""
+    asyncio.run_coroutine_threadsafe(receiver.stop(), receiver.loop).result(timeout)
+    receiver.loop.call_soon_threadsafe(receiver.loop.stop)
+
+
+async def _serve(args):
+    db = get_db_manager(args.data_dir)
+    receiver = LogReceiver(db, batch_size=args.batch_size, flush_interval=args.flush_ms / 1000,
+                           queue_size=args.queue_size, udp_rcvbuf=args.udp_rcvbuf)
+    ports = await receiver.start(args.host, udp_port=args.udp, tcp_port=args.tcp, json_port=args.json_tcp)
+    print(f"Receiving logs on {args.host}: " + ', '.join(f'{name} {port}' for name, port in ports.items()))
+    if receiver.udp_rcvbuf_granted is not None and receiver.udp_rcvbuf_granted < args.udp_rcvbuf:
+        print(f"UDP receive buffer is {receiver.udp_rcvbuf_granted} bytes, not {args.udp_rcvbuf}; "
+              f"raise net.core.rmem_max to allow more")
+    try:
+        while True:
+            await asyncio.sleep(args.stats_interval)
+            print(json.dumps(receiver.stats))
+    finally:
+        await receiver.stop()
+        if hasattr(db, 'close'):
+            db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Syslog / NDJSON log receiver')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--udp', type=int, help='syslog UDP port')
+    parser.add_argument('--tcp', type=int, help='syslog TCP port')
+    parser.add_argument('--json-tcp', type=int, help='NDJSON TCP port')
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--flush-ms', type=float, default=50)
+    parser.add_argument('--queue-size', type=int, default=10000)
+    parser.add_argument('--udp-rcvbuf', type=int, default=UDP_RCVBUF_BYTES,
+                        help='UDP socket receive buffer in bytes (0 keeps the system default)')
+    parser.add_argument('--stats-interval', type=float, default=60)
+    args = parser.parse_args()
+    if args.udp is None and args.tcp is None and args.json_tcp is None:
+        parser.error('give at least one of --udp, --tcp, --json-tcp')
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""On-disk encodings for JSON record collections
+
+Usage:
+    python record_format.py migrate --format dict data/logs.json data/alerts.json
+"""
+import argparse
+import json
+import os
+import tempfile
+
+# pretty: indented JSON array (the original format)
+# compact: minified JSON array
+# dict: dictionary-encoded rows, see encode_records
+FILE_FORMATS = ('pretty', 'compact', 'dict')
+# Format of collections that DB_FILE_FORMAT doesn't name
+DEFAULT_FILE_FORMAT = 'compact'
+DICT_FORMAT_TAG = 'dict-v1'
+
+def _dictionary_fields(fields, rows):
+    """Fields worth dictionary-encoding: scalar values that repeat a lot"""
+    encoded = []
+    for i, field in enumerate(fields):
+        values = set()
+        for row in rows:
+            value = row[i]
+            if not isinstance(value, (str, bool)) and value is not None:
+                break
+            values.add(value)
+        else:
+            if len(values) <= max(len(rows) // 2, 1):
+                encoded.append(field)
+    return encoded
+
+def encode_records(records, file_format='pretty'):
+    """Serialize a list of records to a JSON string in the given format
+
+    The 'dict' format stores the field names once and every record as a row
+    of values. Fields whose values repeat (severity, service, empty stack
+    traces, ...) are replaced by indexes into a per-field dictionary:
+
+        {"format": "dict-v1", "fields": [...], "dictionaries": {field: [values]},
+         "rows": [[...], ...]}
+
+    Records that don't have exactly the common fields are kept as objects.
+    """
+    if file_format == 'pretty':
+        return json.dumps(records, indent=2)
+    if file_format == 'compact':
+        return json.dumps(records, separators=(',', ':'))
+    if file_format != 'dict':
+        raise ValueError(f"Unknown file format: {file_format}")
+
+    fields = list(records[0]) if records else []
+    field_set = set(fields)
+    rows = [[record[field] for field in fields] if set(record) == field_set else record
+            for record in records]
+    regular = [row for row in rows if isinstance(row, list)]
+
+    dictionaries = {}
+    for field in _dictionary_fields(fields, regular):
+        i = fields.index(field)
+        lookup = {}
+        for row in regular:
+            row[i] = lookup.setdefault(row[i], len(lookup))
+        dictionaries[field] = list(lookup)
+
+    return json.dumps({'format': DICT_FORMAT_TAG, 'fields': fields,
+                       'dictionaries': dictionaries, 'rows': rows}, separators=(',', ':'))
+
+def decode_records(data):
+    """Turn parsed file contents in any supported format back into a list of records"""
+    if isinstance(data, list):
+        return data
+    if not isinstance(data, dict) or data.get('format') != DICT_FORMAT_TAG:
+        raise ValueError('Not a record list')
+
+    fields = data['fields']
+    dictionaries = data['dictionaries']
+    lookups = [dictionaries.get(field) for field in fields]
+    if not dictionaries:
+        return [dict(zip(fields, row)) if isinstance(row, list) else row for row in data['rows']]
+
+    records = []
+    for row in data['rows']:
+        if isinstance(row, list):
+            records.append({field: value if lookup is None else lookup[value]
+                            for field, lookup, value in zip(fields, lookups, row)})
+        else:
+            records.append(row)
+    return records
+
+def load_records(filename):
+    """Read a record file in any supported format; a missing file is empty"""
+    try:
+        with open(filename, 'r') as f:
+            return decode_records(json.load(f))
+    except FileNotFoundError:
+        return []
+
+def write_records(filename, records, file_format='pretty', fsync=False):
+    """Atomically replace `filename` with the records in the given format"""
+    fd, temp_name = tempfile.mkstemp(prefix=os.path.basename(filename) + '.',
+                                     suffix='.tmp', dir=os.path.dirname(filename) or '.')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(encode_records(records, file_format))
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_name, filename)
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.unlink(temp_name)
+        raise
+
+def parse_file_formats(setting, names):
+    """Parse 'compact' or 'logs=dict,alerts=compact' into a format per collection
+
+    Collections the setting doesn't name get DEFAULT_FILE_FORMAT, or the
+    format given without a name ('dict,logs=compact'), wherever it appears.
+    Raises ValueError for unknown formats and collection names.
+    """
+    default = DEFAULT_FILE_FORMAT
+    overrides = {}
+    for part in (setting or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, file_format = part.rpartition('=')
+        name = name.strip()
+        file_format = file_format.strip()
+        if file_format not in FILE_FORMATS:
+            raise ValueError(f"Unknown file format: {file_format}")
+        if not name:
+            default = file_format
+        elif name in names:
+            overrides[name] = file_format
+        else:
+            raise ValueError(f"Unknown collection: {name}")
+    return {name: overrides.get(name, default) for name in names}
+
+def migrate(args):
+    """Rewrite record files in place in the requested format"""
+    for filename in args.files:
+        before = os.path.getsize(filename)
+        write_records(filename, load_records(filename), args.format, fsync=True)
+        after = os.path.getsize(filename)
+        print(f"{filename}: {before:,} -> {after:,} bytes ({args.format})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record file format tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help='rewrite files in another format '
+                                                           '(stop the server first)')
+    migrate_parser.add_argument('--format', required=True, choices=FILE_FORMATS)
+    migrate_parser.add_argument('files', nargs='+')
+    migrate_parser.set_defaults(func=migrate)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """One computation in progress, shared by every caller asking for the same entry"""
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache:
+    """LRU cache of computed responses, invalidated by storage version counters
+
+    Each entry is stored with the `version` it was computed from (for the
+    views, the versions of the collections they read). A lookup with any
+    other version is a miss and drops the entry, so a write to one of
+    those collections invalidates it without the writers knowing about the
+    cache. Entries also expire after `ttl` seconds (for results that depend
+    on the clock), and the least recently used ones are evicted beyond
+    `max_entries`.
+
+    Concurrent misses for the same key and version wait for one computation
+    instead of each running it.
+    """
+
+    def __init__(self, max_entries=256, ttl=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._flights = {}
+
+        # Metrics
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._invalidations = 0
+        self._expirations = 0
+        self._evictions = 0
+        self._errors = 0
+        self._compute_time = 0.0
+
+    def get_or_compute(self, key, version, compute, ttl=None):
+        """The cached value for (key, version), calling `compute()` to fill a miss
+
+        Exceptions from `compute` reach every caller waiting on it and
+        nothing is cached.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, expires_at, value = entry
+                if entry_version == version and now < expires_at:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+                if entry_version != version:
+                    self._invalidations += 1
+                else:
+                    self._expirations += 1
+            flight = self._flights.get((key, version))
+            leader = flight is None
+            if leader:
+                flight = self._flights[(key, version)] = _Flight()
+                self._misses += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        started = time.perf_counter()
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                del self._flights[(key, version)]
+                self._compute_time += elapsed
+                if flight.error is not None:
+                    self._errors += 1
+                else:
+                    # A newer version may have been stored meanwhile; keep it
+                    current = self._entries.get(key)
+                    if current is None or current[0] == version:
+                        self._entries[key] = (version, time.monotonic() + (self.ttl if ttl is None else ttl),
+                                              flight.value)
+                        self._entries.move_to_end(key)
+                        while len(self._entries) > self.max_entries:
+                            self._entries.popitem(last=False)
+                            self._evictions += 1
+            flight.done.set()
+        return flight.value
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_metrics(self):
+        """Hit/miss counters and size for monitoring"""
+        with self._lock:
+            lookups = self._hits + self._misses + self._coalesced
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'coalesced': self._coalesced,
+                'hit_ratio': round((self._hits + self._coalesced) / lookups, 4) if lookups else 0.0,
+                'invalidations': self._invalidations,
+                'expirations': self._expirations,
+                'evictions': self._evictions,
+                'errors': self._errors,
+                'avg_compute_ms': round(self._compute_time / self._misses * 1000, 3) if self._misses else 0.0
+            }
@@ -0,0 +1,186 @@
+import bisect
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+# Bucket key = ISO timestamp prefix; buckets older than `retention` are pruned
+ROLLUP_TIERS = {
+    'minute': {'key_length': 16, 'step': timedelta(minutes=1), 'retention': timedelta(days=2)},
+    'hour': {'key_length': 13, 'step': timedelta(hours=1), 'retention': timedelta(days=90)},
+    'day': {'key_length': 10, 'step': timedelta(days=1), 'retention': None},
+}
+ROLLUP_FIELDS = ('severity', 'service')
+
+# Completes a key prefix into a full ISO timestamp for the start of its bucket
+_KEY_PADDING = '0000-01-01T00:00:00'
+
+def bucket_start(key):
+    """ISO timestamp at which the bucket with this key starts"""
+    return key + _KEY_PADDING[len(key):]
+
+def retention_key(tier, now=None, tiers=ROLLUP_TIERS):
+    """Bucket key before which a tier's buckets have expired, or None to keep all"""
+    settings = tiers[tier]
+    if settings['retention'] is None:
+        return None
+    return ((now or datetime.now()) - settings['retention']).isoformat()[:settings['key_length']]
+
+def fill_gaps(rows, tier, tiers=ROLLUP_TIERS):
+    """Insert zero rows for empty buckets between the first and last row"""
+    if not rows:
+        return rows
+    step = tiers[tier]['step']
+    filled = []
+    expected = datetime.fromisoformat(rows[0]['timestamp'])
+    for row in rows:
+        current = datetime.fromisoformat(row['timestamp'])
+        while expected < current:
+            filled.append({'timestamp': expected.isoformat(), 'total': 0,
+                           'by_severity': {}, 'by_service': {}})
+            expected += step
+        filled.append(row)
+        expected = current + step
+    return filled
+
+class RollupStore:
+    """Per-minute, per-hour and per-day log counts by severity and service
+
+    Counts are added as logs are inserted, so charts and forecasts over long
+    ranges read one row per bucket instead of the raw logs. Each tier keeps
+    its own retention, independent of raw log retention. The store is saved
+    to a JSON file with a watermark (the highest log id counted); on startup
+    `catch_up` counts any stored logs past the watermark, so a crash between
+    saves loses nothing.
+    """
+
+    def __init__(self, path, tiers=None):
+        self.path = path
+        self.tiers = tiers or ROLLUP_TIERS
+        self._lock = threading.Lock()
+        self._buckets = {tier: {} for tier in self.tiers}
+        self._keys = {tier: [] for tier in self.tiers}  # sorted bucket keys
+        self.watermark = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Error loading rollups from {self.path}: {e}")
+            return
+        self.watermark = data.get('watermark', 0)
+        for tier, buckets in data.get('tiers', {}).items():
+            if tier in self.tiers:
+                self._buckets[tier] = buckets
+                self._keys[tier] = sorted(buckets)
+
+    def save(self):
+        """Atomically write the rollups and watermark to disk"""
+        with self._lock:
+            data = json.dumps({'watermark': self.watermark, 'tiers': self._buckets},
+                              separators=(',', ':'))
+        directory = os.path.dirname(self.path) or '.'
+        temp_name = None
+        try:
+            fd, temp_name = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.',
+                                             suffix='.tmp', dir=directory)
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.replace(temp_name, self.path)
+        except Exception as e:
+            print(f"Error saving rollups to {self.path}: {e}")
+            if temp_name and os.path.exists(temp_name):
+                os.unlink(temp_name)
+
+    def add_many(self, logs):
+        """Count a batch of newly inserted logs"""
+        with self._lock:
+            for log in logs:
+                self._add(log)
+
+    def catch_up(self, logs):
+        """Count stored logs newer than the watermark; returns how many were added"""
+        added = 0
+        with self._lock:
+            for log in logs:
+                if isinstance(log.get('id'), int) and log['id'] > self.watermark:
+                    self._add(log)
+                    added += 1
+        return added
+
+    def _add(self, log):
+        timestamp = log.get('timestamp') or ''
+        for tier, settings in self.tiers.items():
+            key = timestamp[:settings['key_length']]
+            if len(key) != settings['key_length']:
+                continue
+            bucket = self._buckets[tier].get(key)
+            if bucket is None:
+                bucket = self._buckets[tier][key] = {'total': 0, **{field: {} for field in ROLLUP_FIELDS}}
+                keys = self._keys[tier]
+                if not keys or key > keys[-1]:
+                    keys.append(key)
+                else:
+                    bisect.insort(keys, key)
+            bucket['total'] += 1
+            for field in ROLLUP_FIELDS:
+                value = log.get(field)
+                bucket[field][value] = bucket[field].get(value, 0) + 1
+        if isinstance(log.get('id'), int) and log['id'] > self.watermark:
+            self.watermark = log['id']
+
+    def clear(self):
+        """Forget every bucket, e.g. after the logs were reset"""
+        with self._lock:
+            self._buckets = {tier: {} for tier in self.tiers}
+            self._keys = {tier: [] for tier in self.tiers}
+            self.watermark = 0
+
+    def prune(self, now=None):
+        """Drop buckets that fall outside their tier's retention"""
+        dropped = {}
+        with self._lock:
+            for tier in self.tiers:
+                cutoff = retention_key(tier, now, self.tiers)
+                if cutoff is None:
+                    continue
+                keys = self._keys[tier]
+                count = bisect.bisect_left(keys, cutoff)
+                for key in keys[:count]:
+                    del self._buckets[tier][key]
+                self._keys[tier] = keys[count:]
+                dropped[tier] = count
+        return dropped
+
+    def query(self, tier='hour', since=None, until=None, fill=False):
+        """Buckets of a tier within [since, until], oldest first
+
+        Each row has the bucket start `timestamp`, `total`, `by_severity` and
+        `by_service`. With `fill`, empty buckets between the first and last
+        returned ones are included as zero rows.
+        """
+        if tier not in self.tiers:
+            raise ValueError(f"Unknown rollup tier: {tier}")
+        length = self.tiers[tier]['key_length']
+        with self._lock:
+            keys = self._keys[tier]
+            lo = bisect.bisect_left(keys, since[:length]) if since else 0
+            hi = bisect.bisect_right(keys, until[:length]) if until else len(keys)
+            rows = [{
+                'timestamp': bucket_start(key),
+                'total': self._buckets[tier][key]['total'],
+                'by_severity': dict(self._buckets[tier][key]['severity']),
+                'by_service': dict(self._buckets[tier][key]['service'])
+            } for key in keys[lo:hi]]
+        return fill_gaps(rows, tier, self.tiers) if fill else rows
+
+    def get_stats(self):
+        """Bucket counts per tier and the watermark"""
+        with self._lock:
+            return {'watermark': self.watermark,
+                    'buckets': {tier: len(keys) for tier, keys in self._keys.items()}}
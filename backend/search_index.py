@@ -0,0 +1,188 @@
+import heapq
+import math
+import re
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9_]+')
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens of a text field"""
+    return TOKEN_PATTERN.findall(str(text).lower()) if text else []
+
+def parse_query(query):
+    """Split a query into ('term', t), ('prefix', p) and ('phrase', [terms]) clauses
+
+    `"network timeout"` is a phrase, `time*` a prefix (two characters or
+    more) and anything else a term. A word that splits into several tokens,
+    like `api-gateway`, is treated as a phrase.
+    """
+    clauses = []
+    for phrase, word in QUERY_PATTERN.findall(query or ''):
+        terms = tokenize(phrase or word)
+        if not terms:
+            continue
+        if phrase or len(terms) > 1:
+            clauses.append(('phrase', terms) if len(terms) > 1 else ('term', terms[0]))
+        elif word.endswith('*') and len(terms[0]) >= 2:
+            clauses.append(('prefix', terms[0]))
+        else:
+            clauses.append(('term', terms[0]))
+    return clauses
+
+
+class SearchIndex:
+    """Inverted token index over the text fields of a collection
+
+    Each term maps to parallel lists of record ids, term frequencies and
+    document lengths.
+    Like RecordCollection, the lists are only appended to in place and
+    rebuilt on removal, so searches read them without taking a lock. Results
+    are ranked with BM25 (newest first on ties). Phrases are checked against
+    the record text only for candidates that make it into the results.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.clear()
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def clear(self):
+        """Remove every document"""
+        self._postings = {}  # term -> ([record ids], [term frequencies], [doc lengths])
+        self._prefixes = {}  # first two characters -> terms, for prefix queries
+        self._lengths = {}  # record id -> token count
+        self._total_length = 0
+
+    def _tokens(self, record):
+        return [token for field in self.fields for token in tokenize(record.get(field))]
+
+    def add(self, record):
+        """Index the text fields of a record"""
+        record_id = record.get('id')
+        if record_id in self._lengths:
+            self.remove_many([record])
+        tokens = self._tokens(record)
+        length = len(tokens)
+        self._lengths[record_id] = length
+        self._total_length += length
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        postings = self._postings
+        for term, count in counts.items():
+            entry = postings.get(term)
+            if entry is None:
+                entry = postings[term] = ([], [], [])
+                self._prefixes.setdefault(term[:2], []).append(term)
+            entry[0].append(record_id)
+            entry[1].append(count)
+            entry[2].append(length)
+
+    def remove_many(self, records):
+        """Drop records from the index, rebuilding each affected posting list once"""
+        removed = set()
+        terms = set()
+        for record in records:
+            record_id = record.get('id')
+            length = self._lengths.pop(record_id, None)
+            if length is None:
+                continue
+            removed.add(record_id)
+            self._total_length -= length
+            terms.update(self._tokens(record))
+
+        for term in terms:
+            entry = self._postings.get(term, ((), (), ()))
+            kept = [posting for posting in zip(*entry) if posting[0] not in removed]
+            if kept:
+                self._postings[term] = tuple(list(column) for column in zip(*kept))
+            else:
+                self._postings.pop(term, None)
+                self._prefixes[term[:2]] = [t for t in self._prefixes.get(term[:2], []) if t != term]
+
+    def _add_scores(self, scores, term, doc_count, avg_length, only=None):
+        """Add the BM25 contribution of `term` to `scores`, optionally only for ids in `only`"""
+        ids, counts, lengths = self._postings.get(term, ((), (), ()))
+        if not ids:
+            return
+        idf = math.log(1 + (doc_count - len(ids) + 0.5) / (len(ids) + 0.5))
+        norm = K1 * (1 - B)
+        scale = K1 * B / avg_length
+        if only is None and not scores:
+            scores.update({record_id: idf * count * (K1 + 1) / (count + norm + scale * length)
+                           for record_id, count, length in zip(ids, counts, lengths)})
+            return
+        for record_id, count, length in zip(ids, counts, lengths):
+            if only is None or record_id in only:
+                scores[record_id] = scores.get(record_id, 0.0) + idf * count * (K1 + 1) / (count + norm + scale * length)
+
+    def _contains_phrase(self, record, terms):
+        for field in self.fields:
+            tokens = tokenize(record.get(field))
+            for i in range(len(tokens) - len(terms) + 1):
+                if tokens[i:i + len(terms)] == terms:
+                    return True
+        return False
+
+    def search(self, query, resolve, limit=100):
+        """Return [(record, score)] for the best matches of `query`, best first
+
+        Every clause must match. `resolve(record_id)` maps an id to its record,
+        or None to skip it (filtered out, or not in the caller's snapshot).
+        """
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+        doc_count = max(len(self._lengths), 1)
+        avg_length = (self._total_length / doc_count) or 1.0
+
+        # Each group is a set of alternative terms of which one must match:
+        # a single term, a prefix expansion, or one word of a phrase
+        groups = []
+        phrases = []
+        for kind, value in clauses:
+            if kind == 'prefix':
+                groups.append({term for term in self._prefixes.get(value[:2], []) if term.startswith(value)})
+            elif kind == 'phrase':
+                groups.extend({term} for term in value)
+                phrases.append(value)
+            else:
+                groups.append({value})
+
+        # Score the most selective group in full, then only its matches
+        groups.sort(key=lambda group: sum(len(self._postings.get(term, ((),))[0]) for term in group))
+        candidates = {}
+        for term in groups[0]:
+            self._add_scores(candidates, term, doc_count, avg_length)
+        for group in groups[1:]:
+            matched = {}
+            for term in group:
+                self._add_scores(matched, term, doc_count, avg_length, only=candidates)
+            candidates = {record_id: candidates[record_id] + score for record_id, score in matched.items()}
+            if not candidates:
+                return []
+
+        # Rank only as deep as needed, widening if filters reject too many
+        depth = limit
+        while True:
+            # Candidates are roughly in insertion order; feeding them newest
+            # first means ties rarely displace anything already in the heap
+            ranked = heapq.nlargest(depth, reversed(candidates.items()), key=lambda item: (item[1], item[0]))
+            results = []
+            for record_id, score in ranked:
+                record = resolve(record_id)
+                if record is None:
+                    continue
+                if all(self._contains_phrase(record, terms) for terms in phrases):
+                    results.append((record, score))
+                    if len(results) >= limit:
+                        return results
+            if depth >= len(candidates):
+                return results
+            depth *= 4
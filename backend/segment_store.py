@@ -0,0 +1,298 @@
+import json
+import os
+import shutil
+
+
+class SegmentStore:
+    """Append-only JSONL segment storage for a single collection
+
+    Every record is written as one JSON line to the active segment file.
+    Updates to existing records are appended as ``{"_op": "update", ...}``
+    lines and applied in order when the segments are replayed, so a write
+    never has to touch data that is already on disk. Lines are buffered until
+    ``sync()`` so a batch of appends costs a single write.
+    """
+
+    SEGMENT_PREFIX = 'segment-'
+    SEGMENT_SUFFIX = '.jsonl'
+
+    def __init__(self, directory, segment_max_records=10000, retain_records=None):
+        self.directory = directory
+        self.segment_max_records = segment_max_records
+        # Whole segments older than the newest `retain_records` records are dropped on roll
+        self.retain_records = retain_records
+        self._segments = []  # [segment_number, record_count], oldest first
+        self._update_count = 0
+        self._handle = None
+        self._dirty = False
+
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f'{self.SEGMENT_PREFIX}{number:06d}{self.SEGMENT_SUFFIX}')
+
+    def _list_segment_numbers(self):
+        numbers = []
+        for name in os.listdir(self.directory):
+            if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX):
+                try:
+                    numbers.append(int(name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(numbers)
+
+    def _repair_tail(self, path):
+        """Drop a partially written last line left behind by a crash"""
+        with open(path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def load(self):
+        """Replay all segments and return the live records, oldest first"""
+        self.close()
+        records = []
+        positions = {}
+        self._segments = []
+        self._update_count = 0
+
+        for number in self._list_segment_numbers():
+            path = self._segment_path(number)
+            self._repair_tail(path)
+            count = 0
+            with open(path, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        item = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+                    if item.get('_op') == 'update':
+                        self._update_count += 1
+                        index = positions.get(item.get('id'))
+                        if index is not None:
+                            records[index].update(item.get('fields', {}))
+                        continue
+
+                    positions[item.get('id')] = len(records)
+                    records.append(item)
+                    count += 1
+            self._segments.append([number, count])
+
+        return records
+
+    def has_data(self):
+        """Check whether any segment file exists"""
+        return bool(self._list_segment_numbers())
+
+    def _open_active(self):
+        if self._handle is not None:
+            return self._handle
+        if not self._segments:
+            self._segments.append([1, 0])
+        self._handle = open(self._segment_path(self._segments[-1][0]), 'a')
+        return self._handle
+
+    def _write_line(self, item):
+        handle = self._open_active()
+        handle.write(json.dumps(item, separators=(',', ':')) + '\n')
+        self._dirty = True
+
+    def sync(self, fsync=False):
+        """Flush buffered lines to the OS, and to disk when `fsync` is set"""
+        if self._handle is None or not self._dirty:
+            return
+        self._handle.flush()
+        if fsync:
+            os.fsync(self._handle.fileno())
+        self._dirty = False
+
+    def append(self, record):
+        """Append a new record to the active segment"""
+        if self._segments and self._segments[-1][1] >= self.segment_max_records:
+            self.roll()
+        self._write_line(record)
+        self._segments[-1][1] += 1
+
+    def append_update(self, record_id, fields):
+        """Append an update for an existing record"""
+        self._write_line({'_op': 'update', 'id': record_id, 'fields': fields})
+        self._update_count += 1
+
+    def roll(self):
+        """Close the active segment and start a new one"""
+        self.sync(fsync=True)
+        self.close()
+        next_number = self._segments[-1][0] + 1 if self._segments else 1
+        self._segments.append([next_number, 0])
+        self._drop_expired_segments()
+
+    def _drop_expired_segments(self):
+        if not self.retain_records:
+            return
+        # Keep dropping the oldest segment while the rest still hold enough records
+        while len(self._segments) > 1:
+            remaining = sum(count for _, count in self._segments[1:])
+            if remaining < self.retain_records:
+                break
+            number, _ = self._segments.pop(0)
+            try:
+                os.remove(self._segment_path(number))
+            except OSError as e:
+                print(f"Error removing segment {number} in {self.directory}: {e}")
+
+    def size_bytes(self):
+        """Total size of the segment files on disk"""
+        total = 0
+        for number in self._list_segment_numbers():
+            try:
+                total += os.path.getsize(self._segment_path(number))
+            except OSError:
+                continue
+        return total
+
+    def needs_compaction(self):
+        """Whether compact() would shrink the store"""
+        return len(self._segments) > 1 or self._update_count > 0
+
+    def compact(self):
+        """Rewrite all segments as one, with pending updates folded into their records"""
+        records = self.load()
+        old_numbers = [number for number, _ in self._segments]
+        number = (old_numbers[-1] if old_numbers else 0) + 1
+        path = self._segment_path(number)
+
+        # Write next to the final name and rename, so a crash never loses data
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        for old_number in old_numbers:
+            os.remove(self._segment_path(old_number))
+        self._segments = [[number, len(records)]]
+        self._update_count = 0
+        return len(records)
+
+    def clear(self):
+        """Remove every segment file, leaving a fresh empty segment behind"""
+        self.close()
+        numbers = self._list_segment_numbers()
+        for number in numbers:
+            os.remove(self._segment_path(number))
+        # The empty segment marks the collection as initialized, so the
+        # legacy JSON file is not imported again on the next start
+        self._segments = [[(numbers[-1] if numbers else 0) + 1, 0]]
+        self._open_active()
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+            self._dirty = False
+
+
+class PartitionedSegmentStore:
+    """Segment stores split into one sub-directory per time partition
+
+    ``key_function`` maps a record to its partition key. Dropping a partition
+    removes its directory without touching any other data.
+    """
+
+    def __init__(self, directory, key_function, segment_max_records=10000):
+        self.directory = directory
+        self.key_function = key_function
+        self.segment_max_records = segment_max_records
+        self.initialized = os.path.exists(directory)
+        self._stores = {}
+
+        if not self.initialized:
+            os.makedirs(directory)
+
+    def _partition_store(self, key):
+        store = self._stores.get(key)
+        if store is None:
+            # Records without a usable timestamp land in the '_' partition
+            store = SegmentStore(os.path.join(self.directory, key or '_'),
+                                 segment_max_records=self.segment_max_records)
+            self._stores[key] = store
+        return store
+
+    def load(self):
+        """Replay every partition and return the live records, oldest partition first"""
+        self._migrate_flat_segments()
+        records = []
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if not os.path.isdir(path):
+                continue
+            key = '' if name == '_' else name
+            records.extend(self._partition_store(key).load())
+        return records
+
+    def _migrate_flat_segments(self):
+        """Move records from an unpartitioned segment layout into partitions"""
+        flat = SegmentStore(self.directory, segment_max_records=self.segment_max_records)
+        numbers = flat._list_segment_numbers()
+        if not numbers:
+            return
+        for record in flat.load():
+            self.append(record)
+        self.close()
+        for number in numbers:
+            os.remove(flat._segment_path(number))
+
+    def append(self, record):
+        """Append a new record to its partition"""
+        self._partition_store(self.key_function(record)).append(record)
+
+    def append_update(self, record, fields):
+        """Append an update for an existing record to the record's partition"""
+        self._partition_store(self.key_function(record)).append_update(record.get('id'), fields)
+
+    def partition_sizes(self):
+        """Size on disk of every partition, oldest first"""
+        return [(key, self._stores[key].size_bytes()) for key in sorted(self._stores)]
+
+    def drop(self, key):
+        """Delete a whole partition"""
+        store = self._stores.pop(key, None)
+        if store is None:
+            return
+        store.close()
+        shutil.rmtree(store.directory, ignore_errors=True)
+
+    def compact(self, keep_open=()):
+        """Compact every partition except those in `keep_open`; return how many were compacted"""
+        compacted = 0
+        for key, store in list(self._stores.items()):
+            if key in keep_open or not store.needs_compaction():
+                continue
+            store.compact()
+            compacted += 1
+        return compacted
+
+    def clear(self):
+        """Delete every partition"""
+        for key in list(self._stores):
+            self.drop(key)
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def sync(self, fsync=False):
+        """Flush buffered lines of every partition"""
+        for store in self._stores.values():
+            store.sync(fsync)
+
+    def close(self):
+        for store in self._stores.values():
+            store.close()
@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import threading
+
+class SequenceAllocator:
+    """Monotonic id sequences, one per collection, shared by every writer
+
+    Ids are handed out from memory in O(1). The file only records the upper
+    end of the block reserved so far (hi/lo allocation), so it is written
+    once per ``block_size`` ids instead of on every insert. After a restart,
+    allocation resumes past the last reservation. Ids can skip ahead, but
+    they are never reused, not even after the collection is cleared.
+    """
+
+    def __init__(self, path, block_size=1000):
+        self.path = path
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._reserved = self._load()
+        # Start past everything a previous run may have handed out
+        self._last = dict(self._reserved)
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return {name: int(value) for name, value in data.items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print(f"Error loading sequences from {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        """Durably record the reservations before any id from them is used"""
+        directory = os.path.dirname(self.path) or '.'
+        fd, temp_name = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.',
+                                         suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._reserved, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_name, self.path)
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.unlink(temp_name)
+            raise
+
+    def allocate(self, name, count=1):
+        """Reserve `count` consecutive ids and return the first one"""
+        with self._lock:
+            first = self._last.get(name, 0) + 1
+            self._last[name] = first + count - 1
+            if self._last[name] > self._reserved.get(name, 0):
+                self._reserved[name] = self._last[name] + self.block_size
+                self._save()
+            return first
+
+    def observe(self, name, value):
+        """Make sure ids already in use, up to `value`, are never allocated"""
+        if not isinstance(value, int):
+            return
+        with self._lock:
+            if value > self._last.get(name, 0):
+                self._last[name] = value
+
+    def current(self, name):
+        """The last id handed out or observed for a sequence"""
+        with self._lock:
+            return self._last.get(name, 0)
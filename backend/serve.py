@@ -0,0 +1,127 @@
+"""Production server: one collector process and N web worker processes
+
+Usage:
+    DB_ENGINE=sqlite python serve.py --workers 4 --port 5001
+    python serve.py --workers 4 --no-collector   # collector.py runs elsewhere
+
+The parent binds the listening socket once and forks the workers, which
+accept connections from it in turn (pre-fork, like gunicorn), each with a
+threaded WSGI server. Workers import app.py after the fork with
+COLLECTOR=external, so they hold no background loops or shared in-memory
+state; the monitoring, demo log and ingestion loops run once, in
+collector.py. A worker that dies is replaced. SIGINT or SIGTERM stops
+everything.
+
+Several processes need storage they can all write: SQLite (DB_ENGINE=sqlite).
+The JSON engine keeps collections in the memory of one process, so with it
+this serves a single worker with the collector embedded.
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import traceback
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def run_worker(sock, host, port):
+    """Serve the app on the shared socket until terminated; runs in a forked child"""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # Ctrl-C reaches the whole process group; the parent stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import app
+    from werkzeug.serving import make_server
+    server = make_server(host, port, app.app, threaded=True, fd=sock.fileno())
+    try:
+        server.serve_forever()
+    finally:
+        # Writes still queued by an embedded collector
+        app.db_manager.close()
+
+def spawn_worker(sock, host, port):
+    pid = os.fork()
+    if pid == 0:
+        # The child must never return into the parent's loop
+        status = 1
+        try:
+            run_worker(sock, host, port)
+        except SystemExit:
+            status = 0
+        except BaseException:
+            traceback.print_exc()
+        os._exit(status)
+    return pid
+
+def start_collector():
+    return subprocess.Popen([sys.executable, os.path.join(BACKEND_DIR, 'collector.py')])
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the API with several worker processes')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--no-collector', action='store_true', help='collector.py is run separately')
+    args = parser.parse_args()
+
+    workers = max(args.workers, 1)
+    if os.environ.get('DB_ENGINE', 'json') != 'sqlite':
+        if workers > 1 or args.no_collector:
+            print('JSON storage is single-process: serving 1 worker with the embedded collector '
+                  '(set DB_ENGINE=sqlite for more)')
+        workers, args.no_collector = 1, False
+        os.environ['COLLECTOR'] = 'embedded'
+    else:
+        os.environ['COLLECTOR'] = 'external'
+
+    collector = None
+    if os.environ['COLLECTOR'] == 'external':
+        # Creates the schema before several processes open the database at once
+        subprocess.run([sys.executable, os.path.join(BACKEND_DIR, 'collector.py'), '--init'], check=True)
+        if not args.no_collector:
+            collector = start_collector()
+
+    sock = socket.create_server((args.host, args.port), backlog=1024)
+    sock.set_inheritable(True)
+    pids = {spawn_worker(sock, args.host, args.port) for _ in range(workers)}
+    print(f"Serving on http://{args.host}:{args.port} with {workers} worker(s)")
+
+    # Raised inside waitpid, which would otherwise resume after the handler
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        while True:
+            pid, status = os.waitpid(-1, 0)
+            if pid in pids:
+                print(f"Worker {pid} exited with status {status}; starting a new one")
+                pids.discard(pid)
+                pids.add(spawn_worker(sock, args.host, args.port))
+            elif collector is not None and pid == collector.pid:
+                print(f"Collector exited with status {status}; starting a new one")
+                collector = start_collector()
+            else:
+                continue
+            # Don't spin if processes die right away
+            time.sleep(1)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in pids:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        if collector is not None:
+            collector.terminate()
+            collector.wait()
+        sock.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,727 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from change_feed import ChangeFeed
+from database import (SYSTEM_STATS_RETENTION_DAYS, decode_cursor, make_alert_entry, make_log_entry,
+                      make_stat_entry, retention_cutoff, run_periodically, shortest_retention)
+from record_format import load_records
+from rollups import ROLLUP_FIELDS, ROLLUP_TIERS, bucket_start, fill_gaps, retention_key
+from search_index import parse_query
+from sequences import SequenceAllocator
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        severity TEXT NOT NULL,
+        service TEXT NOT NULL,
+        message TEXT,
+        details TEXT,
+        stack_trace TEXT
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs (timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_logs_severity ON logs (severity, id)',
+    'CREATE INDEX IF NOT EXISTS idx_logs_service ON logs (service, id)',
+    '''CREATE TABLE IF NOT EXISTS alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        type TEXT,
+        message TEXT,
+        severity TEXT,
+        data TEXT,
+        acknowledged INTEGER NOT NULL DEFAULT 0,
+        acknowledged_at TEXT
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON alerts (timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_alerts_acknowledged ON alerts (acknowledged, id)',
+    'CREATE INDEX IF NOT EXISTS idx_alerts_acknowledged_at ON alerts (acknowledged_at)',
+    '''CREATE TABLE IF NOT EXISTS system_stats (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        cpu_percent REAL,
+        memory_percent REAL,
+        disk_percent REAL,
+        memory_total_gb REAL,
+        memory_used_gb REAL
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_system_stats_timestamp ON system_stats (timestamp)',
+]
+
+# Running log counts per field value ('total' uses an empty value), kept by triggers
+COUNTS_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS log_counts (
+        field TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (field, value)
+    ) WITHOUT ROWID''',
+    '''CREATE TRIGGER IF NOT EXISTS log_counts_insert AFTER INSERT ON logs BEGIN
+        INSERT INTO log_counts (field, value, count)
+        VALUES ('total', '', 1), ('severity', new.severity, 1), ('service', new.service, 1)
+        ON CONFLICT (field, value) DO UPDATE SET count = count + 1;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS log_counts_delete AFTER DELETE ON logs BEGIN
+        UPDATE log_counts SET count = count - 1
+        WHERE (field = 'total' AND value = '')
+           OR (field = 'severity' AND value = old.severity)
+           OR (field = 'service' AND value = old.service);
+    END''',
+]
+
+# Per-minute/hour/day log counts, kept by an insert trigger; unlike log_counts
+# they are not decremented when retention deletes the raw logs
+_ROLLUP_COLUMNS = [('total', "''")] + [(field, f'new.{field}') for field in ROLLUP_FIELDS]
+_ROLLUP_VALUES = ', '.join(
+    f"('{tier}', substr(new.timestamp, 1, {settings['key_length']}), '{field}', {value}, 1)"
+    for tier, settings in ROLLUP_TIERS.items() for field, value in _ROLLUP_COLUMNS)
+ROLLUPS_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS log_rollups (
+        tier TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        field TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (tier, bucket, field, value)
+    ) WITHOUT ROWID''',
+    f'''CREATE TRIGGER IF NOT EXISTS log_rollups_insert AFTER INSERT ON logs BEGIN
+        INSERT INTO log_rollups (tier, bucket, field, value, count)
+        VALUES {_ROLLUP_VALUES}
+        ON CONFLICT (tier, bucket, field, value) DO UPDATE SET count = count + 1;
+    END''',
+]
+
+# Change counters per table for HTTP validators, bumped by triggers on every
+# insert, update and delete, with the time of the last change (epoch seconds)
+VERSIONED_TABLES = ('logs', 'alerts', 'system_stats')
+_NOW_EPOCH = "(julianday('now') - 2440587.5) * 86400.0"
+VERSIONS_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS collection_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL,
+        modified REAL NOT NULL
+    ) WITHOUT ROWID''',
+] + [f'''CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+        UPDATE collection_versions SET version = version + 1, modified = {_NOW_EPOCH}
+        WHERE name = '{table}';
+    END''' for table in VERSIONED_TABLES for event in ('INSERT', 'UPDATE', 'DELETE')]
+
+# Full-text index over log text, kept in step with the logs table by triggers
+FTS_SCHEMA = [
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(
+        message, details, stack_trace,
+        content='logs', content_rowid='id', tokenize="unicode61 tokenchars '_'"
+    )''',
+    '''CREATE TRIGGER IF NOT EXISTS logs_fts_insert AFTER INSERT ON logs BEGIN
+        INSERT INTO logs_fts (rowid, message, details, stack_trace)
+        VALUES (new.id, new.message, new.details, new.stack_trace);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS logs_fts_delete AFTER DELETE ON logs BEGIN
+        INSERT INTO logs_fts (logs_fts, rowid, message, details, stack_trace)
+        VALUES ('delete', old.id, old.message, old.details, old.stack_trace);
+    END''',
+]
+
+LOG_COLUMNS = ('timestamp', 'severity', 'service', 'message', 'details', 'stack_trace')
+ALERT_COLUMNS = ('timestamp', 'type', 'message', 'severity', 'data', 'acknowledged', 'acknowledged_at')
+STAT_COLUMNS = ('timestamp', 'cpu_percent', 'memory_percent', 'disk_percent',
+                'memory_total_gb', 'memory_used_gb')
+
+def _insert_sql(table, columns):
+    placeholders = ', '.join('?' for _ in columns)
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+# Log and alert ids are allocated from sqlite_sequence on insert
+INSERT_LOG = _insert_sql('logs', ('id',) + LOG_COLUMNS)
+INSERT_ALERT = _insert_sql('alerts', ('id',) + ALERT_COLUMNS)
+INSERT_STAT = _insert_sql('system_stats', STAT_COLUMNS)
+RECORD_COLUMNS = {'logs': ('id',) + LOG_COLUMNS, 'alerts': ('id',) + ALERT_COLUMNS}
+
+class SQLiteDatabaseManager:
+    """SQLite-backed database manager with the same API as JSONDatabaseManager
+
+    Uses WAL journaling so readers never block the writer, one connection per
+    thread, parameterized statements (cached by sqlite3) and batched inserts
+    inside a single transaction. Retention deletes logs and alerts older than
+    ``retention_days`` through the timestamp indexes, and whole old days of
+    them while the database uses more than ``retention_max_bytes``; system
+    stats are deleted after ``stats_retention_days``. Log search uses an FTS5
+    table when the sqlite3 build has it, and falls back to LIKE scans.
+
+    Log and alert ids are allocated from ``sqlite_sequence`` inside the
+    transaction that inserts the rows, so several processes sharing the file
+    get disjoint ids in commit order; they start past the ids the JSON engine
+    reserved (``sequences.json`` in ``data_dir``).
+    Committed changes are published to ``changes`` like in
+    JSONDatabaseManager.
+    """
+
+    def __init__(self, db_path, data_dir='data', retention_days=None, retention_max_bytes=None,
+                 stats_retention_days=SYSTEM_STATS_RETENTION_DAYS):
+        self.db_path = db_path
+        self.data_dir = data_dir
+        self.storage_mode = 'sqlite'
+        self.retention_days = retention_days
+        self.retention_max_bytes = retention_max_bytes
+        self.stats_retention_days = stats_retention_days
+        self._compactor_thread = None
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self.changes = ChangeFeed()
+
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        if not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        with conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+        self._create_log_counts(conn)
+        self._create_log_rollups(conn)
+        self._create_versions(conn)
+        self.full_text = self._create_full_text_index(conn)
+        self._import_json_files()
+
+        # Never hand out an id the JSON engine may have used
+        sequences = SequenceAllocator(os.path.join(data_dir, 'sequences.json'))
+        with self._write_lock, conn:
+            for name in ('logs', 'alerts'):
+                self._reserve_ids(conn, name, 0, at_least=sequences.current(name))
+        self.initialized = True
+
+    def _connection(self):
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _create_log_counts(self, conn):
+        """Create the log counters, seeding them from existing rows the first time"""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'log_counts'").fetchone()
+        with conn:
+            for statement in COUNTS_SCHEMA:
+                conn.execute(statement)
+            if not exists:
+                conn.execute("INSERT INTO log_counts SELECT 'total', '', COUNT(*) FROM logs")
+                for field in ('severity', 'service'):
+                    conn.execute(f"INSERT INTO log_counts SELECT '{field}', {field}, COUNT(*) "
+                                 f"FROM logs GROUP BY {field}")
+
+    def _create_versions(self, conn):
+        """Create the change counters, starting at a random value so a re-created database doesn't repeat versions"""
+        with conn:
+            for statement in VERSIONS_SCHEMA:
+                conn.execute(statement)
+            for table in VERSIONED_TABLES:
+                conn.execute(f"INSERT OR IGNORE INTO collection_versions (name, version, modified) "
+                             f"VALUES (?, abs(random()) % 2147483648, {_NOW_EPOCH})", (table,))
+
+    def _create_log_rollups(self, conn):
+        """Create the rollup table, seeding it from existing rows the first time"""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'log_rollups'").fetchone()
+        with conn:
+            for statement in ROLLUPS_SCHEMA:
+                conn.execute(statement)
+            if not exists:
+                for tier, settings in ROLLUP_TIERS.items():
+                    bucket = f"substr(timestamp, 1, {settings['key_length']})"
+                    conn.execute(f"INSERT INTO log_rollups SELECT '{tier}', {bucket}, 'total', '', "
+                                 f"COUNT(*) FROM logs GROUP BY {bucket}")
+                    for field in ROLLUP_FIELDS:
+                        conn.execute(f"INSERT INTO log_rollups SELECT '{tier}', {bucket}, '{field}', "
+                                     f"{field}, COUNT(*) FROM logs GROUP BY {bucket}, {field}")
+
+    def _create_full_text_index(self, conn):
+        """Create the FTS5 table, indexing existing logs; False if FTS5 is unavailable"""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'logs_fts'").fetchone()
+        try:
+            with conn:
+                for statement in FTS_SCHEMA:
+                    conn.execute(statement)
+                if not exists:
+                    conn.execute("INSERT INTO logs_fts (logs_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search falling back to LIKE scans: {e}")
+            return False
+
+    def _import_json_files(self):
+        """Import existing JSON collections once, when the database is empty"""
+        conn = self._connection()
+        if conn.execute('SELECT 1 FROM sqlite_sequence LIMIT 1').fetchone():
+            return
+
+        def load(name):
+            path = os.path.join(self.data_dir, name)
+            try:
+                return list(reversed(load_records(path)))
+            except (OSError, ValueError):
+                return []
+
+        logs, alerts = load('logs.json'), load('alerts.json')
+        stats = load('system_stats.json')
+        with self._write_lock, conn:
+            conn.executemany(INSERT_LOG, [(r.get('id'),) + self._log_row(r) for r in logs])
+            conn.executemany(INSERT_ALERT, [(r.get('id'),) + self._alert_row(r) for r in alerts])
+            # Legacy stats files can repeat ids, so stats get fresh ones
+            conn.executemany(INSERT_STAT, [self._stat_row(r) for r in stats])
+
+    def _log_row(self, log_data):
+        entry = make_log_entry(log_data)
+        return tuple(entry[column] for column in LOG_COLUMNS)
+
+    def _alert_row(self, alert_data):
+        entry = make_alert_entry(alert_data)
+        entry['data'] = json.dumps(entry['data'])
+        entry['acknowledged'] = 1 if entry['acknowledged'] else 0
+        return tuple(entry[column] for column in ALERT_COLUMNS)
+
+    def _stat_row(self, stat_data):
+        entry = make_stat_entry(stat_data)
+        return tuple(entry[column] for column in STAT_COLUMNS)
+
+    def _alert_from_row(self, row):
+        alert = dict(row)
+        alert['data'] = json.loads(alert['data']) if alert['data'] else {}
+        alert['acknowledged'] = bool(alert['acknowledged'])
+        return alert
+
+    def _reserve_ids(self, conn, name, count, at_least=0):
+        """Take `count` ids from sqlite_sequence and return the first one
+
+        Must run inside a write transaction. The UPDATE comes first so the
+        write lock is held before the sequence is read, which keeps other
+        processes from reading the same value. `at_least` moves the sequence
+        past ids used elsewhere.
+        """
+        updated = conn.execute('UPDATE sqlite_sequence SET seq = MAX(seq, ?) + ? WHERE name = ?',
+                               (at_least, count, name)).rowcount
+        if not updated:
+            conn.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (name, at_least + count))
+        seq = conn.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (name,)).fetchone()[0]
+        return seq - count + 1
+
+    def _insert_many(self, name, sql, rows):
+        """Insert rows in one transaction and return them as records with their ids
+
+        The ids come from sqlite_sequence in the same transaction, so they
+        grow in commit order.
+        """
+        conn = self._connection()
+        with self._write_lock:
+            with conn:
+                first_id = self._reserve_ids(conn, name, len(rows)) if rows else None
+                stored = [(first_id + i,) + row for i, row in enumerate(rows)]
+                conn.executemany(sql, stored)
+            # Published after the commit, in commit order
+            records = [dict(zip(RECORD_COLUMNS[name], row)) for row in stored]
+            if name == 'alerts':
+                records = [self._alert_from_row(record) for record in records]
+            self.changes.publish(name, records)
+            return records
+
+    def get_version(self, name):
+        """(version, modified) of a table: a counter that moves on every change, and its time
+
+        Kept by triggers, so changes committed by other processes count too.
+        """
+        return tuple(self._connection().execute(
+            'SELECT version, modified FROM collection_versions WHERE name = ?', (name,)).fetchone())
+
+    def get_delta(self, name, since_id, limit=100, **filters):
+        """Rows of a table added after `since_id`, newest first
+
+        Same contract as JSONDatabaseManager.get_delta. Ids are allocated in
+        the inserting transaction, so a row committed after this read has a
+        higher id than any row visible now. Reading the highest id first and
+        bounding the rows by it keeps a concurrent insert out of this delta,
+        so it shows up in the next one instead of twice.
+        """
+        try:
+            conn = self._connection()
+            last_id = conn.execute(f'SELECT MAX(id) FROM {name}').fetchone()[0] or 0
+            clauses, params = [], []
+            for field, value in filters.items():
+                if value is not None:
+                    clauses.append(f'{field} = ?')
+                    params.append(value)
+            where = ''.join(f' AND {clause}' for clause in clauses)
+            rows = conn.execute(
+                f'SELECT * FROM {name} WHERE id > ? AND id <= ?{where} ORDER BY id DESC LIMIT ?',
+                [since_id, last_id] + params + [limit + 1]).fetchall()
+            reset = (since_id > last_id or len(rows) > limit or (since_id > 0 and conn.execute(
+                f'SELECT 1 FROM {name} WHERE id = ?', (since_id,)).fetchone() is None))
+            if reset:
+                rows = conn.execute(
+                    f'SELECT * FROM {name} WHERE id <= ?{where} ORDER BY id DESC LIMIT ?',
+                    [last_id] + params + [limit]).fetchall()
+            convert = self._alert_from_row if name == 'alerts' else dict
+            return {'items': [convert(row) for row in rows], 'last_id': last_id, 'reset': reset}
+        except Exception as e:
+            print(f"Error getting {name} delta: {e}")
+            return None
+
+    def get_status(self):
+        """Describe the active storage engine for the status endpoint"""
+        conn = self._connection()
+        return {
+            'engine': 'sqlite',
+            'connection_type': 'SQLite',
+            'storage_mode': self.storage_mode,
+            'database': os.path.abspath(self.db_path),
+            'journal_mode': conn.execute('PRAGMA journal_mode').fetchone()[0],
+            'full_text': 'fts5' if self.full_text else 'like'
+        }
+
+    def wait_for_write_capacity(self, max_pending):
+        """No-op: SQLite writes are applied before add_logs returns"""
+        return None
+
+    def invalidate_cache(self, name=None):
+        """No-op: SQLite reads always see committed data"""
+        return None
+
+    def add_log(self, log_data):
+        """Add a log entry to SQLite storage and return it as stored, with its id"""
+        try:
+            return self._insert_many('logs', INSERT_LOG, [self._log_row(log_data)])[0]
+        except Exception as e:
+            print(f"Error adding log: {e}")
+            return None
+
+    def add_logs(self, logs_data):
+        """Add a batch of log entries in a single transaction and return them as stored"""
+        try:
+            return self._insert_many('logs', INSERT_LOG, [self._log_row(log_data) for log_data in logs_data])
+        except Exception as e:
+            print(f"Error adding logs: {e}")
+            return []
+
+    def _time_clauses(self, since, until, cursor=None):
+        clauses, params = [], []
+        if since:
+            clauses.append('timestamp >= ?')
+            params.append(since)
+        if until:
+            clauses.append('timestamp <= ?')
+            params.append(until)
+        if cursor:
+            # Rows are ordered by id, so the id alone is the seek key
+            clauses.append('id < ?')
+            params.append(decode_cursor(cursor)[1])
+        return clauses, params
+
+    def get_logs(self, limit=100, severity=None, service=None, since=None, until=None, cursor=None):
+        """Get logs with optional filtering, newest first, starting after `cursor`"""
+        try:
+            clauses, params = self._time_clauses(since, until, cursor)
+            if severity:
+                clauses.append('severity = ?')
+                params.append(severity)
+            if service:
+                clauses.append('service = ?')
+                params.append(service)
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+            rows = self._connection().execute(
+                f'SELECT * FROM logs {where} ORDER BY id DESC LIMIT ?', params + [limit])
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Error getting logs: {e}")
+            return []
+
+    def get_log_counts(self):
+        """Total logs and counts by severity and service from the trigger-maintained counters"""
+        counts = {'total': 0, 'by_severity': {}, 'by_service': {}}
+        try:
+            rows = self._connection().execute(
+                'SELECT field, value, count FROM log_counts WHERE count > 0')
+            for field, value, count in rows:
+                if field == 'total':
+                    counts['total'] = count
+                else:
+                    counts[f'by_{field}'][value] = count
+            return counts
+        except Exception as e:
+            print(f"Error getting log counts: {e}")
+            return counts
+
+    def search_logs(self, query, limit=100, severity=None, service=None, since=None, until=None):
+        """Full-text search over message, details and stack trace, best match first"""
+        try:
+            clauses = parse_query(query)
+            if not clauses:
+                return []
+            where, params = self._time_clauses(since, until)
+            where = [f'logs.{clause}' for clause in where]
+            if severity:
+                where.append('logs.severity = ?')
+                params.append(severity)
+            if service:
+                where.append('logs.service = ?')
+                params.append(service)
+            conn = self._connection()
+
+            if self.full_text:
+                match = ' '.join(f'"{value}"*' if kind == 'prefix' else
+                                 f'"{" ".join(value)}"' if kind == 'phrase' else f'"{value}"'
+                                 for kind, value in clauses)
+                filters = ''.join(f' AND {clause}' for clause in where)
+                rows = conn.execute(
+                    f'''SELECT logs.*, -bm25(logs_fts) AS score FROM logs_fts
+                        JOIN logs ON logs.id = logs_fts.rowid
+                        WHERE logs_fts MATCH ?{filters}
+                        ORDER BY bm25(logs_fts), logs.id DESC LIMIT ?''',
+                    [match] + params + [limit])
+                return [{**dict(row), 'score': round(row['score'], 4)} for row in rows]
+
+            for kind, value in clauses:
+                pattern = '%' + (' '.join(value) if kind == 'phrase' else value) + '%'
+                where.append('(message LIKE ? OR details LIKE ? OR stack_trace LIKE ?)')
+                params.extend([pattern] * 3)
+            rows = conn.execute(
+                f"SELECT logs.*, 0.0 AS score FROM logs WHERE {' AND '.join(where)} "
+                "ORDER BY id DESC LIMIT ?", params + [limit])
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Error searching logs: {e}")
+            return []
+
+    def get_rollups(self, tier='hour', since=None, until=None, fill=False):
+        """Pre-aggregated log counts per bucket of a rollup tier, oldest first"""
+        try:
+            if tier not in ROLLUP_TIERS:
+                raise ValueError(f"Unknown rollup tier: {tier}")
+            length = ROLLUP_TIERS[tier]['key_length']
+            clauses, params = ['tier = ?'], [tier]
+            if since:
+                clauses.append('bucket >= ?')
+                params.append(since[:length])
+            if until:
+                clauses.append('bucket <= ?')
+                params.append(until[:length])
+            rows = self._connection().execute(
+                f"SELECT bucket, field, value, count FROM log_rollups WHERE {' AND '.join(clauses)} "
+                "ORDER BY bucket", params)
+            buckets = {}
+            for bucket, field, value, count in rows:
+                row = buckets.get(bucket)
+                if row is None:
+                    row = buckets[bucket] = {'timestamp': bucket_start(bucket), 'total': 0,
+                                             'by_severity': {}, 'by_service': {}}
+                if field == 'total':
+                    row['total'] = count
+                else:
+                    row[f'by_{field}'][value] = count
+            rows = list(buckets.values())
+            return fill_gaps(rows, tier) if fill else rows
+        except Exception as e:
+            print(f"Error getting rollups: {e}")
+            return []
+
+    def clear_logs(self) -> bool:
+        try:
+            conn = self._connection()
+            with self._write_lock:
+                with conn:
+                    conn.execute('DELETE FROM logs')
+                    conn.execute('DELETE FROM log_rollups')
+                self.changes.publish('logs_cleared', {})
+            return True
+        except Exception as e:
+            print(f"Error clearing logs: {e}")
+            return False
+
+    def get_log_by_id(self, log_id):
+        """Get a single log by ID"""
+        try:
+            row = self._connection().execute('SELECT * FROM logs WHERE id = ?', (log_id,)).fetchone()
+            return dict(row) if row else None
+        except Exception as e:
+            print(f"Error getting log by id: {e}")
+            return None
+
+    def add_system_stat(self, stat_data):
+        """Add system statistics to SQLite storage"""
+        try:
+            conn = self._connection()
+            row = self._stat_row(stat_data)
+            with self._write_lock:
+                with conn:
+                    stat_id = conn.execute(INSERT_STAT, row).lastrowid
+                self.changes.publish('system_stats', [{'id': stat_id, **dict(zip(STAT_COLUMNS, row))}])
+            return stat_id
+        except Exception as e:
+            print(f"Error adding system stat: {e}")
+            return None
+
+    def get_system_stats(self, limit=100, since=None, until=None):
+        """Get system statistics, newest first, optionally within [since, until]
+
+        `limit=None` returns every sample in the window.
+        """
+        try:
+            clauses, params = self._time_clauses(since, until)
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+            rows = self._connection().execute(
+                f'SELECT * FROM system_stats {where} ORDER BY id DESC LIMIT ?',
+                params + [-1 if limit is None else limit])
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Error getting system stats: {e}")
+            return []
+
+    def add_alert(self, alert_data):
+        """Add an alert to SQLite storage and return it as stored, with its id"""
+        try:
+            return self._insert_many('alerts', INSERT_ALERT, [self._alert_row(alert_data)])[0]
+        except Exception as e:
+            print(f"Error adding alert: {e}")
+            return None
+
+    def add_alerts(self, alerts_data):
+        """Add a batch of alerts in a single transaction and return them as stored"""
+        try:
+            return self._insert_many('alerts', INSERT_ALERT, [self._alert_row(alert_data) for alert_data in alerts_data])
+        except Exception as e:
+            print(f"Error adding alerts: {e}")
+            return []
+
+    def get_alerts(self, limit=100, acknowledged=None, since=None, until=None, cursor=None):
+        """Get alerts with optional filtering, newest first, starting after `cursor`"""
+        try:
+            clauses, params = self._time_clauses(since, until, cursor)
+            if acknowledged is not None:
+                clauses.append('acknowledged = ?')
+                params.append(1 if acknowledged else 0)
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+            rows = self._connection().execute(
+                f'SELECT * FROM alerts {where} ORDER BY id DESC LIMIT ?', params + [limit])
+            return [self._alert_from_row(row) for row in rows]
+        except Exception as e:
+            print(f"Error getting alerts: {e}")
+            return []
+
+    def get_acknowledged_alerts(self, since, limit=100):
+        """Alerts acknowledged after the ISO timestamp `since`, most recently acknowledged first"""
+        try:
+            rows = self._connection().execute(
+                'SELECT * FROM alerts WHERE acknowledged_at > ? ORDER BY acknowledged_at DESC LIMIT ?',
+                (since, limit))
+            return [self._alert_from_row(row) for row in rows]
+        except Exception as e:
+            print(f"Error getting acknowledged alerts: {e}")
+            return []
+
+    def get_alert_by_id(self, alert_id):
+        """Get a single alert by ID"""
+        try:
+            row = self._connection().execute('SELECT * FROM alerts WHERE id = ?', (alert_id,)).fetchone()
+            return self._alert_from_row(row) if row else None
+        except Exception as e:
+            print(f"Error getting alert by id: {e}")
+            return None
+
+    def acknowledge_alert(self, alert_id: int) -> bool:
+        """Mark an alert as acknowledged in SQLite storage"""
+        try:
+            conn = self._connection()
+            with self._write_lock:
+                # Stamped under the lock so acknowledged_at follows commit order
+                fields = {'acknowledged': True, 'acknowledged_at': datetime.now().isoformat()}
+                with conn:
+                    cursor = conn.execute(
+                        'UPDATE alerts SET acknowledged = 1, acknowledged_at = ? WHERE id = ?',
+                        (fields['acknowledged_at'], alert_id))
+                if cursor.rowcount > 0:
+                    self.changes.publish('alert_update', {'id': alert_id, **fields})
+            return cursor.rowcount > 0
+        except Exception as e:
+            print(f"Error acknowledging alert: {e}")
+            return False
+
+    def _size_cutoff(self, conn):
+        """The oldest day of logs and alerts to keep so the database fits retention_max_bytes
+
+        Without the dbstat extension SQLite can't size a table, so the pages
+        in use are split between the days by their share of log and alert
+        rows. Today is always kept. None if nothing has to go.
+        """
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        used = (conn.execute('PRAGMA page_count').fetchone()[0]
+                - conn.execute('PRAGMA freelist_count').fetchone()[0]) * page_size
+        if used <= self.retention_max_bytes:
+            return None
+        counts = {}
+        for table in ('logs', 'alerts'):
+            for day, count in conn.execute(
+                    f'SELECT substr(timestamp, 1, 10) AS day, COUNT(*) FROM {table} GROUP BY day'):
+                counts[day] = counts.get(day, 0) + count
+        total = sum(counts.values())
+        today = datetime.now().date().isoformat()
+        remaining = used
+        for day in sorted(counts):
+            if remaining <= self.retention_max_bytes or day >= today:
+                return day
+            remaining -= used * counts[day] // total
+        return today
+
+    def apply_retention(self):
+        """Delete logs and alerts older than the retention window or beyond the size budget
+
+        System stats older than `stats_retention_days` go too. Deleted pages
+        are reused for new rows, so the database file stops growing instead
+        of shrinking.
+        """
+        dropped = {}
+        conn = self._connection()
+        with self._write_lock, conn:
+            stats_retention_days = shortest_retention(self.retention_days, self.stats_retention_days)
+            if stats_retention_days is not None:
+                dropped['system_stats'] = conn.execute('DELETE FROM system_stats WHERE timestamp < ?', (
+                    retention_cutoff(stats_retention_days),)).rowcount
+            if self.retention_days is None and self.retention_max_bytes is None:
+                return dropped
+            cutoffs = []
+            if self.retention_days is not None:
+                cutoffs.append(retention_cutoff(self.retention_days))
+            if self.retention_max_bytes is not None:
+                cutoffs.append(self._size_cutoff(conn) or '')
+            cutoff = max(cutoffs)
+            for table in ('logs', 'alerts'):
+                dropped[table] = conn.execute(f'DELETE FROM {table} WHERE timestamp < ?', (cutoff,)).rowcount
+        return dropped
+
+    def compact(self):
+        """Apply retention, expire old rollups and fold the WAL back into the main database file"""
+        dropped = self.apply_retention()
+        conn = self._connection()
+        with self._write_lock, conn:
+            for tier in ROLLUP_TIERS:
+                cutoff = retention_key(tier)
+                if cutoff is not None:
+                    conn.execute('DELETE FROM log_rollups WHERE tier = ? AND bucket < ?', (tier, cutoff))
+        self._connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return {'dropped': dropped, 'compacted_partitions': 0}
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def start_compactor(self, interval=300):
+        """Run compact() every `interval` seconds in a daemon thread"""
+        if self._compactor_thread is None:
+            self._compactor_thread = run_periodically(self.compact, interval, 'compacting storage')
+        return self._compactor_thread
@@ -1,9 +1,15 @@
 import psutil
+import threading
 import time
 import json
 import os
 from datetime import datetime
 
+# Seconds between samples taken by the background sampler
+SAMPLE_INTERVAL = 5
+# Shortest window CPU usage is measured over; psutil reports 0.0 for shorter ones
+MIN_CPU_WINDOW = 0.1
+
 class SystemMonitor:
     def __init__(self, log_interval=60, alert_threshold=90):
         self.log_interval = log_interval  # seconds
@@ -11,10 +17,61 @@ class SystemMonitor:
         self.alerts = []
         self.system_stats = []
         self.max_stats_history = 100  # Keep last 100 measurements
+        self._latest = None  # (stats, alerts) of the latest sample
+        self._latest_at = 0.0
+        self._sample_lock = threading.Lock()
+        self._sampler_thread = None
+        # Starts the CPU time delta that the first sample is measured over
+        psutil.cpu_percent(interval=None)
+        self._cpu_read_at = time.monotonic()
 
     def get_system_stats(self):
-        """Get current CPU and memory usage"""
-        cpu_percent = psutil.cpu_percent(interval=1)
+        """Get the latest CPU and memory usage sample without blocking
+
+        Reads what the sampler last published. Without a sampler in this
+        process (web workers next to a collector process), a sample is taken
+        on demand once the last one is SAMPLE_INTERVAL seconds old.
+        """
+        return self.get_latest_sample()[0]
+
+    def get_latest_sample(self):
+        """Get the latest sample and the threshold alerts it raised, as (stats, alerts)
+
+        For callers that store both: the alerts were checked, and added to
+        `alerts`, once when the sample was taken.
+        """
+        latest = self._latest
+        if latest is None or self._stale():
+            with self._sample_lock:
+                # Another thread may have sampled while this one waited
+                latest = self._latest
+                if latest is None or self._stale():
+                    self._sample()
+                    latest = self._latest
+        stats, alerts = latest
+        return dict(stats), list(alerts)
+
+    def _stale(self):
+        return self._sampler_thread is None and time.monotonic() - self._latest_at >= SAMPLE_INTERVAL
+
+    def sample(self):
+        """Measure CPU, memory and disk usage now and publish it as the latest sample
+
+        CPU usage is the average since the previous sample (psutil's delta
+        over CPU times), so this doesn't sleep, except for the first sample
+        when it comes less than MIN_CPU_WINDOW after the priming call in
+        __init__. The new sample replaces the
+        previous one in a single assignment, so readers see one or the other.
+        """
+        with self._sample_lock:
+            return self._sample()
+
+    def _sample(self):
+        wait = self._cpu_read_at + MIN_CPU_WINDOW - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        cpu_percent = psutil.cpu_percent(interval=None)
+        self._cpu_read_at = time.monotonic()
         memory = psutil.virtual_memory()
         memory_percent = memory.percent
         disk = psutil.disk_usage('/')
@@ -37,9 +94,29 @@ class SystemMonitor:
             self.system_stats.pop(0)
             
         # Check for alerts
-        self._check_alerts(stats)
+        alerts = self._check_alerts(stats)
         
+        self._latest_at = time.monotonic()
+        self._latest = (stats, alerts)
         return stats
+
+    def start_sampler(self, interval=SAMPLE_INTERVAL):
+        """Take a sample every `interval` seconds in a daemon thread
+
+        Run it in one process only (the one running collector.start), so a
+        single stats stream and alert history is kept.
+        """
+        if self._sampler_thread is None:
+            def run():
+                while True:
+                    try:
+                        self.sample()
+                    except Exception as e:
+                        print(f"Error sampling system stats: {e}")
+                    time.sleep(interval)
+            self._sampler_thread = threading.Thread(target=run, daemon=True, name='system-sampler')
+            self._sampler_thread.start()
+        return self._sampler_thread
     
     def _check_alerts(self, stats):
         """Check if any metrics exceed thresholds and generate alerts"""
@@ -69,9 +146,10 @@ class SystemMonitor:
                 "severity": "WARNING" if stats["disk_percent"] < 95 else "CRITICAL"
             })
             
-        # Add new alerts to the list
+        # Add new alerts to the list, keeping as many as stats
         if alerts:
             self.alerts.extend(alerts)
+            del self.alerts[:-self.max_stats_history]
             
         return alerts
     
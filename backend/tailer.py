@@ -0,0 +1,690 @@
+"""File-tailing log agent
+
+Usage:
+    python tailer.py /var/log/myapp/*.log --service myapp --url http://localhost:5000
+    python tailer.py --config tail.json --data-dir data
+
+Follows log files through rotation (rename and re-create, or copytruncate)
+and parses each line into the log schema with a list of regular expressions.
+Continuation lines (indented lines, Python tracebacks, Java "Caused by:")
+are kept with the line that started them as its stack trace. Batches are
+stored through add_logs (--data-dir) or POST /api/logs/bulk (--url). The
+read offsets of stored records are checkpointed, so a restart continues
+where the last run stopped instead of reading the files again.
+
+Changes are picked up through inotify on Linux and by polling elsewhere.
+Globs should match live files only, not their rotated copies (app.log, not
+app.log*); data written to a file after it was rotated away is still read
+from the open handle.
+"""
+import argparse
+import ctypes
+import ctypes.util
+import glob
+import gzip
+import json
+import os
+import re
+import select
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from datetime import datetime
+from database import get_db_manager, make_log_entry
+
+# Log level names found in files -> stored severities
+SEVERITY_NAMES = {
+    'TRACE': 'INFO', 'DEBUG': 'INFO', 'INFO': 'INFO', 'NOTICE': 'INFO',
+    'WARN': 'WARNING', 'WARNING': 'WARNING',
+    'ERR': 'ERROR', 'ERROR': 'ERROR', 'SEVERE': 'ERROR',
+    'CRIT': 'CRITICAL', 'CRITICAL': 'CRITICAL', 'FATAL': 'CRITICAL', 'ALERT': 'CRITICAL', 'EMERG': 'CRITICAL',
+    # Single-letter levels (glog, logcat)
+    'T': 'INFO', 'D': 'INFO', 'V': 'INFO', 'I': 'INFO', 'W': 'WARNING', 'E': 'ERROR', 'F': 'CRITICAL',
+}
+
+_TIMESTAMP = r'(?P<timestamp>\d{4}-\d\d-\d\d[T ]\d\d:\d\d:\d\d(?:[.,]\d+)?(?:Z|[+-]\d\d:?\d\d)?)'
+# Tried in order; the first one that matches with a known level wins.
+# Named groups: severity, service, message, timestamp; any other group
+# is kept in details as name=value.
+DEFAULT_PATTERNS = (
+    # 2024-05-01 12:00:00,123 - payments - ERROR - message (Python logging)
+    _TIMESTAMP + r'\s+-\s+(?P<service>\S+)\s+-\s+(?P<severity>[A-Za-z]+)\s+-\s+(?P<message>.*)$',
+    # 2024-05-01T12:00:00.123Z ERROR [payments] message
+    _TIMESTAMP + r'\s+\[?(?P<severity>[A-Za-z]+)\]?\s+(?:\[(?P<service>[^\]\s]+)\]:?\s+)?(?P<message>.*)$',
+    # 2024-05-01 12:00:00 message
+    _TIMESTAMP + r'\s+(?P<message>.*)$',
+    # ERROR:payments:message (logging.basicConfig)
+    r'(?P<severity>[A-Z]+):(?P<service>[^:\s]+):(?P<message>.*)$',
+    # [ERROR] message / ERROR: message
+    r'(?:\[(?P<severity>[A-Za-z]+)\]|(?P<level>[A-Z]+):)\s+(?P<message>.*)$',
+)
+# Lines that belong to the record before them
+DEFAULT_CONTINUATION = (r'\s|Traceback \(most recent call last\)|During handling of|The above exception'
+                        r'|Caused by:|\.\.\. \d+ (?:more|common)|[\w.$]+(?:Error|Exception|Exit|Interrupt)\b')
+
+MAX_LINE_BYTES = 64 * 1024
+MAX_RECORD_LINES = 1000
+# Bytes read from one file per pass, so one busy file can't starve the others
+READ_LIMIT_BYTES = 4 * 1024 * 1024
+# A followed path that stays missing this long is closed and forgotten
+FORGET_MISSING_AFTER = 60
+# Leading bytes compared on every pass to notice a file truncated and
+# written again past the old offset before we looked
+HEAD_BYTES = 256
+
+_STANDARD_GROUPS = ('severity', 'level', 'service', 'message', 'timestamp')
+
+
+def _parse_timestamp(value):
+    """Timestamp from a log line as a naive local ISO string, or None"""
+    try:
+        parsed = datetime.fromisoformat(value.replace(',', '.').replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat()
+
+
+class LineParser:
+    """Maps log lines to log fields with configurable patterns"""
+
+    def __init__(self, patterns=None, continuation=None, service=None, severity='INFO'):
+        self.patterns = [re.compile(pattern) for pattern in (patterns or DEFAULT_PATTERNS)]
+        self.continuation = re.compile(continuation or DEFAULT_CONTINUATION)
+        self.service = service
+        self.severity = severity
+
+    def is_continuation(self, text):
+        """Whether a line continues the previous record (blank lines do)"""
+        return not text.strip() or self.continuation.match(text) is not None
+
+    def parse(self, text, service=None):
+        """Fields of a record starting with this line"""
+        service = self.service or service or 'unknown'
+        for pattern in self.patterns:
+            match = pattern.match(text)
+            if match is None:
+                continue
+            groups = match.groupdict()
+            severity = groups.get('severity') or groups.get('level')
+            if severity is not None:
+                severity = SEVERITY_NAMES.get(severity.upper())
+                if severity is None:
+                    continue  # not a log level after all
+            fields = {'severity': severity or self.severity,
+                      'service': groups.get('service') or service,
+                      'message': (groups.get('message') or '').strip() or text.strip()}
+            if groups.get('timestamp'):
+                timestamp = _parse_timestamp(groups['timestamp'])
+                if timestamp:
+                    fields['timestamp'] = timestamp
+            details = [f'{name}={value}' for name, value in groups.items()
+                       if name not in _STANDARD_GROUPS and value]
+            if details:
+                fields['details'] = ' '.join(details)
+            return fields
+        return {'severity': self.severity, 'service': service, 'message': text.strip()}
+
+
+class _Pending:
+    """A record still collecting continuation lines"""
+    __slots__ = ('fields', 'trace', 'end', 'updated')
+
+    def __init__(self, fields, end, updated):
+        self.fields = fields
+        self.trace = []
+        self.end = end
+        self.updated = updated
+
+
+class TailedFile:
+    """One followed path: the open handle, its identity and read offset
+
+    `offset` is the end of the last complete line read from the handle.
+    Records come out as (entry, (path, identity, end_offset, head)); the
+    end offset is what gets checkpointed once the entry is stored, with
+    `head`, a fingerprint of the first bytes of the file (see _fingerprint).
+    """
+
+    def __init__(self, path, parser, stats):
+        self.path = path
+        self.parser = parser
+        self.stats = stats
+        self.service = os.path.splitext(os.path.basename(path))[0]
+        self.file = None
+        self.identity = None
+        self.offset = 0
+        self.missing_since = None
+        self._head = b''
+        self._fingerprint = None
+        self._partial = b''
+        self._partial_size = 0
+        self._pending = None
+
+    def open(self, checkpoint=None, start_at_end=False):
+        """Open the path, resuming from a checkpoint {'dev', 'ino', 'offset', 'head'}
+
+        When the checkpointed file was rotated away while nobody was
+        following it, its rotated copy is read to the end first. A file
+        that was truncated or rewritten in place meanwhile (shorter than the
+        offset, or with other first bytes) is read from the start. Returns
+        False if the path doesn't exist.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        path, offset = self.path, 0
+        if checkpoint:
+            identity = (checkpoint['dev'], checkpoint['ino'])
+            if identity == (st.st_dev, st.st_ino):
+                offset = checkpoint['offset']
+            else:
+                rotated = self._find_rotated(identity)
+                if rotated:
+                    path, offset = rotated, checkpoint['offset']
+        elif start_at_end:
+            offset = st.st_size
+        self._open(path, offset)
+        if checkpoint and offset and not self._resumable(checkpoint):
+            self.file.seek(0)
+            self.offset = 0
+            self.stats['truncations'] += 1
+        return True
+
+    def _resumable(self, checkpoint):
+        """Whether the open file still holds the data the checkpoint was taken on"""
+        if self.offset > os.fstat(self.file.fileno()).st_size:
+            return False
+        # Checkpoints written before fingerprints were kept have no 'head'
+        head = checkpoint.get('head')
+        return head is None or self._fingerprint_at(self.offset) == head
+
+    def _find_rotated(self, identity):
+        """The file in the same directory with this (dev, inode), if any"""
+        try:
+            with os.scandir(os.path.dirname(self.path) or '.') as entries:
+                for entry in entries:
+                    if entry.is_file() and (entry.stat().st_dev, entry.stat().st_ino) == identity:
+                        return entry.path
+        except OSError:
+            pass
+        return None
+
+    def _open(self, path, offset):
+        self.file = open(path, 'rb')
+        st = os.fstat(self.file.fileno())
+        self.identity = (st.st_dev, st.st_ino)
+        self.file.seek(offset)
+        self.offset = offset
+        self._head = os.pread(self.file.fileno(), HEAD_BYTES, 0)
+        self._fingerprint = None
+        self._partial, self._partial_size = b'', 0
+
+    def _fingerprint_at(self, end):
+        """[size, crc32] of the first bytes of the file, up to HEAD_BYTES and `end`"""
+        if self._fingerprint is not None:
+            return self._fingerprint
+        size = min(end, HEAD_BYTES)
+        head = self._head if len(self._head) >= size else os.pread(self.file.fileno(), size, 0)
+        fingerprint = [size, zlib.crc32(head[:size])]
+        if size == HEAD_BYTES:
+            # The same for every later offset
+            self._fingerprint = fingerprint
+        return fingerprint
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def read(self, now, records):
+        """Append the records completed by new data; True if more is waiting"""
+        if self.file is None and not self.open():
+            return False
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # Renamed or deleted: keep reading the handle until it comes back
+            self.missing_since = self.missing_since or now
+            st = None
+        if st is not None:
+            self.missing_since = None
+            if (st.st_dev, st.st_ino) != self.identity:
+                # Rotated: finish the old file, then follow the new one from the start
+                self._consume(self.file.read(), now, records)
+                self.finish(records)
+                self.close()
+                self._open(self.path, 0)
+                self.stats['rotations'] += 1
+            elif self._truncated(st):
+                # Truncated in place (copytruncate)
+                self.finish(records)
+                self.file.seek(0)
+                self.offset, self._partial, self._partial_size = 0, b'', 0
+                self._fingerprint = None
+                self.stats['truncations'] += 1
+        data = self.file.read(READ_LIMIT_BYTES)
+        self._consume(data, now, records)
+        return len(data) == READ_LIMIT_BYTES
+
+    def _truncated(self, st):
+        """Whether the file was cut short, or rewritten in place with other content"""
+        head = os.pread(self.file.fileno(), HEAD_BYTES, 0)
+        changed = st.st_size < self.offset + self._partial_size or head[:len(self._head)] != self._head
+        self._head = head
+        return changed
+
+    def _consume(self, data, now, records):
+        if not data:
+            return
+        lines = data.split(b'\n')
+        last = lines.pop()
+        offset = self.offset
+        for i, raw in enumerate(lines):
+            if i == 0 and self._partial_size:
+                offset += self._partial_size + len(raw) + 1
+                raw = self._partial + raw
+                self._partial, self._partial_size = b'', 0
+            else:
+                offset += len(raw) + 1
+            self._add_line(raw, offset, now, records)
+        self.offset = offset
+        self.stats['lines'] += len(lines)
+        # Only the start of an overlong line is kept
+        if len(self._partial) < MAX_LINE_BYTES:
+            self._partial += last[:MAX_LINE_BYTES - len(self._partial)]
+        self._partial_size += len(last)
+
+    def _add_line(self, raw, end, now, records):
+        text = raw[:MAX_LINE_BYTES].decode('utf-8', errors='replace').rstrip('\r')
+        pending = self._pending
+        if pending is not None:
+            if len(pending.trace) < MAX_RECORD_LINES and self.parser.is_continuation(text):
+                pending.trace.append(text)
+                pending.end = end
+                pending.updated = now
+                return
+            records.append(self._complete(pending))
+            self._pending = None
+        if text.strip():
+            self._pending = _Pending(self.parser.parse(text, self.service), end, now)
+
+    def _complete(self, pending):
+        trace = pending.trace
+        while trace and not trace[-1].strip():
+            trace.pop()
+        if trace:
+            pending.fields['stack_trace'] = '\n'.join(trace)
+        return make_log_entry(pending.fields), (self.path, self.identity, pending.end,
+                                                self._fingerprint_at(pending.end))
+
+    def expire(self, now, timeout, records):
+        """Complete the pending record once no line was added for `timeout` seconds"""
+        if self._pending is not None and now - self._pending.updated >= timeout:
+            records.append(self._complete(self._pending))
+            self._pending = None
+
+    def finish(self, records):
+        """Complete the unterminated last line and the pending record"""
+        if self._partial_size:
+            size = self._partial_size
+            partial, self._partial, self._partial_size = self._partial, b'', 0
+            self.offset += size
+            self._add_line(partial, self.offset, time.monotonic(), records)
+        if self._pending is not None:
+            records.append(self._complete(self._pending))
+            self._pending = None
+
+
+class _Inotify:
+    """Directory change notifications through inotify(7), called with ctypes"""
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watched = set()
+
+    def watch(self, directory):
+        if directory in self.watched:
+            return
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {directory}')
+        self.watched.add(directory)
+
+    def wait(self, timeout):
+        """Wait up to `timeout` seconds for a change in a watched directory"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        # Which file changed doesn't matter: every followed file is checked
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _make_inotify():
+    """An inotify watcher, or None where it isn't available"""
+    try:
+        return _Inotify()
+    except (OSError, AttributeError) as e:
+        print(f"inotify unavailable, polling instead: {e}")
+        return None
+
+
+def load_checkpoints(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Error loading tail checkpoints from {path}: {e}")
+        return {}
+
+
+def save_checkpoints(path, checkpoints):
+    """Atomically replace the checkpoint file"""
+    directory = os.path.dirname(path) or '.'
+    temp_name = None
+    try:
+        fd, temp_name = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(checkpoints, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_name, path)
+    except OSError as e:
+        print(f"Error saving tail checkpoints to {path}: {e}")
+        if temp_name and os.path.exists(temp_name):
+            os.unlink(temp_name)
+
+
+class DatabaseSink:
+    """Stores batches with add_logs on a database manager"""
+
+    def __init__(self, db, max_pending_writes=20000):
+        self.db = db
+        self.max_pending_writes = max_pending_writes
+
+    def send(self, entries):
+        """Store a batch; returns (accepted, rejected), or None to retry it later"""
+        self.db.wait_for_write_capacity(self.max_pending_writes)
+        stored = self.db.add_logs(entries)
+        if len(stored) != len(entries):
+            return None
+        return len(stored), 0
+
+    def sync(self):
+        """Make stored batches durable before their offsets are checkpointed"""
+        if hasattr(self.db, 'flush'):
+            self.db.flush()
+
+
+class HttpSink:
+    """Sends batches to the bulk ingestion endpoint as gzipped NDJSON"""
+
+    def __init__(self, url, timeout=30):
+        self.url = url.rstrip('/') + '/api/logs/bulk'
+        self.timeout = timeout
+
+    def send(self, entries):
+        """Send a batch; returns (accepted, rejected), or None to retry it later"""
+        body = gzip.compress(''.join(json.dumps(entry) + '\n' for entry in entries).encode('utf-8'))
+        request = urllib.request.Request(
+            f'{self.url}?batch_size={len(entries)}', data=body, method='POST',
+            headers={'Content-Type': 'application/x-ndjson', 'Content-Encoding': 'gzip'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                summary = json.load(response)
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            print(f"Error sending logs to {self.url}: {e}")
+            return None
+        return summary['accepted'], summary['rejected']
+
+    def sync(self):
+        pass
+
+
+class TailAgent:
+    """Follows the files matching some globs and ships their records in batches
+
+    `sources` is a list of (globs, LineParser). Offsets are checkpointed
+    only after the records before them were stored. When the sink fails,
+    the batch is retried on the next pass and nothing more is read until it
+    goes through.
+    """
+
+    def __init__(self, sources, sink, checkpoint_path, batch_size=500, poll_interval=0.5,
+                 multiline_timeout=1.0, checkpoint_interval=1.0, start_at_end=False, use_inotify=True):
+        self.sources = sources
+        self.sink = sink
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.multiline_timeout = multiline_timeout
+        self.checkpoint_interval = checkpoint_interval
+        self.start_at_end = start_at_end
+        self.checkpoints = load_checkpoints(checkpoint_path)
+        self.files = {}
+        self.stats = {'lines': 0, 'records': 0, 'stored': 0, 'rejected': 0, 'failed': 0,
+                      'rotations': 0, 'truncations': 0, 'files': 0}
+        self._unsent = []
+        self._dirty = False
+        self._last_checkpoint = time.monotonic()
+        self._first_scan = True
+        self._stop = threading.Event()
+        self._thread = None
+        self._inotify = _make_inotify() if use_inotify else None
+
+    def _discover(self):
+        """Start following new files that match the globs"""
+        for globs, parser in self.sources:
+            for pattern in globs:
+                directory = os.path.dirname(pattern) or '.'
+                if self._inotify is not None and not glob.has_magic(directory) and os.path.isdir(directory):
+                    self._inotify.watch(directory)
+                for path in glob.glob(pattern):
+                    if path in self.files or not os.path.isfile(path):
+                        continue
+                    tailed = TailedFile(path, parser, self.stats)
+                    if not tailed.open(self.checkpoints.get(path), start_at_end=self._first_scan and self.start_at_end):
+                        continue
+                    self.files[path] = tailed
+                    if self._inotify is not None:
+                        self._inotify.watch(os.path.dirname(path) or '.')
+        self._first_scan = False
+        self.stats['files'] = len(self.files)
+
+    def poll(self, final=False):
+        """Read what is new and ship it; True if more data is waiting"""
+        if self._unsent and not self._send():
+            return False
+        self._discover()
+        now = time.monotonic()
+        records, forgotten, more = [], [], False
+        for path, tailed in list(self.files.items()):
+            more = tailed.read(now, records) or more
+            if final:
+                tailed.finish(records)
+            else:
+                tailed.expire(now, self.multiline_timeout, records)
+            if tailed.missing_since is not None and now - tailed.missing_since >= FORGET_MISSING_AFTER:
+                tailed.finish(records)
+                tailed.close()
+                del self.files[path]
+                forgotten.append(path)
+        self.stats['records'] += len(records)
+        self._unsent.extend(records)
+        if self._send():
+            for path in forgotten:
+                # A file created later under this name starts from the beginning
+                self.checkpoints.pop(path, None)
+        if self._dirty and (final or now - self._last_checkpoint >= self.checkpoint_interval):
+            self.checkpoint()
+        return more and not self._unsent
+
+    def _send(self):
+        """Ship the unsent records in batches; False if the sink failed"""
+        while self._unsent:
+            batch = self._unsent[:self.batch_size]
+            try:
+                result = self.sink.send([entry for entry, _ in batch])
+            except Exception as e:
+                print(f"Error shipping tailed logs: {e}")
+                result = None
+            if result is None:
+                self.stats['failed'] += 1
+                return False
+            accepted, rejected = result
+            self.stats['stored'] += accepted
+            self.stats['rejected'] += rejected
+            for _, (path, identity, end, head) in batch:
+                self.checkpoints[path] = {'dev': identity[0], 'ino': identity[1], 'offset': end, 'head': head}
+            del self._unsent[:len(batch)]
+            self._dirty = True
+        return True
+
+    def checkpoint(self):
+        """Persist the offsets of everything stored so far"""
+        try:
+            self.sink.sync()
+        except Exception as e:
+            # Keep the old offsets; the records are shipped again after a restart
+            print(f"Error syncing tailed logs: {e}")
+            return
+        save_checkpoints(self.checkpoint_path, self.checkpoints)
+        self._dirty = False
+        self._last_checkpoint = time.monotonic()
+
+    def run(self):
+        """Follow the files until stop() is called"""
+        while not self._stop.is_set():
+            if self.poll():
+                continue
+            if self._inotify is not None:
+                # Wake up regularly anyway, to complete idle multi-line records
+                self._inotify.wait(min(self.poll_interval * 2, self.multiline_timeout))
+            else:
+                self._stop.wait(self.poll_interval)
+        self.poll(final=True)
+        self.close()
+
+    def run_once(self):
+        """Read every file to its current end, ship everything and checkpoint"""
+        while self.poll():
+            pass
+        self.poll(final=True)
+        return not self._unsent
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True, name='log-tailer')
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=30):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def close(self):
+        for tailed in self.files.values():
+            tailed.close()
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+def make_sources(config):
+    """[(globs, LineParser)] from a list of {"paths", "service", "patterns", "continuation", "severity"}"""
+    return [(source['paths'] if isinstance(source['paths'], list) else [source['paths']],
+             LineParser(source.get('patterns'), source.get('continuation'),
+                        source.get('service'), source.get('severity', 'INFO')))
+            for source in config]
+
+
+def start_in_thread(db, paths, checkpoint_path=None, **options):
+    """Tail `paths` (globs) into a database manager from a daemon thread; stop with agent.stop()"""
+    checkpoint_path = checkpoint_path or os.path.join(db.data_dir, 'tail-checkpoints.json')
+    return TailAgent([(paths, LineParser())], DatabaseSink(db), checkpoint_path, **options).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tail log files into the log store')
+    parser.add_argument('paths', nargs='*', help='files or globs to follow')
+    parser.add_argument('--config', help='JSON file with {"sources": [{"paths": [...], "service": ..., '
+                                         '"patterns": [...], "continuation": ..., "severity": ...}]}')
+    parser.add_argument('--service', help='service name (default: the file name)')
+    parser.add_argument('--pattern', action='append', help='line regex with named groups; repeatable')
+    parser.add_argument('--continuation', help='regex for lines that continue the previous record')
+    parser.add_argument('--url', help='send to the bulk endpoint of this server instead of the database')
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--checkpoint', help='checkpoint file (default: <data-dir>/tail-checkpoints.json)')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--poll-interval', type=float, default=0.5)
+    parser.add_argument('--from-end', action='store_true', help='skip what files already hold on the first run')
+    parser.add_argument('--no-inotify', action='store_true')
+    parser.add_argument('--once', action='store_true', help='read the files to their end and exit')
+    parser.add_argument('--stats-interval', type=float, default=60)
+    args = parser.parse_args()
+
+    sources = []
+    if args.config:
+        with open(args.config, 'r') as f:
+            sources = make_sources(json.load(f)['sources'])
+    if args.paths:
+        sources.append((args.paths, LineParser(args.pattern, args.continuation, args.service)))
+    if not sources:
+        parser.error('give files to follow or --config')
+
+    db = None
+    if args.url:
+        sink = HttpSink(args.url)
+    else:
+        db = get_db_manager(args.data_dir)
+        sink = DatabaseSink(db)
+    checkpoint_path = args.checkpoint or os.path.join(args.data_dir, 'tail-checkpoints.json')
+    agent = TailAgent(sources, sink, checkpoint_path, batch_size=args.batch_size,
+                      poll_interval=args.poll_interval, start_at_end=args.from_end,
+                      use_inotify=not args.no_inotify)
+    try:
+        if args.once:
+            agent.run_once()
+            agent.close()
+        else:
+            agent.start()
+            while True:
+                time.sleep(args.stats_interval)
+                print(json.dumps(agent.stats))
+    except KeyboardInterrupt:
+        agent.stop()
+    finally:
+        print(json.dumps(agent.stats))
+        if db is not None and hasattr(db, 'close'):
+            db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+import socket
+import time
+
+from database import JSONDatabaseManager
+from receiver import start_in_thread, stop_in_thread
+
+
+def test_udp_datagrams_are_drained_and_stored(tmp_path):
+    db = JSONDatabaseManager(str(tmp_path), write_behind=True)
+    receiver, ports = start_in_thread(db, host='127.0.0.1', udp_port=0, udp_rcvbuf=1024 * 1024)
+    try:
+        assert receiver.udp_rcvbuf_granted > 0
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for i in range(500):
+                sock.sendto(f'<14>Jan  1 00:00:00 host app[1]: message {i}\n'.encode(),
+                            ('127.0.0.1', ports['udp']))
+        deadline = time.monotonic() + 10
+        while receiver.stats['stored'] < 500 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        stop_in_thread(receiver)
+        db.close()
+    assert receiver.stats['stored'] == 500
+    assert {log['message'] for log in db.get_logs(limit=1000)} == {f'message {i}' for i in range(500)}
@@ -0,0 +1,35 @@
+import pytest
+
+from database import COLLECTIONS, JSONDatabaseManager
+from record_format import DEFAULT_FILE_FORMAT, parse_file_formats
+
+
+def test_unnamed_collections_use_the_default_format():
+    formats = parse_file_formats('logs=dict', COLLECTIONS)
+    assert formats['logs'] == 'dict'
+    assert formats['alerts'] == formats['system_stats'] == DEFAULT_FILE_FORMAT
+    assert parse_file_formats(None, COLLECTIONS) == {name: DEFAULT_FILE_FORMAT for name in COLLECTIONS}
+
+
+def test_format_without_a_name_sets_the_default():
+    formats = parse_file_formats('dict,logs=pretty', COLLECTIONS)
+    assert formats == {'logs': 'pretty', 'alerts': 'dict', 'system_stats': 'dict'}
+
+
+def test_named_formats_win_over_the_default_in_any_order():
+    assert parse_file_formats('logs=pretty,dict', COLLECTIONS) == parse_file_formats('dict,logs=pretty', COLLECTIONS)
+
+
+def test_unknown_collection_is_rejected():
+    with pytest.raises(ValueError, match='log'):
+        parse_file_formats('log=dict', COLLECTIONS)
+    with pytest.raises(ValueError):
+        parse_file_formats('logs=dictionary', COLLECTIONS)
+
+
+def test_manager_and_setting_agree(tmp_path):
+    db = JSONDatabaseManager(str(tmp_path), write_behind=False)
+    try:
+        assert db.file_formats == parse_file_formats(None, COLLECTIONS)
+    finally:
+        db.close()
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import JSONDatabaseManager
+from sqlite_database import SQLiteDatabaseManager
+
+
+def old_logs(days, per_day):
+    now = datetime.now()
+    return [{'timestamp': (now - timedelta(days=day)).isoformat(), 'severity': 'INFO',
+             'service': 'svc', 'message': 'x' * 200}
+            for day in range(days - 1, -1, -1) for _ in range(per_day)]
+
+
+@pytest.mark.parametrize('storage_mode', ['json', 'segments'])
+def test_size_retention_json(tmp_path, storage_mode):
+    db = JSONDatabaseManager(str(tmp_path), storage_mode=storage_mode, write_behind=False,
+                             retention_max_bytes=120_000)
+    try:
+        db.add_logs(old_logs(6, 200))
+        assert db.apply_retention()['logs'] == 1000
+        logs = db.get_logs(limit=10000)
+        # Today's partition is always kept
+        assert len(logs) == 200
+        assert logs[-1]['timestamp'][:10] == datetime.now().date().isoformat()
+    finally:
+        db.close()
+
+
+def test_size_retention_sqlite(tmp_path):
+    db = SQLiteDatabaseManager(str(tmp_path / 'monitor.db'), data_dir=str(tmp_path), retention_max_bytes=1)
+    try:
+        db.add_logs(old_logs(6, 200))
+        assert db.apply_retention()['logs'] == 1000
+        assert len(db.get_logs(limit=10000)) == 200
+    finally:
+        db.close()
+
+
+def test_no_size_retention_by_default(tmp_path):
+    db = JSONDatabaseManager(str(tmp_path), write_behind=False)
+    try:
+        db.add_logs(old_logs(3, 10))
+        assert db.apply_retention() == {'logs': 0, 'alerts': 0, 'system_stats': 0}
+    finally:
+        db.close()
@@ -0,0 +1,65 @@
+import time
+
+import psutil
+
+import system_monitor
+from system_monitor import MIN_CPU_WINDOW, SystemMonitor
+
+
+def record_cpu_reads(monkeypatch):
+    reads = []
+
+    def cpu_percent(interval=None):
+        reads.append(time.monotonic())
+        return 42.0
+
+    monkeypatch.setattr(psutil, 'cpu_percent', cpu_percent)
+    return reads
+
+
+def test_first_sample_is_measured_over_a_real_window(monkeypatch):
+    reads = record_cpu_reads(monkeypatch)
+    monitor = SystemMonitor()
+    stats = monitor.get_system_stats()
+    assert stats['cpu_percent'] == 42.0
+    # Priming call, then the first reading at least MIN_CPU_WINDOW later
+    assert len(reads) == 2
+    assert reads[1] - reads[0] >= MIN_CPU_WINDOW
+
+
+def test_without_sampler_samples_on_demand_when_stale(monkeypatch):
+    reads = record_cpu_reads(monkeypatch)
+    monkeypatch.setattr(system_monitor, 'SAMPLE_INTERVAL', 0.2)
+    monitor = SystemMonitor()
+    first = monitor.get_system_stats()
+    assert monitor.get_system_stats() == first
+    assert len(reads) == 2
+
+    time.sleep(0.25)
+    assert monitor.get_system_stats()['timestamp'] != first['timestamp']
+    assert len(reads) == 3
+    assert monitor._sampler_thread is None
+
+
+def test_sampler_samples_before_its_first_sleep(monkeypatch):
+    reads = record_cpu_reads(monkeypatch)
+    monitor = SystemMonitor()
+    monitor.start_sampler(interval=3600)
+    deadline = time.monotonic() + 5
+    while monitor._latest is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert monitor._latest is not None
+    first = monitor.get_system_stats()
+    monitor._latest_at -= 3600
+    assert monitor.get_system_stats() == first
+    assert len(reads) == 2
+
+
+def test_sample_alerts_are_checked_once(monkeypatch):
+    record_cpu_reads(monkeypatch)
+    monitor = SystemMonitor(alert_threshold=-1)
+    stats, alerts = monitor.get_latest_sample()
+    assert {alert['type'] for alert in alerts} == {'CPU_HIGH', 'MEMORY_HIGH', 'DISK_HIGH'}
+    assert all(alert['timestamp'] == stats['timestamp'] for alert in alerts)
+    assert monitor.get_latest_sample()[1] == alerts
+    assert monitor.get_alerts() == alerts
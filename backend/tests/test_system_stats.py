@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import JSONDatabaseManager
+from downsample import downsample
+from sqlite_database import SQLiteDatabaseManager
+
+
+def make_manager(kind, tmp_path):
+    if kind == 'sqlite':
+        return SQLiteDatabaseManager(str(tmp_path / 'monitor.db'), data_dir=str(tmp_path))
+    return JSONDatabaseManager(str(tmp_path), storage_mode=kind, write_behind=True, durability='none')
+
+
+@pytest.mark.parametrize('kind', ['json', 'segments', 'sqlite'])
+def test_week_range_reaches_old_samples(tmp_path, kind):
+    db = make_manager(kind, tmp_path)
+    try:
+        # A week of samples every 5 minutes
+        now = datetime.now()
+        start = now - timedelta(days=7)
+        count = 7 * 24 * 12
+        for i in range(count):
+            db.add_system_stat({'timestamp': (start + timedelta(minutes=5 * i)).isoformat(),
+                                'cpu_percent': float(i % 100)})
+        db.apply_retention()
+
+        since = (now - timedelta(days=7, minutes=1)).isoformat()
+        stats = db.get_system_stats(limit=None, since=since)
+        assert len(stats) == count
+        assert stats[-1]['timestamp'] == start.isoformat()
+
+        rows = downsample(stats, 100)
+        assert rows[-1]['timestamp'] == start.isoformat()
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize('kind', ['json', 'sqlite'])
+def test_stats_retention(tmp_path, kind):
+    db = make_manager(kind, tmp_path)
+    try:
+        now = datetime.now()
+        for days in (20, 10, 1, 0):
+            db.add_system_stat({'timestamp': (now - timedelta(days=days)).isoformat()})
+        db.apply_retention()
+        assert len(db.get_system_stats(limit=None)) == 2
+    finally:
+        db.close()
@@ -0,0 +1,76 @@
+import os
+
+from tailer import LineParser, TailAgent
+
+
+class ListSink:
+    """Keeps shipped entries in memory"""
+
+    def __init__(self):
+        self.entries = []
+
+    def send(self, entries):
+        self.entries.extend(entries)
+        return len(entries), 0
+
+    def sync(self):
+        pass
+
+
+def run_agent(path, checkpoint_path):
+    sink = ListSink()
+    agent = TailAgent([([path], LineParser())], sink, checkpoint_path, use_inotify=False)
+    agent.run_once()
+    agent.close()
+    return [entry['message'] for entry in sink.entries], agent.stats
+
+
+def write(path, text, mode='w'):
+    with open(path, mode) as f:
+        f.write(text)
+
+
+def test_restart_resumes_after_checkpoint(tmp_path):
+    path, checkpoints = str(tmp_path / 'app.log'), str(tmp_path / 'checkpoints.json')
+    write(path, 'first line\nsecond line\n')
+    assert run_agent(path, checkpoints)[0] == ['first line', 'second line']
+
+    write(path, 'third line\n', mode='a')
+    assert run_agent(path, checkpoints)[0] == ['third line']
+
+
+def test_truncation_while_running(tmp_path):
+    path, checkpoints = str(tmp_path / 'app.log'), str(tmp_path / 'checkpoints.json')
+    write(path, 'first line\nsecond line\n')
+    sink = ListSink()
+    agent = TailAgent([([path], LineParser())], sink, checkpoints, use_inotify=False)
+    agent.run_once()
+
+    write(path, 'after truncate\n')
+    agent.run_once()
+    agent.close()
+    assert [entry['message'] for entry in sink.entries] == ['first line', 'second line', 'after truncate']
+    assert agent.stats['truncations'] == 1
+
+
+def test_truncation_while_stopped(tmp_path):
+    path, checkpoints = str(tmp_path / 'app.log'), str(tmp_path / 'checkpoints.json')
+    write(path, 'first line\n')
+    assert run_agent(path, checkpoints)[0] == ['first line']
+
+    # copytruncate and new content longer than the old offset, same inode
+    inode = os.stat(path).st_ino
+    write(path, 'after truncate\nmore lines\n')
+    assert os.stat(path).st_ino == inode
+    messages, stats = run_agent(path, checkpoints)
+    assert messages == ['after truncate', 'more lines']
+    assert stats['truncations'] == 1
+
+
+def test_shorter_file_while_stopped(tmp_path):
+    path, checkpoints = str(tmp_path / 'app.log'), str(tmp_path / 'checkpoints.json')
+    write(path, 'a rather long first line\n')
+    run_agent(path, checkpoints)
+
+    write(path, 'short\n')
+    assert run_agent(path, checkpoints)[0] == ['short']
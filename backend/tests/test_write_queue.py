@@ -0,0 +1,119 @@
+import os
+import threading
+
+import pytest
+
+from record_format import load_records
+from write_queue import WriteBehindQueue, WriteFailedError
+
+
+class FailingFlush:
+    """flush_func that raises while `failing` is set"""
+
+    def __init__(self):
+        self.failing = True
+        self.written = []
+
+    def __call__(self, items, fsync):
+        if self.failing:
+            raise OSError('disk full')
+        self.written.extend(items)
+
+
+@pytest.mark.parametrize('durability', ['flush', 'fsync'])
+def test_failed_flush_reaches_waiting_writers(durability):
+    flush_func = FailingFlush()
+    queue = WriteBehindQueue(flush_func, flush_interval_ms=1, durability=durability)
+    try:
+        ticket = queue.enqueue(['a', 'b'])
+        with pytest.raises(WriteFailedError):
+            queue.wait(ticket)
+
+        metrics = queue.get_metrics()
+        assert metrics['errors'] == 1
+        assert metrics['items_failed'] == 2
+        assert metrics['items_flushed'] == 0
+        assert queue._flushed_seq == 0
+        assert queue.pending() == 0
+
+        # Later batches are not affected by the earlier failure
+        flush_func.failing = False
+        ticket = queue.enqueue(['c'])
+        queue.wait(ticket)
+        assert flush_func.written == ['c']
+        assert queue._flushed_seq == ticket
+    finally:
+        queue.close()
+
+
+def test_flush_raises_for_failed_batches():
+    flush_func = FailingFlush()
+    queue = WriteBehindQueue(flush_func, flush_interval_ms=1000)
+    try:
+        queue.enqueue(['a'])
+        with pytest.raises(WriteFailedError):
+            queue.flush()
+        flush_func.failing = False
+        queue.enqueue(['b'])
+        queue.flush()
+    finally:
+        queue.close()
+
+
+def test_concurrent_writers_of_a_failed_batch_all_see_the_error():
+    flush_func = FailingFlush()
+    queue = WriteBehindQueue(flush_func, flush_interval_ms=50)
+    errors = []
+
+    def writer(item):
+        try:
+            queue.wait(queue.enqueue([item]))
+        except WriteFailedError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.close()
+    assert len(errors) == 5
+
+
+def test_none_durability_does_not_wait():
+    queue = WriteBehindQueue(FailingFlush(), flush_interval_ms=1, durability='none')
+    try:
+        queue.wait(queue.enqueue(['a']))
+    finally:
+        queue.close()
+    assert queue.get_metrics()['errors'] == 1
+
+
+@pytest.mark.parametrize('write_behind', [True, False])
+def test_json_write_failure_is_reported_to_the_writer(tmp_path, monkeypatch, write_behind):
+    from database import JSONDatabaseManager
+    db = JSONDatabaseManager(str(tmp_path), write_behind=write_behind, durability='flush')
+    try:
+        alert = db.add_alert({'severity': 'HIGH', 'type': 'cpu', 'message': 'busy'})
+        db.add_log({'severity': 'INFO', 'service': 's', 'message': 'old'})
+        last_event = db.changes.last_id
+
+        monkeypatch.setattr(db, '_write_temp_json', lambda *args, **kwargs: None)
+        assert db.add_log({'severity': 'INFO', 'service': 's', 'message': 'lost'}) is None
+        assert db.add_logs([{'severity': 'INFO', 'service': 's', 'message': 'lost'}]) == []
+        assert db.acknowledge_alert(alert['id']) is False
+        assert db.clear_logs() is False
+        # Nothing that failed stays visible, is counted or is announced
+        assert [log['message'] for log in db.get_logs()] == ['old']
+        assert db.get_alerts()[0]['acknowledged'] is False
+        assert sum(bucket['total'] for bucket in db.get_rollups('minute')) == 1
+        assert db.changes.last_id == last_event
+
+        monkeypatch.undo()
+        assert db.add_log({'severity': 'INFO', 'service': 's', 'message': 'kept'})['message'] == 'kept'
+        db.flush()
+        assert [log['message'] for log in db.get_logs()] == ['kept', 'old']
+        on_disk = load_records(os.path.join(str(tmp_path), 'logs.json'))
+        assert [log['message'] for log in on_disk] == ['kept', 'old']
+    finally:
+        db.close()
@@ -0,0 +1,196 @@
+import threading
+import time
+from collections import deque
+
+# none: return once queued (fire-and-forget)
+# flush: return once the batch is written to the OS
+# fsync: return once the batch is fsynced to disk
+DURABILITY_LEVELS = ('none', 'flush', 'fsync')
+# Failed batches remembered for writers that haven't collected their error yet
+MAX_FAILED_BATCHES = 1000
+
+class WriteFailedError(Exception):
+    """Raised to the writers of a batch the flush function failed on"""
+
+class WriteBehindQueue:
+    """Group-commit queue that coalesces writes into one flush per window
+
+    Writers enqueue items and get a ticket back. A background thread waits
+    until `flush_interval_ms` has passed since the first queued item, or until
+    `max_batch` items are queued, and then hands the whole batch to
+    `flush_func(items, fsync)`. Callers that need durability wait on their
+    ticket after releasing any locks the flush function needs; if the flush
+    of their batch raised, the wait raises WriteFailedError.
+    """
+
+    def __init__(self, flush_func, flush_interval_ms=10, max_batch=500, durability='flush'):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability level: {durability}")
+
+        self.flush_func = flush_func
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch = max_batch
+        self.durability = durability
+
+        self._cond = threading.Condition()
+        self._items = []
+        self._first_enqueued_at = None
+        self._enqueued_seq = 0
+        # Last ticket written successfully, and last ticket handled either way
+        self._flushed_seq = 0
+        self._done_seq = 0
+        # (first_ticket, last_ticket, error) of failed batches, oldest first
+        self._failed = deque(maxlen=MAX_FAILED_BATCHES)
+        self._fsync_requested = False
+        self._flush_requested = False
+        self._closed = False
+
+        # Metrics
+        self._flushes = 0
+        self._items_flushed = 0
+        self._errors = 0
+        self._items_failed = 0
+        self._total_flush_time = 0.0
+        self._last_flush_time = 0.0
+        self._max_flush_time = 0.0
+        self._max_depth = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def enqueue(self, items):
+        """Queue items for the next flush and return a ticket to wait on"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('Write queue is closed')
+            if not self._items:
+                self._first_enqueued_at = time.monotonic()
+            self._items.extend(items)
+            self._enqueued_seq += len(items)
+            if self.durability == 'fsync':
+                self._fsync_requested = True
+            self._max_depth = max(self._max_depth, len(self._items))
+            self._cond.notify_all()
+            return self._enqueued_seq
+
+    def wait(self, ticket):
+        """Block until the items behind `ticket` meet the durability level
+
+        Raises WriteFailedError if they could not be written.
+        """
+        if self.durability == 'none':
+            return
+        with self._cond:
+            while self._done_seq < ticket:
+                self._cond.wait()
+            self._raise_failures(ticket, ticket)
+
+    def _raise_failures(self, first, last):
+        """Raise WriteFailedError if a failed batch holds any ticket in [first, last]"""
+        for failed_first, failed_last, error in self._failed:
+            if failed_first <= last and first <= failed_last:
+                raise WriteFailedError(f"Write failed: {error}") from error
+
+    def pending(self):
+        """Items queued or being flushed"""
+        with self._cond:
+            return self._enqueued_seq - self._done_seq
+
+    def wait_for_capacity(self, max_pending):
+        """Block until fewer than `max_pending` items are queued or being flushed
+
+        Producers that can slow down (network receivers) call this before
+        enqueueing, so a backlog turns into backpressure instead of memory.
+        """
+        with self._cond:
+            while self._enqueued_seq - self._done_seq >= max_pending and not self._closed:
+                self._cond.wait()
+
+    def flush(self):
+        """Flush everything queued so far and wait for it
+
+        Raises WriteFailedError if any of it could not be written.
+        """
+        with self._cond:
+            first, ticket = self._done_seq + 1, self._enqueued_seq
+            if self._done_seq >= ticket:
+                return
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._done_seq < ticket:
+                self._cond.wait()
+            self._raise_failures(first, ticket)
+
+    def close(self):
+        """Flush pending items and stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._items and not self._closed:
+                    self._cond.wait()
+                if not self._items and self._closed:
+                    return
+
+                # Hold the batch open until the window closes or it is full
+                deadline = self._first_enqueued_at + self.flush_interval
+                while (len(self._items) < self.max_batch and not self._closed
+                       and not self._flush_requested):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch, self._items = self._items, []
+                batch_first = self._done_seq + 1
+                batch_seq = self._enqueued_seq
+                fsync = self._fsync_requested
+                self._fsync_requested = False
+                self._flush_requested = False
+
+            started = time.perf_counter()
+            error = None
+            try:
+                self.flush_func(batch, fsync)
+            except Exception as e:
+                error = e
+                print(f"Error flushing write queue: {e}")
+            elapsed = time.perf_counter() - started
+
+            with self._cond:
+                if error is None:
+                    self._flushed_seq = batch_seq
+                    self._items_flushed += len(batch)
+                else:
+                    self._errors += 1
+                    self._items_failed += len(batch)
+                    self._failed.append((batch_first, batch_seq, error))
+                self._done_seq = batch_seq
+                self._flushes += 1
+                self._total_flush_time += elapsed
+                self._last_flush_time = elapsed
+                self._max_flush_time = max(self._max_flush_time, elapsed)
+                self._cond.notify_all()
+
+    def get_metrics(self):
+        """Queue depth and flush latency metrics"""
+        with self._cond:
+            return {
+                'durability': self.durability,
+                'flush_interval_ms': self.flush_interval * 1000,
+                'max_batch': self.max_batch,
+                'queue_depth': len(self._items),
+                'max_queue_depth': self._max_depth,
+                'flushes': self._flushes,
+                'items_flushed': self._items_flushed,
+                'errors': self._errors,
+                'items_failed': self._items_failed,
+                'avg_batch_size': round(self._items_flushed / self._flushes, 2) if self._flushes else 0.0,
+                'avg_flush_ms': round(self._total_flush_time / self._flushes * 1000, 3) if self._flushes else 0.0,
+                'last_flush_ms': round(self._last_flush_time * 1000, 3),
+                'max_flush_ms': round(self._max_flush_time * 1000, 3)
+            }
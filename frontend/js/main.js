@@ -1,8 +1,21 @@
 // Global variables
 const API_URL = 'http://localhost:5001/api';
 let logsData = [];
+let logsCursor = null;  // keyset cursor for the next page of logs
 let systemStats = [];
 let alerts = [];
+let logStats = null;  // last /stats response, kept current by live events
+let liveStream = null;
+let pollTimer = null;
+const LIVE_LOGS_MAX = 1000;  // rows kept in the table while live logs arrive
+const SYSTEM_STATS_KEPT = 100;
+const ALERTS_KEPT = 200;
+// Delta tokens: the last id seen per collection (sent back as `since_id`),
+// and the latest acknowledgement time seen for alerts
+let logsSyncId = 0;
+let systemStatsSyncId = 0;
+let alertsSyncId = 0;
+let alertsAckedSince = null;
 
 // DOM Elements
 const logsTable = document.getElementById('logs-body');
@@ -10,6 +23,8 @@ const refreshBtn = document.getElementById('refresh-btn');
 const resetBtn = document.getElementById('reset-btn');
 const severityFilter = document.getElementById('severity-filter');
 const serviceFilter = document.getElementById('service-filter');
+const searchInput = document.getElementById('search-input');
+const loadMoreBtn = document.getElementById('load-more-btn');
 const modal = document.getElementById('log-details-modal');
 const closeModal = document.querySelector('.close');
 const totalLogsElement = document.querySelector('#total-logs .stat-value');
@@ -25,17 +40,106 @@ const alertsBadge = document.getElementById('alerts-badge');
 
 // Event Listeners
 document.addEventListener('DOMContentLoaded', () => {
+    // Push updates over Server-Sent Events, polling while that isn't possible.
+    // Connected first, so nothing written during the fetches below is missed
+    startLiveStream();
+    
     fetchLogs();
     fetchStats();
     fetchSystemStats();
     fetchAlerts();
-    
-    // Refresh system stats and alerts every 30 seconds
-    setInterval(() => {
+});
+
+// Refresh with deltas every 30 seconds while there is no live stream
+function startPolling() {
+    if (pollTimer) return;
+    pollTimer = setInterval(() => {
+        fetchNewLogs();
+        fetchStats();
         fetchSystemStats();
         fetchAlerts();
     }, 30000);
-});
+}
+
+function stopPolling() {
+    clearInterval(pollTimer);
+    pollTimer = null;
+}
+
+function startLiveStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    liveStream = new EventSource(`${API_URL}/stream`);
+    liveStream.addEventListener('open', stopPolling);
+    // The browser reconnects by itself; poll until it is back
+    liveStream.addEventListener('error', startPolling);
+    liveStream.addEventListener('logs', event => onLiveLogs(JSON.parse(event.data)));
+    liveStream.addEventListener('alerts', event => {
+        alerts = JSON.parse(event.data).items.reverse().concat(alerts).slice(0, ALERTS_KEPT);
+        renderAlerts(activeAlerts(alerts));
+    });
+    liveStream.addEventListener('alert_update', event => {
+        const update = JSON.parse(event.data);
+        alerts.forEach(a => { if (a.id === update.id) a.is_read = update.is_read; });
+        renderAlerts(activeAlerts(alerts));
+    });
+    liveStream.addEventListener('system_stats', event => {
+        systemStats = JSON.parse(event.data).items.reverse().concat(systemStats).slice(0, SYSTEM_STATS_KEPT);
+        updateSystemStatsDisplay();
+    });
+    liveStream.addEventListener('logs_cleared', () => {
+        fetchLogs();
+        fetchStats();
+    });
+    // Changes were missed (long disconnect, server restart): reload everything
+    liveStream.addEventListener('reset', () => {
+        systemStats = [];
+        systemStatsSyncId = 0;
+        alerts = [];
+        alertsSyncId = 0;
+        alertsAckedSince = null;
+        fetchLogs();
+        fetchStats();
+        fetchSystemStats();
+        fetchAlerts();
+    });
+}
+
+// New logs: count them into the stats and show the ones matching the filters
+function onLiveLogs(payload) {
+    if (logStats) {
+        // `count` includes records not sent with a large batch; those are
+        // picked up by the next full stats fetch
+        if (payload.count > payload.items.length) {
+            fetchStats();
+        } else {
+            payload.items.forEach(log => {
+                logStats.total_logs += 1;
+                logStats.by_severity[log.severity] = (logStats.by_severity[log.severity] || 0) + 1;
+                logStats.by_service[log.service] = (logStats.by_service[log.service] || 0) + 1;
+            });
+            renderStats();
+        }
+    }
+    // Search results are ranked, so live rows can't be placed in them
+    if (searchInput && searchInput.value.trim()) return;
+    const severity = severityFilter.value;
+    const service = serviceFilter.value;
+    const matching = payload.items.filter(log =>
+        (!severity || log.severity === severity) && (!service || log.service === service));
+    if (!matching.length) return;
+    const known = new Set(logsData.map(log => log.id));
+    logsData = matching.filter(log => !known.has(log.id)).reverse().concat(logsData);
+    logsSyncId = Math.max(logsSyncId, ...matching.map(log => log.id));
+    if (logsData.length > LIVE_LOGS_MAX) {
+        // The paging cursor points past rows dropped here; Refresh restores paging
+        logsData = logsData.slice(0, LIVE_LOGS_MAX);
+        logsCursor = null;
+    }
+    renderLogs();
+}
 
 // Dropdown toggle
 alertsToggle && alertsToggle.addEventListener('click', (e) => {
@@ -89,6 +193,13 @@ aiFixBtn && aiFixBtn.addEventListener('click', () => {
 });
 severityFilter.addEventListener('change', fetchLogs);
 serviceFilter.addEventListener('change', fetchLogs);
+loadMoreBtn && loadMoreBtn.addEventListener('click', fetchMoreLogs);
+// Search on the server once typing pauses
+let searchTimer = null;
+searchInput && searchInput.addEventListener('input', () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(fetchLogs, 300);
+});
 
 closeModal.addEventListener('click', () => {
     modal.style.display = 'none';
@@ -100,24 +211,56 @@ window.addEventListener('click', (event) => {
     }
 });
 
+// Last response body and ETag per URL. Polls send If-None-Match, and a
+// 304 answer reuses the stored body; `changed` tells callers to skip a redraw.
+// Delta requests pass a fixed `key`, so only their latest URL is kept
+const responseCache = new Map();
+
+async function fetchJSON(url, key = url) {
+    let cached = responseCache.get(key);
+    if (cached && cached.url !== url) cached = null;
+    const response = await fetch(url, cached ? { headers: { 'If-None-Match': cached.etag } } : {});
+    if (response.status === 304 && cached) {
+        return { data: cached.data, changed: false };
+    }
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+        responseCache.set(key, { url, etag, data });
+    }
+    return { data, changed: true };
+}
+
+// Apply a {items, reset} delta to a newest-first list of records
+function mergeDelta(current, delta, kept) {
+    if (delta.reset) return delta.items.slice(0, kept);
+    const known = new Set(current.map(record => record.id));
+    return delta.items.filter(record => !known.has(record.id)).concat(current).slice(0, kept);
+}
+
+// Fetch one page of logs; an empty cursor asks for the first page
+async function fetchLogsPage(cursor) {
+    const severity = severityFilter.value;
+    const service = serviceFilter.value;
+    
+    const query = searchInput ? searchInput.value.trim() : '';
+    
+    const params = [`cursor=${encodeURIComponent(cursor || '')}`];
+    if (query) params.push(`q=${encodeURIComponent(query)}`);
+    if (severity) params.push(`severity=${severity}`);
+    if (service) params.push(`service=${service}`);
+    
+    return (await fetchJSON(`${API_URL}/logs?${params.join('&')}`)).data;
+}
+
 // Fetch logs from API
 async function fetchLogs() {
     try {
-        const severity = severityFilter.value;
-        const service = serviceFilter.value;
-        
-        let url = `${API_URL}/logs`;
-        const params = [];
-        
-        if (severity) params.push(`severity=${severity}`);
-        if (service) params.push(`service=${service}`);
-        
-        if (params.length > 0) {
-            url += `?${params.join('&')}`;
-        }
-        
-        const response = await fetch(url);
-        logsData = await response.json();
+        const page = await fetchLogsPage(null);
+        logsData = page.items;
+        logsCursor = page.next_cursor;
+        // The newest row shown is where the next delta starts
+        logsSyncId = logsData.length ? logsData[0].id : 0;
         
         renderLogs();
     } catch (error) {
@@ -126,28 +269,71 @@ async function fetchLogs() {
     }
 }
 
+// Add the logs written since the last fetch to the top of the table
+async function fetchNewLogs() {
+    // Search results are ranked, so new rows can't be placed in them
+    if (searchInput && searchInput.value.trim()) return;
+    const params = [`since_id=${logsSyncId}`];
+    if (severityFilter.value) params.push(`severity=${severityFilter.value}`);
+    if (serviceFilter.value) params.push(`service=${serviceFilter.value}`);
+    try {
+        const { data, changed } = await fetchJSON(`${API_URL}/logs?${params.join('&')}`, 'logs-delta');
+        if (!changed) return;
+        // Too many new rows, or ours are gone: start over from the first page
+        if (data.reset) return fetchLogs();
+        if (!data.items.length) return;
+        logsSyncId = data.items[0].id;
+        logsData = mergeDelta(logsData, data, LIVE_LOGS_MAX);
+        renderLogs();
+    } catch (error) {
+        console.error('Error fetching new logs:', error);
+    }
+}
+
+// Append the next page of logs to the table
+async function fetchMoreLogs() {
+    if (!logsCursor) return;
+    try {
+        const page = await fetchLogsPage(logsCursor);
+        logsData = logsData.concat(page.items);
+        logsCursor = page.next_cursor;
+        
+        renderLogs();
+    } catch (error) {
+        console.error('Error fetching more logs:', error);
+    }
+}
+
 // Fetch statistics from API
 async function fetchStats() {
     try {
-        const response = await fetch(`${API_URL}/stats`);
-        const stats = await response.json();
-        
-        // Update stats cards
-        totalLogsElement.textContent = stats.total_logs;
-        errorLogsElement.textContent = stats.by_severity.ERROR || 0;
-        criticalLogsElement.textContent = stats.by_severity.CRITICAL || 0;
-        
-        // Update charts
-        updateSeverityChart(stats.by_severity);
-        updateServiceChart(stats.by_service);
+        const { data, changed } = await fetchJSON(`${API_URL}/stats`);
+        if (!changed && logStats) return;
+        // A copy, since live events count into it
+        logStats = JSON.parse(JSON.stringify(data));
+        renderStats();
     } catch (error) {
         console.error('Error fetching stats:', error);
     }
 }
 
+function renderStats() {
+    const stats = logStats;
+    
+    // Update stats cards
+    totalLogsElement.textContent = stats.total_logs;
+    errorLogsElement.textContent = stats.by_severity.ERROR || 0;
+    criticalLogsElement.textContent = stats.by_severity.CRITICAL || 0;
+    
+    // Update charts
+    updateSeverityChart(stats.by_severity);
+    updateServiceChart(stats.by_service);
+}
+
 // Render logs in the table
 function renderLogs() {
     logsTable.innerHTML = '';
+    if (loadMoreBtn) loadMoreBtn.style.display = logsCursor ? '' : 'none';
     
     if (logsData.length === 0) {
         logsTable.innerHTML = `
@@ -360,10 +546,12 @@ function updateServiceChart(serviceData) {
 
 // Fetch system stats from API
 function fetchSystemStats() {
-    fetch(`${API_URL}/system/stats`)
-        .then(response => response.json())
-        .then(data => {
-            systemStats = data;
+    const url = `${API_URL}/system/stats?since_id=${systemStatsSyncId}&limit=${SYSTEM_STATS_KEPT}`;
+    fetchJSON(url, 'system-stats-delta')
+        .then(({ data, changed }) => {
+            if (!changed) return;
+            systemStats = mergeDelta(systemStats, data, SYSTEM_STATS_KEPT);
+            systemStatsSyncId = data.last_id;
             updateSystemStatsDisplay();
         })
         .catch(error => console.error('Error fetching system stats:', error));
@@ -385,21 +573,31 @@ function updateSystemStatsDisplay() {
 
 // Fetch alerts from API
 async function fetchAlerts() {
+    let url = `${API_URL}/alerts?since_id=${alertsSyncId}&limit=${ALERTS_KEPT}`;
+    if (alertsAckedSince) url += `&acked_since=${encodeURIComponent(alertsAckedSince)}`;
     try {
-        const response = await fetch(`${API_URL}/alerts`);
-        const allAlerts = await response.json();
-        const activeAlerts = (allAlerts || []).filter(a => {
-            const severity = (a?.severity || '').toUpperCase();
-            const isInformational = severity === 'INFO';
-            const isUnacked = a?.acknowledged === false || a?.is_read === false;
-            return isUnacked && !isInformational;
-        });
-        renderAlerts(activeAlerts);
+        const { data, changed } = await fetchJSON(url, 'alerts-delta');
+        if (!changed) return;
+        alerts = mergeDelta(alerts, data, ALERTS_KEPT);
+        const updated = new Map(data.updated.map(a => [a.id, a]));
+        alerts = alerts.map(a => updated.get(a.id) || a);
+        alertsSyncId = data.last_id;
+        alertsAckedSince = data.acked_since;
+        renderAlerts(activeAlerts(alerts));
     } catch (error) {
         console.error('Error fetching alerts:', error);
     }
 }
 
+function activeAlerts(allAlerts) {
+    return allAlerts.filter(a => {
+        const severity = (a?.severity || '').toUpperCase();
+        const isInformational = severity === 'INFO';
+        const isUnacked = a?.acknowledged === false || a?.is_read === false;
+        return isUnacked && !isInformational;
+    });
+}
+
 // Enhance alert rendering with class names based on type
 function renderAlerts(alerts) {
   const container = document.getElementById('alerts-list');
@@ -453,7 +651,7 @@ async function runAIFix() {
 }
 async function fetchPredictive() {
     try {
-        const response = await fetch(`${API_URL}/predict/logs?metric=error_count&limit=500`);
+        const response = await fetch(`${API_URL}/predict/logs?metric=error_count&hours=168`);
         const data = await response.json();
         renderPrediction(data.forecast || []);
     } catch (error) {